@@ -0,0 +1,328 @@
+-- Migration: Partition prediction_log by time and add per-minute rollups
+-- Version: 003
+-- Description: Converts prediction_log into a range-partitioned table on ts with a
+--              BRIN index, adds partition create/retention functions and a
+--              prediction_log_rollup_1m table that dashboards and drift checks
+--              read instead of scanning raw rows.
+
+-- ---------------------------------------------------------------------------
+-- Partitioned prediction_log
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE IF EXISTS prediction_log RENAME TO prediction_log_unpartitioned;
+ALTER SEQUENCE IF EXISTS prediction_log_id_seq RENAME TO prediction_log_unpartitioned_id_seq;
+
+CREATE TABLE prediction_log (
+    id BIGSERIAL,
+    ts TIMESTAMPTZ NOT NULL DEFAULT now(),
+    input_json JSONB NOT NULL,
+    predicted_class INTEGER NOT NULL,
+    probability FLOAT NOT NULL,
+    model_version TEXT NOT NULL,
+    latency_ms FLOAT,
+    PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+-- Catches rows outside every created partition so inserts never fail
+CREATE TABLE prediction_log_default PARTITION OF prediction_log DEFAULT;
+
+-- Rows arrive in ts order, so a BRIN index stays tiny and cheap to maintain.
+-- The btree indexes on model_version and predicted_class are not recreated:
+-- aggregate queries by version and class read prediction_log_rollup_1m.
+CREATE INDEX idx_prediction_log_ts_brin ON prediction_log USING BRIN (ts);
+
+-- Partition granularity of this database, read by the functions below and by
+-- maintenance.py. Chosen when the migration runs through the
+-- prediction_log.partition setting, e.g.
+--   PGOPTIONS='-c prediction_log.partition=monthly' psql -f 003_partition_prediction_log.sql
+-- (or ALTER DATABASE ... SET prediction_log.partition = 'monthly' beforehand);
+-- defaults to daily.
+CREATE TABLE IF NOT EXISTS prediction_log_settings (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    partition_granularity TEXT NOT NULL
+        CHECK (partition_granularity IN ('daily', 'monthly'))
+);
+
+INSERT INTO prediction_log_settings (partition_granularity)
+VALUES (coalesce(nullif(current_setting('prediction_log.partition', true), ''), 'daily'))
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION prediction_log_granularity() RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+    SELECT partition_granularity FROM prediction_log_settings
+$$;
+
+-- Partitions are named prediction_log_pYYYYMMDD (daily) or prediction_log_pYYYYMM
+-- (monthly) and are aligned to UTC. Parts of the range already covered by
+-- another partition (e.g. after changing the granularity) are left out, and a
+-- range whose rows already sit in the default partition is skipped with a
+-- warning; both return NULL instead of raising, so one bad range does not
+-- stop the remaining partitions from being created.
+CREATE OR REPLACE FUNCTION create_prediction_log_partition(
+    p_at TIMESTAMPTZ,
+    p_granularity TEXT DEFAULT NULL
+) RETURNS TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+    v_name TEXT;
+    r RECORD;
+BEGIN
+    p_granularity := coalesce(p_granularity, prediction_log_granularity());
+    IF p_granularity = 'daily' THEN
+        v_start := date_trunc('day', p_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+        v_end := v_start + INTERVAL '1 day';
+        v_name := 'prediction_log_p' || to_char(v_start AT TIME ZONE 'UTC', 'YYYYMMDD');
+    ELSIF p_granularity = 'monthly' THEN
+        v_start := date_trunc('month', p_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+        v_end := v_start + INTERVAL '1 month';
+        v_name := 'prediction_log_p' || to_char(v_start AT TIME ZONE 'UTC', 'YYYYMM');
+    ELSE
+        RAISE EXCEPTION 'Unknown partition granularity: % (expected daily or monthly)', p_granularity;
+    END IF;
+
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    -- Trim the range to the part no existing partition covers: partitions
+    -- reaching back over the start move it forward, the first one starting
+    -- inside the range ends it
+    FOR r IN
+        SELECT lower_bound, upper_bound
+        FROM (
+            SELECT substring(b.bound FROM 'FROM \(''([^'']+)''\)')::TIMESTAMPTZ AS lower_bound,
+                   substring(b.bound FROM 'TO \(''([^'']+)''\)')::TIMESTAMPTZ AS upper_bound
+            FROM (
+                SELECT pg_get_expr(c.relpartbound, c.oid) AS bound
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'prediction_log'::regclass
+                  AND c.relname ~ '^prediction_log_p[0-9]+$'
+            ) b
+        ) p
+        ORDER BY lower_bound
+    LOOP
+        IF r.lower_bound < v_end AND r.upper_bound > v_start THEN
+            IF r.lower_bound <= v_start THEN
+                v_start := r.upper_bound;
+            ELSE
+                v_end := r.lower_bound;
+            END IF;
+        END IF;
+        IF v_start >= v_end THEN
+            RETURN NULL;
+        END IF;
+    END LOOP;
+
+    -- Attaching would fail once the default partition holds rows in the range
+    IF EXISTS (SELECT 1 FROM prediction_log_default WHERE ts >= v_start AND ts < v_end) THEN
+        RAISE WARNING 'Not creating %: prediction_log_default already holds rows in [%, %)',
+            v_name, v_start, v_end;
+        RETURN NULL;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF prediction_log FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+    RETURN v_name;
+END;
+$$;
+
+-- Creates the current partition plus p_ahead future ones. Run this ahead of time:
+-- a new partition cannot be attached once the default partition holds its rows.
+CREATE OR REPLACE FUNCTION ensure_prediction_log_partitions(
+    p_granularity TEXT DEFAULT NULL,
+    p_ahead INTEGER DEFAULT 3
+) RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_step INTERVAL;
+    v_name TEXT;
+BEGIN
+    p_granularity := coalesce(p_granularity, prediction_log_granularity());
+    v_step := CASE p_granularity WHEN 'monthly' THEN INTERVAL '1 month' ELSE INTERVAL '1 day' END;
+    FOR i IN 0..p_ahead LOOP
+        v_name := create_prediction_log_partition(now() + i * v_step, p_granularity);
+        IF v_name IS NOT NULL THEN
+            RETURN NEXT v_name;
+        END IF;
+    END LOOP;
+END;
+$$;
+
+-- Drops every partition whose upper bound is older than p_retention, and
+-- deletes rows that old from the default partition.
+CREATE OR REPLACE FUNCTION drop_prediction_log_partitions(
+    p_retention INTERVAL
+) RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    r RECORD;
+    v_upper TIMESTAMPTZ;
+BEGIN
+    FOR r IN
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'prediction_log'::regclass
+          AND c.relname ~ '^prediction_log_p[0-9]+$'
+    LOOP
+        v_upper := substring(r.bound FROM 'TO \(''([^'']+)''\)')::TIMESTAMPTZ;
+        IF v_upper <= now() - p_retention THEN
+            EXECUTE format('DROP TABLE %I', r.relname);
+            RETURN NEXT r.relname;
+        END IF;
+    END LOOP;
+    DELETE FROM prediction_log_default WHERE ts < now() - p_retention;
+END;
+$$;
+
+-- Move existing rows into partitions covering their time range
+DO $$
+DECLARE
+    v_day TIMESTAMPTZ;
+BEGIN
+    IF to_regclass('prediction_log_unpartitioned') IS NOT NULL THEN
+        FOR v_day IN
+            SELECT DISTINCT date_trunc('day', ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+            FROM prediction_log_unpartitioned
+            WHERE ts IS NOT NULL
+        LOOP
+            PERFORM create_prediction_log_partition(v_day);
+        END LOOP;
+
+        INSERT INTO prediction_log
+            (id, ts, input_json, predicted_class, probability, model_version, latency_ms)
+        SELECT id, coalesce(ts, now()), input_json, predicted_class, probability,
+               model_version, latency_ms
+        FROM prediction_log_unpartitioned;
+
+        PERFORM setval(
+            pg_get_serial_sequence('prediction_log', 'id'),
+            coalesce((SELECT max(id) FROM prediction_log_unpartitioned), 0) + 1,
+            false
+        );
+
+        DROP TABLE prediction_log_unpartitioned;
+    END IF;
+END;
+$$;
+
+SELECT ensure_prediction_log_partitions(NULL, 3);
+
+-- ---------------------------------------------------------------------------
+-- Per-minute rollup
+-- ---------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS prediction_log_rollup_1m (
+    bucket TIMESTAMPTZ NOT NULL,
+    model_version TEXT NOT NULL,
+    prediction_count BIGINT NOT NULL,
+    class_counts JSONB NOT NULL,
+    probability_hist INTEGER[] NOT NULL,
+    probability_avg FLOAT,
+    latency_avg_ms FLOAT,
+    latency_p50_ms FLOAT,
+    latency_p95_ms FLOAT,
+    latency_p99_ms FLOAT,
+    PRIMARY KEY (bucket, model_version)
+);
+
+CREATE INDEX IF NOT EXISTS idx_prediction_log_rollup_1m_bucket_brin
+    ON prediction_log_rollup_1m USING BRIN (bucket);
+
+-- Recomputes the rollup rows for every whole minute in [p_from, p_to).
+-- Re-running a window is idempotent, so late rows are picked up by overlap.
+CREATE OR REPLACE FUNCTION refresh_prediction_log_rollup(
+    p_from TIMESTAMPTZ,
+    p_to TIMESTAMPTZ
+) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    WITH base AS (
+        SELECT date_trunc('minute', ts) AS bucket, model_version, predicted_class,
+               probability, latency_ms,
+               greatest(least(width_bucket(probability, 0, 1, 10), 10), 1) AS prob_bin
+        FROM prediction_log
+        WHERE ts >= date_trunc('minute', p_from)
+          AND ts < date_trunc('minute', p_to)
+    ),
+    stats AS (
+        SELECT bucket, model_version,
+               count(*) AS prediction_count,
+               avg(probability) AS probability_avg,
+               avg(latency_ms) AS latency_avg_ms,
+               percentile_cont(0.50) WITHIN GROUP (ORDER BY latency_ms) AS latency_p50_ms,
+               percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) AS latency_p95_ms,
+               percentile_cont(0.99) WITHIN GROUP (ORDER BY latency_ms) AS latency_p99_ms
+        FROM base
+        GROUP BY bucket, model_version
+    ),
+    classes AS (
+        SELECT bucket, model_version,
+               jsonb_object_agg(predicted_class::TEXT, n) AS class_counts
+        FROM (
+            SELECT bucket, model_version, predicted_class, count(*) AS n
+            FROM base
+            GROUP BY bucket, model_version, predicted_class
+        ) c
+        GROUP BY bucket, model_version
+    ),
+    hist AS (
+        SELECT s.bucket, s.model_version,
+               array_agg(coalesce(h.n, 0)::INTEGER ORDER BY b.prob_bin) AS probability_hist
+        FROM stats s
+        CROSS JOIN generate_series(1, 10) AS b(prob_bin)
+        LEFT JOIN (
+            SELECT bucket, model_version, prob_bin, count(*) AS n
+            FROM base
+            GROUP BY bucket, model_version, prob_bin
+        ) h ON h.bucket = s.bucket
+           AND h.model_version = s.model_version
+           AND h.prob_bin = b.prob_bin
+        GROUP BY s.bucket, s.model_version
+    )
+    INSERT INTO prediction_log_rollup_1m (
+        bucket, model_version, prediction_count, class_counts, probability_hist,
+        probability_avg, latency_avg_ms, latency_p50_ms, latency_p95_ms, latency_p99_ms
+    )
+    SELECT s.bucket, s.model_version, s.prediction_count, c.class_counts, h.probability_hist,
+           s.probability_avg, s.latency_avg_ms, s.latency_p50_ms, s.latency_p95_ms,
+           s.latency_p99_ms
+    FROM stats s
+    JOIN classes c USING (bucket, model_version)
+    JOIN hist h USING (bucket, model_version)
+    ON CONFLICT (bucket, model_version) DO UPDATE SET
+        prediction_count = EXCLUDED.prediction_count,
+        class_counts = EXCLUDED.class_counts,
+        probability_hist = EXCLUDED.probability_hist,
+        probability_avg = EXCLUDED.probability_avg,
+        latency_avg_ms = EXCLUDED.latency_avg_ms,
+        latency_p50_ms = EXCLUDED.latency_p50_ms,
+        latency_p95_ms = EXCLUDED.latency_p95_ms,
+        latency_p99_ms = EXCLUDED.latency_p99_ms;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+-- Backfill the rollup from any migrated rows
+SELECT refresh_prediction_log_rollup(
+    coalesce((SELECT min(ts) FROM prediction_log), now()),
+    now()
+);
+
+-- Comments for documentation
+COMMENT ON TABLE prediction_log IS 'Logs all ML model predictions, range-partitioned by ts';
+COMMENT ON TABLE prediction_log_settings IS 'Partition granularity of prediction_log (daily or monthly), one row';
+COMMENT ON TABLE prediction_log_rollup_1m IS 'Per-minute prediction aggregates per model version, maintained from prediction_log';
+COMMENT ON COLUMN prediction_log_rollup_1m.bucket IS 'Start of the one-minute bucket';
+COMMENT ON COLUMN prediction_log_rollup_1m.class_counts IS 'Prediction count per predicted_class, keyed by class';
+COMMENT ON COLUMN prediction_log_rollup_1m.probability_hist IS 'Prediction counts in 10 equal-width probability buckets over [0, 1]';
+COMMENT ON COLUMN prediction_log_rollup_1m.latency_p95_ms IS '95th percentile inference latency in milliseconds';
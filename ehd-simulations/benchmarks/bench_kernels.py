@@ -0,0 +1,246 @@
+"""
+Benchmark suite for the EHD simulation kernels.
+
+Times the Robbins-Monro engine, the batched Gaussian KL ranking grid and the
+welfare ensemble at several problem sizes, recording best-of-N wall time,
+peak traced memory and throughput. Every case first checks its output
+against the original per-element code from the paper script under a fixed
+seed, so a faster kernel that changes the numbers fails loudly.
+
+Usage (from ehd-simulations/):
+    python benchmarks/bench_kernels.py                       # all sizes
+    python benchmarks/bench_kernels.py --quick               # smallest size per kernel
+    python benchmarks/bench_kernels.py --json report.json    # also write a JSON report
+    python benchmarks/bench_kernels.py --baseline report.json  # flag slowdowns vs a saved report
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import WELFARE_DEFAULTS, kl_gaussian  # noqa: E402
+from ranking_surface import AXES, evaluate_grid  # noqa: E402
+from robbins_monro import power_schedule, simulate_recalibration  # noqa: E402
+from seeding import experiment_rng  # noqa: E402
+from welfare_ensemble import simulate_ensemble, simulate_paths, time_grid  # noqa: E402
+
+SEED = 42
+
+# Slowdown against the baseline that counts as a regression
+REGRESSION_TOLERANCE = 1.10
+
+MIN_SAMPLE_SECONDS = 0.2
+
+
+# ------------------------------------------------------------------ #
+# Reference implementations (the original generate_fig* code)
+# ------------------------------------------------------------------ #
+def reference_convergence(N, K, rs):
+    trajectories = np.zeros((N, K + 1))
+    for n in range(N):
+        mu = 0.60
+        trajectories[n, 0] = mu
+        for k in range(1, K + 1):
+            kappa = 0.5 / (k ** 0.75)
+            obs   = rs.normal(0.35, 0.05)
+            mu    = mu + kappa * (obs - mu)
+            trajectories[n, k] = mu
+    return trajectories
+
+
+def reference_welfare(noise):
+    t = np.arange(0, noise.shape[1], dtype=float)
+    W, V = [], []
+    for row in noise:
+        g_raw  = 0.08 * np.sin(2 * np.pi * t / 24) + 0.04 + row
+        g_smooth = np.zeros_like(g_raw)
+        g_smooth[0] = g_raw[0]
+        for i in range(1, len(t)):
+            g_smooth[i] = 0.3 * g_raw[i] + 0.7 * g_smooth[i - 1]
+        W_ext = 1 / (1 + np.exp(3 * g_smooth))
+        B = np.zeros_like(t)
+        for i, ti in enumerate(t):
+            if ti < 3:
+                B[i] = W_ext[i]
+            elif ti == 3:
+                B[i] = 0.62
+            elif ti < 16:
+                B[i] = 0.62 * np.exp(-0.08 * (ti - 3))
+            else:
+                B[i] = W_ext[i] + 0.03
+        x2 = 0.80 * np.exp(-0.02 * t)
+        x2[6:] += 0.12 * np.exp(-0.02 * (t[6:] - 6))
+        x2 = np.clip(x2, 0, 1)
+        x3 = 0.72 * np.exp(-0.01 * t)
+        x1 = 0.70 * W_ext + 0.20 * B + 0.10 * 0.42
+        W.append(W_ext)
+        V.append(0.55 * x1 + 0.25 * x2 + 0.20 * x3)
+    return np.array(W), np.array(V)
+
+
+# ------------------------------------------------------------------ #
+# Agreement checks, one per kernel
+# ------------------------------------------------------------------ #
+def check_convergence():
+    """Engine vs the original loop on the same legacy stream (figure 1 size)"""
+    N, K = 50, 200
+    expected = reference_convergence(N, K, np.random.RandomState(SEED))
+    result = simulate_recalibration(0.35, 0.60, 0.05, K, N, power_schedule(0.5, 0.75),
+                                    rng=np.random.RandomState(SEED), keep_trajectories=N)
+    assert np.array_equal(result.trajectories, expected), "trajectories differ from the reference loop"
+    for q in (10, 90):
+        assert np.array_equal(result.percentiles[q], np.percentile(expected, q, axis=0))
+    np.testing.assert_allclose(result.mean, expected.mean(axis=0), rtol=1e-12, atol=0)
+
+
+def check_kl():
+    """Chunked grid vs direct kl_gaussian broadcasting over the figure 2 sigma2_b sweep"""
+    axes = {
+        "mu_a": np.linspace(0.3, 0.7, 9), "mu_b": np.linspace(0.3, 0.7, 7),
+        "sigma2_a": np.geomspace(1e-4, 0.15, 11), "sigma2_b": np.linspace(0.02, 0.15, 100),
+        "sigma_star": np.array([0.01, 0.03]),
+    }
+    surface = evaluate_grid(axes, 0.5, chunk_points=997)
+    mu_a, mu_b, s2a, s2b, ss = np.meshgrid(*[axes[k] for k in AXES], indexing="ij")
+    expected = kl_gaussian(mu_b, s2b, 0.5, ss**2) - kl_gaussian(mu_a, s2a, 0.5, ss**2)
+    # float32 storage of a float64 difference
+    np.testing.assert_allclose(surface["efe_margin"], expected, rtol=1e-6, atol=1e-6)
+    divergent = np.sign(expected) != np.sign((mu_b - 0.5)**2 - (mu_a - 0.5)**2)
+    agree = surface["divergent"] == divergent
+    # Near-zero margins may round to the other sign in float64 vs the direct formula
+    assert np.all(agree | (np.abs(expected) < 1e-9)), "divergence flags differ"
+
+
+def check_welfare():
+    """Vectorized paths vs the original per-element loops on identical noise"""
+    paths, months = 64, 24
+    p = {**WELFARE_DEFAULTS, "months": months}
+    t = time_grid(months, 1)
+    result = simulate_paths(p, t, paths, experiment_rng("bench_welfare", SEED))
+    noise = experiment_rng("bench_welfare", SEED).normal(0, p["noise_sd"], size=(paths, len(t)))
+    W_ext, V = reference_welfare(noise)
+    np.testing.assert_allclose(result["W_ext"], W_ext, rtol=1e-14, atol=0)
+    np.testing.assert_allclose(result["V"], V, rtol=1e-14, atol=0)
+
+
+# ------------------------------------------------------------------ #
+# Cases: (kernel, size label, work units, callable)
+# ------------------------------------------------------------------ #
+def convergence_cases():
+    for N, K in [(50, 200), (1_000, 2_000), (10_000, 10_000)]:
+        yield (f"N={N} K={K}", N * K, "steps",
+               lambda N=N, K=K: simulate_recalibration(
+                   0.35, 0.60, 0.05, K, N, power_schedule(0.5, 0.75),
+                   rng=experiment_rng("convergence", SEED), record_every=10))
+
+
+def kl_cases():
+    for side in (10, 25, 50):
+        axes = {
+            "mu_a": np.linspace(0.3, 0.7, side), "mu_b": np.linspace(0.3, 0.7, side),
+            "sigma2_a": np.geomspace(1e-4, 0.15, side * 2), "sigma2_b": np.geomspace(1e-4, 0.15, side * 2),
+            "sigma_star": np.linspace(0.01, 0.05, 5),
+        }
+        points = int(np.prod([len(v) for v in axes.values()]))
+        yield (f"{points:.3g} points", points, "points",
+               lambda axes=axes: evaluate_grid(axes, 0.5))
+
+
+def welfare_cases():
+    for paths, dt, months in [(1_000, 1, 24), (2_000, 1 / 30, 24), (10_000, 1 / 30, 72)]:
+        steps = len(time_grid(months, dt))
+        yield (f"{paths} paths x {steps} steps", paths * steps, "path-steps",
+               lambda paths=paths, dt=dt, months=months: simulate_ensemble(
+                   {"n_paths": paths, "dt": dt, "months": months},
+                   experiment_rng("welfare_ensemble", SEED)))
+
+
+KERNELS = {
+    "convergence": (check_convergence, convergence_cases),
+    "kl_grid": (check_kl, kl_cases),
+    "welfare": (check_welfare, welfare_cases),
+}
+
+
+def measure(fn, repeat):
+    fn()  # warm-up
+    times = []
+    # Short cases keep repeating until MIN_SAMPLE_SECONDS, or timer noise dominates
+    while len(times) < repeat or (sum(times) < MIN_SAMPLE_SECONDS and len(times) < 1000):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("kernels", nargs="*", default=list(KERNELS), help=f"subset of {', '.join(KERNELS)}")
+    parser.add_argument("--quick", action="store_true", help="smallest size per kernel only")
+    parser.add_argument("--repeat", type=int, default=3, help="minimum timed runs per case; best is kept")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    args = parser.parse_args()
+    unknown = [k for k in args.kernels if k not in KERNELS]
+    if unknown:
+        parser.error(f"unknown kernel(s) {', '.join(unknown)}; choose from {', '.join(KERNELS)}")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(r["kernel"], r["size"]): r for r in json.load(f)["results"]}
+
+    results, regressions = [], []
+    for kernel in args.kernels:
+        check, cases = KERNELS[kernel]
+        check()
+        print(f"{kernel}: matches reference")
+        for i, (size, work, unit, fn) in enumerate(cases()):
+            if args.quick and i:
+                break
+            seconds, peak = measure(fn, args.repeat)
+            record = {
+                "kernel": kernel, "size": size, "seconds": seconds,
+                "peak_mb": peak / 2**20, "throughput": work / seconds, "unit": unit,
+            }
+            line = (f"  {size:<28s} {seconds:9.4f}s   peak {record['peak_mb']:8.1f} MB   "
+                    f"{record['throughput'] / 1e6:9.2f} M {unit}/s")
+            before = baseline.get((kernel, size))
+            if before:
+                ratio = seconds / before["seconds"]
+                record["vs_baseline"] = ratio
+                line += f"   x{ratio:.2f} vs baseline"
+                if ratio > REGRESSION_TOLERANCE:
+                    regressions.append(f"{kernel} {size}")
+                    line += "  SLOWER"
+            print(line)
+            results.append(record)
+
+    if args.json:
+        report = {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    if regressions:
+        print(f"More than {REGRESSION_TOLERANCE - 1:.0%} slower than baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: vectorized Robbins-Monro engine vs the original per-step loop.
+
+For each problem size both implementations run from the same legacy seed;
+trajectories and percentiles must match exactly and the mean to rounding
+(the engine sums the N estimates in a different order).
+
+Usage (from ehd-simulations/):
+    python benchmarks/bench_robbins_monro.py           # loop comparison sizes
+    python benchmarks/bench_robbins_monro.py --large   # also N=1e5, K=1e4 engine only
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from robbins_monro import power_schedule, simulate_recalibration  # noqa: E402
+from seeding import experiment_rng  # noqa: E402
+
+MU_STAR, MU_0, SIGMA_OBS = 0.35, 0.60, 0.05
+SEED = 42
+SIZES = [(50, 200), (200, 1000), (1000, 2000)]
+LARGE = (100_000, 10_000)
+
+
+def reference_loop(N: int, K: int) -> np.ndarray:
+    """The original generate_fig1 recursion"""
+    trajectories = np.zeros((N, K + 1))
+    for n in range(N):
+        mu = MU_0
+        trajectories[n, 0] = mu
+        for k in range(1, K + 1):
+            kappa = 0.5 / (k ** 0.75)
+            obs   = np.random.normal(MU_STAR, SIGMA_OBS)
+            mu    = mu + kappa * (obs - mu)
+            trajectories[n, k] = mu
+    return trajectories
+
+
+def engine(N: int, K: int, rng, **kwargs):
+    return simulate_recalibration(
+        mu_star=MU_STAR, mu_0=MU_0, sigma_obs=SIGMA_OBS, K=K, N=N,
+        schedule=power_schedule(0.5, 0.75), rng=rng, **kwargs
+    )
+
+
+def compare(N: int, K: int) -> None:
+    np.random.seed(SEED)
+    t0 = time.perf_counter()
+    trajectories = reference_loop(N, K)
+    t_loop = time.perf_counter() - t0
+
+    np.random.seed(SEED)
+    t0 = time.perf_counter()
+    result = engine(N, K, np.random, keep_trajectories=N)
+    t_engine = time.perf_counter() - t0
+
+    assert np.array_equal(result.trajectories, trajectories), "trajectories differ"
+    for q in (10, 90):
+        assert np.array_equal(result.percentiles[q], np.percentile(trajectories, q, axis=0))
+    np.testing.assert_allclose(result.mean, trajectories.mean(axis=0), rtol=1e-12, atol=0)
+
+    # Same engine on a PCG64 Generator stream instead of the legacy RandomState
+    t0 = time.perf_counter()
+    engine(N, K, experiment_rng("convergence", SEED), keep_trajectories=N)
+    t_generator = time.perf_counter() - t0
+
+    steps = N * K
+    print(f"N={N:<6d} K={K:<6d} loop {t_loop:8.3f}s   engine {t_engine:7.3f}s   "
+          f"speedup x{t_loop / t_engine:7.1f}   engine {steps / t_engine / 1e6:7.1f} M steps/s   "
+          f"[identical]   generator {t_generator:7.3f}s")
+
+
+def large() -> None:
+    N, K = LARGE
+    t0 = time.perf_counter()
+    result = engine(N, K, experiment_rng("convergence", SEED), record_every=10)
+    elapsed = time.perf_counter() - t0
+    print(f"N={N:<6d} K={K:<6d} engine {elapsed:7.2f}s   "
+          f"{N * K / elapsed / 1e6:7.1f} M steps/s   final mean {result.mean[-1]:.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--large", action="store_true", help="also run N=1e5, K=1e4")
+    args = parser.parse_args()
+    # Warm up numpy's lazily initialised code paths before timing
+    engine(10, 10, np.random.default_rng(0))
+    for N, K in SIZES:
+        compare(N, K)
+    if args.large:
+        large()
+
+
+if __name__ == "__main__":
+    main()
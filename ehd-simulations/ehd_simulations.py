@@ -5,29 +5,31 @@ Simulation code for:
 
 Author : Luca Lillo, University of Liverpool, 2026
 Purpose: Reproduce Figures for Propositions 4, 5 and Section 7.
-Usage  : python ehd_simulations.py
+Usage  : python ehd_simulations.py [EXPERIMENT ...] [--set NAME=VALUE] [--no-plot]
+         python ehd_simulations.py --help
 Output : figures/fig_convergence.{pdf,png}
          figures/fig_ranking_divergence.{pdf,png}
+         figures/fig_ranking_surface.{pdf,png}
          figures/fig_welfare_trajectory.{pdf,png}
+         figures/fig_welfare_ensemble.{pdf,png}
+
+The numbers come from experiments.py and are cached in .cache/; this module
+only draws them. A figure is re-rendered only when its data or this file
+changed. Only the standard library is imported at module load: NumPy and the
+simulation modules load after argument parsing, and matplotlib only in the
+processes that render.
 """
 
+import argparse
+import hashlib
+import json
 import os
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyArrowPatch
-
-# Global settings
-np.random.seed(42)
-os.makedirs("figures", exist_ok=True)
-
-plt.rcParams.update({
-    "font.family": "serif",
-    "font.size": 11,
-    "axes.spines.top": False,
-    "axes.spines.right": False,
-})
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
 
 NAVY   = "#1B3A6B"
 PLUM   = "#7B2D8B"
@@ -36,35 +38,50 @@ GOLD   = "#DAA520"
 RED    = "#B71C1C"
 GRAY   = "#757575"
 
+FIGURE_DIR = "figures"
+CACHE_DIR = ".cache"
+FORMATS = ("pdf", "png")
+
+# Render stamps: figure name -> hash of the inputs it was last drawn from
+_STAMP_FILE = ".render-keys.json"
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.rcParams.update({
+        "font.family": "serif",
+        "font.size": 11,
+        "axes.spines.top": False,
+        "axes.spines.right": False,
+    })
+    return plt
+
+
+def _save(fig, out_dir, name, formats):
+    for fmt in formats:
+        fig.savefig(os.path.join(out_dir, f"{name}.{fmt}"), dpi=300)
+
 
 # ------------------------------------------------------------------ #
 # FIGURE 1 — Proposition 4: Robbins-Monro convergence
 # ------------------------------------------------------------------ #
-def generate_fig1():
-    mu_star = 0.35
-    mu_0    = 0.60
-    sigma_obs = 0.05
-    K = 200
-    N = 50
-
-    trajectories = np.zeros((N, K + 1))
-    for n in range(N):
-        mu = mu_0
-        trajectories[n, 0] = mu
-        for k in range(1, K + 1):
-            kappa = 0.5 / (k ** 0.75)
-            obs   = np.random.normal(mu_star, sigma_obs)
-            mu    = mu + kappa * (obs - mu)
-            trajectories[n, k] = mu
-
-    ks       = np.arange(K + 1)
-    mean_tr  = trajectories.mean(axis=0)
-    p10      = np.percentile(trajectories, 10, axis=0)
-    p90      = np.percentile(trajectories, 90, axis=0)
+def plot_fig1(data, p, out_dir=FIGURE_DIR, formats=FORMATS):
+    plt = _pyplot()
+    mu_star = p["mu_star"]
+    mu_0    = p["mu_0"]
+
+    trajectories = data["trajectories"]
+    ks       = data["steps"]
+    mean_tr  = data["mean"]
+    p10      = data["p10"]
+    p90      = data["p90"]
 
     fig, ax = plt.subplots(figsize=(6.5, 4))
 
-    for n in range(N):
+    for n in range(len(trajectories)):
         ax.plot(ks, trajectories[n], color=NAVY, alpha=0.12, lw=0.7)
 
     ax.fill_between(ks, p10, p90, color=NAVY, alpha=0.18,
@@ -72,9 +89,9 @@ def generate_fig1():
     ax.plot(ks, mean_tr, color=NAVY, lw=2.0,
             label=r"Mean trajectory")
     ax.axhline(mu_star, color=GREEN, lw=1.6, ls="--",
-               label=r"True interventional mean $\mu^*(a)=0.35$")
+               label=rf"True interventional mean $\mu^*(a)={mu_star:g}$")
     ax.axhline(mu_0, color=RED, lw=1.2, ls="--", alpha=0.6,
-               label=r"Initial estimate $\mu_{\theta_0}(a)=0.60$")
+               label=rf"Initial estimate $\mu_{{\theta_0}}(a)={mu_0:.2f}$")
 
     ax.set_xlabel(r"Visit count $k$")
     ax.set_ylabel(r"Mean estimate $\mu_{\theta_k}(a)$")
@@ -82,8 +99,7 @@ def generate_fig1():
     ax.legend(fontsize=9, frameon=False, loc="upper right")
 
     fig.tight_layout()
-    fig.savefig("figures/fig_convergence.pdf", dpi=300)
-    fig.savefig("figures/fig_convergence.png", dpi=300)
+    _save(fig, out_dir, "fig_convergence", formats)
     plt.close(fig)
     print("fig_convergence saved.")
 
@@ -91,28 +107,11 @@ def generate_fig1():
 # ------------------------------------------------------------------ #
 # FIGURE 2 — Proposition 5(ii): ranking divergence EHD vs EFE
 # ------------------------------------------------------------------ #
-def generate_fig2():
-    mu_star    = 0.50
-    sigma_star = 0.03
-    sigma2_a   = 0.02
-    mu_a = mu_b = 0.45
-
-    sigma2_b_vals  = np.linspace(0.02, 0.15, 100)
-    delta_sigma2   = sigma2_b_vals - sigma2_a
-
-    def kl_gaussian(mu_q, sigma2_q, mu_p, sigma2_p):
-        return 0.5 * (
-            (mu_q - mu_p)**2 / sigma2_p
-            + sigma2_q / sigma2_p
-            - 1
-            - np.log(sigma2_q / sigma2_p)
-        )
-
-    kl_a = kl_gaussian(mu_a, sigma2_a, mu_star, sigma_star**2)
-    kl_b = kl_gaussian(mu_b, sigma2_b_vals, mu_star, sigma_star**2)
-
-    delta_kl  = kl_a - kl_b   # positive = EFE prefers a
-    delta_ehd = np.zeros_like(delta_sigma2)  # always 0
+def plot_fig2(data, p, out_dir=FIGURE_DIR, formats=FORMATS):
+    plt = _pyplot()
+    delta_sigma2 = data["delta_sigma2"]
+    delta_kl     = data["delta_kl"]    # positive = EFE prefers a
+    delta_ehd    = data["delta_ehd"]
 
     fig, ax = plt.subplots(figsize=(6.5, 4))
 
@@ -127,7 +126,7 @@ def generate_fig2():
     ax.annotate("EHD indifferent",
                 xy=(0.06, 0.002), fontsize=9, color=NAVY)
     ax.annotate("EFE penalises higher variance",
-                xy=(0.05, delta_kl[50] + 0.002),
+                xy=(0.05, delta_kl[len(delta_kl) // 2] + 0.002),
                 fontsize=9, color=PLUM)
 
     ax.set_xlabel(
@@ -139,50 +138,75 @@ def generate_fig2():
     ax.legend(fontsize=9, frameon=False, loc="lower left")
 
     fig.tight_layout()
-    fig.savefig("figures/fig_ranking_divergence.pdf", dpi=300)
-    fig.savefig("figures/fig_ranking_divergence.png", dpi=300)
+    _save(fig, out_dir, "fig_ranking_divergence", formats)
     plt.close(fig)
     print("fig_ranking_divergence saved.")
 
 
+# ------------------------------------------------------------------ #
+# FIGURE 2b — Proposition 5(ii): ranking surfaces
+# ------------------------------------------------------------------ #
+def plot_fig2b(data, p, out_dir=FIGURE_DIR, formats=FORMATS):
+    import numpy as np
+    plt = _pyplot()
+    from matplotlib.colors import SymLogNorm
+    sigma2, mu_b = data["sigma2"], data["mu_b"]
+
+    fig, axes = plt.subplots(1, 2, figsize=(11, 4.3))
+    fig.suptitle("Ranking surfaces: EHD vs single-step EFE (Proposition 5, mechanism ii)",
+                 fontsize=11)
+
+    # --- Equal means: EFE margin over both variances ---
+    ax = axes[0]
+    margin = data["variance_efe_margin"]
+    limit = float(np.abs(margin).max())
+    mesh = ax.pcolormesh(sigma2, sigma2, margin.T, cmap="PuOr_r", shading="auto",
+                         norm=SymLogNorm(linthresh=0.1, vmin=-limit, vmax=limit))
+    ax.plot(sigma2, data["variance_flip_lower"], color=NAVY, lw=1.4, ls="--",
+            label="EFE flip boundary")
+    ax.plot(sigma2, data["variance_flip_upper"], color=NAVY, lw=1.4, ls="--")
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlim(sigma2[0], sigma2[-1])
+    ax.set_ylim(sigma2[0], sigma2[-1])
+    ax.set_xlabel(r"$\sigma^2_{\theta_t}(a)$")
+    ax.set_ylabel(r"$\sigma^2_{\theta_t}(b)$")
+    ax.set_title(rf"$\mu(a)=\mu(b)={p['mu_a']:g}$: EHD indifferent everywhere", fontsize=9)
+    ax.legend(fontsize=8, frameon=False, loc="lower right")
+    fig.colorbar(mesh, ax=ax, label=r"$\mathrm{KL}(b)-\mathrm{KL}(a)$")
+
+    # --- Fixed a: where the two rankings disagree ---
+    ax = axes[1]
+    ax.pcolormesh(mu_b, sigma2, data["mean_divergent"].T.astype(float),
+                  cmap="Reds", vmin=0, vmax=2.5, shading="auto")
+    ax.plot(mu_b, data["mean_flip_lower"], color=PLUM, lw=1.6, label="EFE indifferent")
+    ax.plot(mu_b, data["mean_flip_upper"], color=PLUM, lw=1.6)
+    for mu in (p["mu_a"], 2 * p["mu_star"] - p["mu_a"]):
+        ax.axvline(mu, color=NAVY, lw=1.4, ls="--")
+    ax.plot([], [], color=NAVY, lw=1.4, ls="--", label="EHD indifferent")
+    ax.fill_between([], [], color="#E57373", label="Rankings diverge")
+    ax.set_yscale("log")
+    ax.set_ylim(sigma2[0], sigma2[-1])
+    ax.set_xlabel(r"$\mu_{\theta_t}(b)$")
+    ax.set_ylabel(r"$\sigma^2_{\theta_t}(b)$")
+    ax.set_title(rf"$\mu(a)={p['mu_a']:g}$, $\sigma^2(a)={p['sigma2_a']:g}$", fontsize=9)
+    ax.legend(fontsize=8, frameon=True, framealpha=0.85, loc="lower right")
+
+    fig.tight_layout()
+    _save(fig, out_dir, "fig_ranking_surface", formats)
+    plt.close(fig)
+    print("fig_ranking_surface saved.")
+
+
 # ------------------------------------------------------------------ #
 # FIGURE 3 — Section 7: 24-month welfare trajectory
 # ------------------------------------------------------------------ #
-def generate_fig3():
-    t = np.arange(0, 25, dtype=float)
-
-    # External trend and welfare
-    noise  = np.random.normal(0, 0.01, len(t))
-    g_raw  = 0.08 * np.sin(2 * np.pi * t / 24) + 0.04 + noise
-    g_smooth = np.zeros_like(g_raw)
-    g_smooth[0] = g_raw[0]
-    for i in range(1, len(t)):
-        g_smooth[i] = 0.3 * g_raw[i] + 0.7 * g_smooth[i - 1]
-
-    W_ext      = 1 / (1 + np.exp(3 * g_smooth))
-    theta_ext  = 0.45
-
-    # Hope term
-    B = np.zeros_like(t)
-    for i, ti in enumerate(t):
-        if ti < 3:
-            B[i] = W_ext[i]
-        elif ti == 3:
-            B[i] = 0.62
-        elif ti < 16:
-            B[i] = 0.62 * np.exp(-0.08 * (ti - 3))
-        else:
-            B[i] = W_ext[i] + 0.03
-
-    # Endocentric
-    x2 = 0.80 * np.exp(-0.02 * t)
-    x2[6:] += 0.12 * np.exp(-0.02 * (t[6:] - 6))
-    x2 = np.clip(x2, 0, 1)
-    x3 = 0.72 * np.exp(-0.01 * t)
-
-    p1 = 0.42
-    x1 = 0.70 * W_ext + 0.20 * B + 0.10 * p1
-    V  = 0.55 * x1 + 0.25 * x2 + 0.20 * x3
+def plot_fig3(data, p, out_dir=FIGURE_DIR, formats=FORMATS):
+    plt = _pyplot()
+    t, W_ext, B = data["t"], data["W_ext"], data["B"]
+    x2, x3, V = data["x2"], data["x3"], data["V"]
+    theta_ext = p["theta_ext"]
+    t_action = p["t_action"]
 
     fig, axes = plt.subplots(
         3, 1, figsize=(6.5, 7),
@@ -200,14 +224,14 @@ def generate_fig3():
     ax.plot(t, B, color=GOLD, lw=1.8, ls="--",
             label=r"$B_t(a^*)$")
     ax.axhline(theta_ext, color=GRAY, lw=1, ls=":",
-               label=r"$\theta_{\mathrm{ext}}=0.45$")
+               label=rf"$\theta_{{\mathrm{{ext}}}}={theta_ext:.2f}$")
     ax.fill_between(t, 0, 1,
                     where=(W_ext < theta_ext),
                     color=RED, alpha=0.10,
                     label="Trigger active")
-    ax.annotate("", xy=(3, 0.25), xytext=(3, 0.18),
+    ax.annotate("", xy=(t_action, 0.25), xytext=(t_action, 0.18),
                 arrowprops=dict(arrowstyle="->", color=GREEN, lw=1.6))
-    ax.text(3.2, 0.17, "Action selected", fontsize=8, color=GREEN)
+    ax.text(t_action + 0.2, 0.17, "Action selected", fontsize=8, color=GREEN)
     ax.set_ylabel("Welfare signal")
     ax.set_ylim(0.1, 0.85)
     ax.legend(fontsize=8, frameon=False, loc="upper right",
@@ -228,8 +252,8 @@ def generate_fig3():
     ax = axes[2]
     ax.plot(t, V, color="black", lw=2,
             label=r"$V(x_t)$")
-    ax.axhline(0.50, color=GRAY, lw=1, ls=":",
-               label=r"$\theta=0.50$")
+    ax.axhline(p["theta"], color=GRAY, lw=1, ls=":",
+               label=rf"$\theta={p['theta']:.2f}$")
     ax.set_ylabel(r"$V(x_t)$")
     ax.set_xlabel(r"Time $t$ (months)")
     ax.legend(fontsize=8, frameon=False, loc="upper right")
@@ -239,19 +263,287 @@ def generate_fig3():
         ax.spines["right"].set_visible(False)
 
     fig.tight_layout()
-    fig.savefig("figures/fig_welfare_trajectory.pdf", dpi=300)
-    fig.savefig("figures/fig_welfare_trajectory.png", dpi=300)
+    _save(fig, out_dir, "fig_welfare_trajectory", formats)
     plt.close(fig)
     print("fig_welfare_trajectory saved.")
 
 
 # ------------------------------------------------------------------ #
-def main():
-    print("Generating EHD simulation figures...")
-    generate_fig1()
-    generate_fig2()
-    generate_fig3()
-    print("Done. Files saved in ./figures/")
+# FIGURE 4 — Section 7: Monte Carlo welfare ensemble
+# ------------------------------------------------------------------ #
+def plot_fig4(data, p, out_dir=FIGURE_DIR, formats=FORMATS):
+    import numpy as np
+    plt = _pyplot()
+    t = data["t"]
+    theta_ext = p["theta_ext"]
+
+    fig, axes = plt.subplots(
+        3, 1, figsize=(6.5, 7),
+        sharex=True,
+        gridspec_kw={"height_ratios": [2, 2, 1]}
+    )
+    fig.suptitle(
+        f"EHD welfare ensemble — {int(p['n_paths'])} realizations (Section 7)",
+        fontsize=11)
+
+    for ax, name, color, threshold, label in (
+        (axes[0], "W_ext", PLUM, theta_ext, rf"$\theta_{{\mathrm{{ext}}}}={theta_ext:.2f}$"),
+        (axes[1], "V", "black", p["theta"], rf"$\theta={p['theta']:.2f}$"),
+    ):
+        ax.fill_between(t, data[f"{name}_p5"], data[f"{name}_p95"],
+                        color=color, alpha=0.12, lw=0, label="5th–95th percentile")
+        ax.fill_between(t, data[f"{name}_p25"], data[f"{name}_p75"],
+                        color=color, alpha=0.25, lw=0, label="25th–75th percentile")
+        ax.plot(t, data[f"{name}_p50"], color=color, lw=1.8, label="Median")
+        ax.axhline(threshold, color=GRAY, lw=1, ls=":", label=label)
+        ax.legend(fontsize=8, frameon=False, loc="upper right", ncol=2)
+
+    axes[0].set_ylabel(r"$W_{\mathrm{ext}}(t)$")
+    axes[1].set_ylabel(r"$V(x_t)$")
+
+    ax = axes[2]
+    ax.fill_between(t, 0, data["trigger_fraction"], color=RED, alpha=0.25, lw=0)
+    ax.plot(t, data["trigger_fraction"], color=RED, lw=1.4)
+    ax.set_ylim(0, 1)
+    ax.set_ylabel("Trigger active\n(share of paths)")
+    ax.set_xlabel(r"Time $t$ (months)")
+    lo, mid, hi = np.percentile(data["time_below"], [5, 50, 95])
+    ax.text(0.99, 0.92, f"Months below threshold:\nmedian {mid:.1f} (90% {lo:.1f}–{hi:.1f})",
+            transform=ax.transAxes, fontsize=8, va="top", ha="right")
+
+    fig.tight_layout()
+    _save(fig, out_dir, "fig_welfare_ensemble", formats)
+    plt.close(fig)
+    print("fig_welfare_ensemble saved.")
+
+
+# experiment -> (figure name, plot function)
+FIGURES = {
+    "convergence": ("fig_convergence", plot_fig1),
+    "ranking": ("fig_ranking_divergence", plot_fig2),
+    "ranking_surface": ("fig_ranking_surface", plot_fig2b),
+    "welfare": ("fig_welfare_trajectory", plot_fig3),
+    "welfare_ensemble": ("fig_welfare_ensemble", plot_fig4),
+}
+
+
+def plot_version():
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+
+def render_key(experiment, params, seed, formats=FORMATS):
+    """Hash of everything a figure depends on: its data, this file and the formats"""
+    from experiments import cache_key
+    payload = json.dumps([cache_key(experiment, params, seed), plot_version(), list(formats)])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def run_experiment(experiment, overrides=None, seed=None, cache_dir=CACHE_DIR,
+                   out_dir=FIGURE_DIR, formats=FORMATS, plot=True):
+    """
+    Compute (or load) one experiment and optionally draw its figure. Runs in
+    a worker process and returns a manifest record with per-stage timings.
+    """
+    from experiments import DEFAULT_SEED, cache_key, resolve_params, run
+    from result_cache import ResultCache
+
+    seed = DEFAULT_SEED if seed is None else seed
+    params = resolve_params(experiment, overrides)
+    key = cache_key(experiment, params, seed)
+    cache = ResultCache(cache_dir) if cache_dir else None
+    record = {
+        "experiment": experiment,
+        "params": params,
+        "cache_key": key,
+        "cache_path": str(cache.path(key)) if cache else None,
+        "cache_hit": bool(cache and cache.path(key).exists()),
+    }
+
+    t0 = time.perf_counter()
+    data = run(experiment, overrides, seed=seed, cache=cache)
+    record["compute_seconds"] = time.perf_counter() - t0
+
+    if plot:
+        figure, plot_fn = FIGURES[experiment]
+        t0 = time.perf_counter()
+        plot_fn(data, params, out_dir, formats)
+        record["render_seconds"] = time.perf_counter() - t0
+        record["outputs"] = [os.path.join(out_dir, f"{figure}.{fmt}") for fmt in formats]
+    return record
+
+
+def run_pipeline(experiments=tuple(FIGURES), overrides=None, seed=None, out_dir=FIGURE_DIR,
+                 formats=FORMATS, cache_dir=CACHE_DIR, workers=None, plot=True, force=False):
+    """
+    Run the given experiments in parallel processes and return one manifest
+    record per experiment. When plotting, figures whose inputs are unchanged
+    since the last render (and whose files are still present) are skipped.
+    """
+    from experiments import DEFAULT_SEED, resolve_params
+
+    seed = DEFAULT_SEED if seed is None else seed
+    overrides = overrides or {}
+    records = {}
+    jobs = list(experiments)
+
+    if plot:
+        os.makedirs(out_dir, exist_ok=True)
+        stamp_path = Path(out_dir) / _STAMP_FILE
+        stamps = json.loads(stamp_path.read_text()) if stamp_path.exists() else {}
+        keys = {
+            name: render_key(name, resolve_params(name, overrides.get(name)), seed, formats)
+            for name in jobs
+        }
+        for name in experiments:
+            figure = FIGURES[name][0]
+            fresh = stamps.get(figure) == keys[name] and all(
+                os.path.exists(os.path.join(out_dir, f"{figure}.{fmt}")) for fmt in formats
+            )
+            if fresh and not force:
+                print(f"{figure} up to date.")
+                records[name] = {"experiment": name, "params": resolve_params(name, overrides.get(name)),
+                                 "skipped": "up to date"}
+                jobs.remove(name)
+
+    args = [(name, overrides.get(name), seed, cache_dir, out_dir, formats, plot) for name in jobs]
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        # Not worth a process pool; keeps single-experiment batch jobs lean
+        results = [run_experiment(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_experiment, *zip(*args)))
+
+    for record in results:
+        records[record["experiment"]] = record
+        if plot:
+            stamps[FIGURES[record["experiment"]][0]] = keys[record["experiment"]]
+    if plot and results:
+        stamp_path.write_text(json.dumps(stamps, indent=2, sort_keys=True))
+    return [records[name] for name in experiments]
+
+
+# ------------------------------------------------------------------ #
+# Command line
+# ------------------------------------------------------------------ #
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _parse_overrides(specs, experiments, parser):
+    """[EXPERIMENT.]NAME=VALUE; without a prefix it applies to every selected experiment that has NAME"""
+    from experiments import EXPERIMENTS
+
+    overrides = {name: {} for name in experiments}
+    for spec in specs:
+        target, sep, value = spec.partition("=")
+        if not sep:
+            parser.error(f"--set expects [EXPERIMENT.]NAME=VALUE, got '{spec}'")
+        scope, _, key = target.rpartition(".")
+        names = [scope] if scope else [n for n in experiments if key in EXPERIMENTS[n].defaults]
+        if scope and scope not in experiments:
+            parser.error(f"--set {spec}: experiment '{scope}' is not selected")
+        if not names or any(key not in EXPERIMENTS[n].defaults for n in names):
+            parser.error(f"--set {spec}: no selected experiment has a parameter '{key}'")
+        for name in names:
+            overrides[name][key] = _parse_value(value)
+    return overrides
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    parser = argparse.ArgumentParser(
+        description="Simulations and figures for the EHD paper.",
+        epilog="Experiments: " + ", ".join(FIGURES),
+    )
+    parser.add_argument("experiments", nargs="*", metavar="EXPERIMENT",
+                        help="experiments to run (default: all)")
+    parser.add_argument("-s", "--set", action="append", default=[], metavar="[EXPERIMENT.]NAME=VALUE",
+                        help="override a parameter (repeatable)")
+    parser.add_argument("--seed", type=int, default=None, help="root seed (default: 42)")
+    parser.add_argument("--out-dir", default=FIGURE_DIR, help="figure directory (default: %(default)s)")
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help="comma-separated figure formats (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per experiment, up to the CPU count)")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="compute and cache results only; never imports matplotlib")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="result cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the result cache")
+    parser.add_argument("--force", action="store_true", help="re-render figures even if up to date")
+    parser.add_argument("--manifest", default=None,
+                        help="run manifest path (default: <out-dir>/run-manifest.json)")
+    parser.add_argument("--list", action="store_true", help="list experiments and their parameters")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.experiments if name not in FIGURES]
+    if unknown:
+        parser.error(f"unknown experiment(s): {', '.join(unknown)} (choose from {', '.join(FIGURES)})")
+    experiments = args.experiments or list(FIGURES)
+
+    import_start = time.perf_counter()
+    import numpy as np
+    from experiments import CODE_VERSION, DEFAULT_SEED, EXPERIMENTS
+    import_seconds = time.perf_counter() - import_start
+
+    if args.list:
+        for name in experiments:
+            print(f"{name} ({FIGURES[name][0]})")
+            for key, value in EXPERIMENTS[name].defaults.items():
+                print(f"    {key} = {value}")
+        return None
+
+    overrides = _parse_overrides(args.set, experiments, parser)
+    formats = tuple(fmt for fmt in args.formats.split(",") if fmt)
+    seed = DEFAULT_SEED if args.seed is None else args.seed
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    print("Running EHD experiments: " + ", ".join(experiments))
+    run_start = time.perf_counter()
+    records = run_pipeline(experiments, overrides, seed, args.out_dir, formats, cache_dir,
+                           args.workers, plot=not args.no_plot, force=args.force)
+    run_seconds = time.perf_counter() - run_start
+
+    for record in records:
+        if "skipped" in record:
+            continue
+        line = f"{record['experiment']}: {'cached' if record['cache_hit'] else 'computed'} " \
+               f"in {record['compute_seconds']:.2f}s"
+        if "render_seconds" in record:
+            line += f", rendered in {record['render_seconds']:.2f}s"
+        print(line)
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "argv": sys.argv[1:] if argv is None else list(argv),
+        "seed": seed,
+        "plot": not args.no_plot,
+        "out_dir": args.out_dir,
+        "formats": list(formats),
+        "cache_dir": cache_dir,
+        "versions": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "code": CODE_VERSION,
+            "plot": plot_version(),
+        },
+        "timings": {
+            "import_seconds": import_seconds,
+            "run_seconds": run_seconds,
+            "total_seconds": time.perf_counter() - started,
+        },
+        "experiments": records,
+    }
+    manifest_path = args.manifest or os.path.join(args.out_dir, "run-manifest.json")
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Done in {manifest['timings']['total_seconds']:.2f}s. Manifest: {manifest_path}")
+    return manifest
+
 
 if __name__ == "__main__":
     main()
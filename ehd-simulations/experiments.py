@@ -0,0 +1,182 @@
+"""
+Numerical experiments behind the paper figures, without any plotting.
+
+Each experiment maps a parameter dict and a seed to a dict of NumPy arrays.
+run() caches those arrays on disk keyed by experiment name, parameters, seed
+and the source of the compute code, so re-rendering a figure after a styling
+change never repeats the simulation.
+"""
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from models import CONVERGENCE_DEFAULTS, RANKING_DEFAULTS, WELFARE_DEFAULTS, kl_gaussian, welfare_path
+from ranking_surface import evaluate_grid, flip_boundary
+from result_cache import ResultCache, source_version
+from robbins_monro import power_schedule, simulate_recalibration
+from seeding import experiment_rng
+from welfare_ensemble import ENSEMBLE_DEFAULTS, simulate_ensemble
+
+DEFAULT_SEED = 42
+
+_HERE = Path(__file__).resolve().parent
+
+# Results are invalidated whenever the code that produces them changes
+CODE_VERSION = source_version(
+    _HERE / "experiments.py", _HERE / "models.py", _HERE / "robbins_monro.py",
+    _HERE / "seeding.py", _HERE / "welfare_ensemble.py", _HERE / "ranking_surface.py",
+)
+
+
+# ------------------------------------------------------------------ #
+# Proposition 4: Robbins-Monro convergence
+# ------------------------------------------------------------------ #
+def convergence(p: Dict, rng) -> Dict[str, np.ndarray]:
+    N = int(p["N"])
+    result = simulate_recalibration(
+        mu_star=p["mu_star"], mu_0=p["mu_0"], sigma_obs=p["sigma_obs"],
+        K=int(p["K"]), N=N,
+        schedule=power_schedule(p["c"], p["alpha"]),
+        rng=rng,
+        percentiles=(10, 90),
+        keep_trajectories=N,
+    )
+    return {
+        "steps": result.steps,
+        "mean": result.mean,
+        "p10": result.percentiles[10],
+        "p90": result.percentiles[90],
+        "trajectories": result.trajectories,
+    }
+
+
+# ------------------------------------------------------------------ #
+# Proposition 5(ii): ranking divergence over a sweep of sigma2_b
+# ------------------------------------------------------------------ #
+def ranking(p: Dict, rng) -> Dict[str, np.ndarray]:
+    sigma2_b = np.linspace(p["sigma2_b_min"], p["sigma2_b_max"], int(p["sigma2_b_points"]))
+    sigma2_star = p["sigma_star"]**2
+    kl_a = kl_gaussian(p["mu_a"], p["sigma2_a"], p["mu_star"], sigma2_star)
+    kl_b = kl_gaussian(p["mu_b"], sigma2_b, p["mu_star"], sigma2_star)
+    ehd_a = (p["mu_a"] - p["mu_star"])**2
+    ehd_b = (p["mu_b"] - p["mu_star"])**2
+    return {
+        "delta_sigma2": sigma2_b - p["sigma2_a"],
+        "delta_kl": kl_a - kl_b,                                  # positive = EFE prefers a
+        "delta_ehd": np.full_like(sigma2_b, ehd_b - ehd_a),      # zero for equal means
+    }
+
+
+def ranking_surface(p: Dict, rng) -> Dict[str, np.ndarray]:
+    """Two 2-D slices of the ranking grid plus the EFE flip boundaries"""
+    sigma2 = np.geomspace(p["sigma2_min"], p["sigma2_max"], int(p["resolution"]))
+    mu_b = np.linspace(p["mu_b_min"], p["mu_b_max"], int(p["resolution"]))
+    mu_star, sigma_star = p["mu_star"], p["sigma_star"]
+
+    # Equal means, both variances free
+    variances = evaluate_grid({
+        "mu_a": np.atleast_1d(p["mu_a"]), "mu_b": np.atleast_1d(p["mu_a"]), "sigma2_a": sigma2,
+        "sigma2_b": sigma2, "sigma_star": np.atleast_1d(sigma_star),
+    }, mu_star)
+    var_lower, var_upper = flip_boundary(p["mu_a"], p["mu_a"], sigma2, sigma_star, mu_star)
+
+    # Fixed action a, b's mean and variance free
+    means = evaluate_grid({
+        "mu_a": np.atleast_1d(p["mu_a"]), "mu_b": mu_b, "sigma2_a": np.atleast_1d(p["sigma2_a"]),
+        "sigma2_b": sigma2, "sigma_star": np.atleast_1d(sigma_star),
+    }, mu_star)
+    mean_lower, mean_upper = flip_boundary(p["mu_a"], mu_b, p["sigma2_a"], sigma_star, mu_star)
+
+    return {
+        "sigma2": sigma2,
+        "mu_b": mu_b,
+        "variance_efe_margin": variances["efe_margin"].reshape(len(sigma2), len(sigma2)),
+        "variance_flip_lower": var_lower,
+        "variance_flip_upper": var_upper,
+        "mean_efe_margin": means["efe_margin"].reshape(len(mu_b), len(sigma2)),
+        "mean_ehd_margin": means["ehd_margin"].reshape(len(mu_b)),
+        "mean_divergent": means["divergent"].reshape(len(mu_b), len(sigma2)),
+        "mean_flip_lower": mean_lower,
+        "mean_flip_upper": mean_upper,
+    }
+
+
+# ------------------------------------------------------------------ #
+# Section 7: welfare trajectory
+# ------------------------------------------------------------------ #
+def welfare(p: Dict, rng) -> Dict[str, np.ndarray]:
+    return welfare_path(p, rng)
+
+
+def welfare_ensemble(p: Dict, rng) -> Dict[str, np.ndarray]:
+    result = simulate_ensemble(p, rng)
+    data = {
+        "t": result.t,
+        "mean_W_ext": result.mean_W_ext,
+        "mean_V": result.mean_V,
+        "trigger_fraction": result.trigger_fraction,
+        "time_below": result.time_below,
+        "first_trigger": result.first_trigger,
+    }
+    for q in result.W_ext:
+        data[f"W_ext_p{q}"] = result.W_ext[q]
+        data[f"V_p{q}"] = result.V[q]
+    return data
+
+
+class Experiment(NamedTuple):
+    compute: Callable[[Dict, object], Dict[str, np.ndarray]]
+    defaults: Dict
+
+
+EXPERIMENTS = {
+    "convergence": Experiment(convergence, CONVERGENCE_DEFAULTS),
+    "ranking": Experiment(ranking, {
+        **{k: v for k, v in RANKING_DEFAULTS.items() if k != "sigma2_b"},
+        "sigma2_b_min": 0.02,
+        "sigma2_b_max": 0.15,
+        "sigma2_b_points": 100,
+    }),
+    "ranking_surface": Experiment(ranking_surface, {
+        "mu_star": 0.50,
+        "sigma_star": 0.03,
+        "mu_a": 0.45,
+        "sigma2_a": 0.02,
+        "sigma2_min": 1e-4,
+        "sigma2_max": 0.15,
+        "mu_b_min": 0.30,
+        "mu_b_max": 0.70,
+        "resolution": 200,
+    }),
+    "welfare": Experiment(welfare, WELFARE_DEFAULTS),
+    "welfare_ensemble": Experiment(welfare_ensemble, ENSEMBLE_DEFAULTS),
+}
+
+
+def resolve_params(name: str, overrides: Optional[Dict] = None) -> Dict:
+    return {**EXPERIMENTS[name].defaults, **(overrides or {})}
+
+
+def cache_key(name: str, params: Dict, seed: int) -> str:
+    return ResultCache.key(name, params, seed, CODE_VERSION)
+
+
+def run(
+    name: str,
+    overrides: Optional[Dict] = None,
+    seed: int = DEFAULT_SEED,
+    cache: Optional[ResultCache] = None,
+) -> Dict[str, np.ndarray]:
+    """Results of one experiment, from the cache when available"""
+    params = resolve_params(name, overrides)
+    key = cache_key(name, params, seed)
+    if cache is not None:
+        cached = cache.load(key)
+        if cached is not None:
+            return cached
+
+    data = EXPERIMENTS[name].compute(params, experiment_rng(name, seed))
+    if cache is not None:
+        cache.save(key, data)
+    return data
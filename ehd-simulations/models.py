@@ -0,0 +1,176 @@
+"""
+Parameterised simulation models for sweeps.
+
+Each model takes a dict of parameters (missing keys fall back to the values
+used for the paper figures) and an optional np.random.Generator, and returns
+a flat dict of scalar outputs.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from robbins_monro import power_schedule, simulate_recalibration
+
+
+def kl_gaussian(mu_q, sigma2_q, mu_p, sigma2_p):
+    return 0.5 * (
+        (mu_q - mu_p)**2 / sigma2_p
+        + sigma2_q / sigma2_p
+        - 1
+        - np.log(sigma2_q / sigma2_p)
+    )
+
+
+# ------------------------------------------------------------------ #
+# Proposition 4: Robbins-Monro convergence
+# ------------------------------------------------------------------ #
+CONVERGENCE_DEFAULTS = {
+    "mu_star": 0.35,
+    "mu_0": 0.60,
+    "sigma_obs": 0.05,
+    "c": 0.5,
+    "alpha": 0.75,
+    "K": 200,
+    "N": 50,
+    "tol": 0.01,
+}
+
+
+def convergence_model(params: Dict, rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+    p = {**CONVERGENCE_DEFAULTS, **params}
+    result = simulate_recalibration(
+        mu_star=p["mu_star"], mu_0=p["mu_0"], sigma_obs=p["sigma_obs"],
+        K=int(p["K"]), N=int(p["N"]),
+        schedule=power_schedule(p["c"], p["alpha"]),
+        rng=rng,
+        percentiles=(10, 90),
+    )
+    error = np.abs(result.mean - p["mu_star"])
+    # First visit count after which the mean estimate stays within tol (-1: never)
+    outside = np.nonzero(error >= p["tol"])[0]
+    if not outside.size:
+        settle = 0
+    elif outside[-1] + 1 < len(error):
+        settle = result.steps[outside[-1] + 1]
+    else:
+        settle = -1
+    return {
+        "final_mean": float(result.mean[-1]),
+        "final_p10": float(result.percentiles[10][-1]),
+        "final_p90": float(result.percentiles[90][-1]),
+        "final_rmse": float(np.sqrt(np.mean((result.final - p["mu_star"])**2))),
+        "abs_error": float(error[-1]),
+        "settle_step": int(settle),
+    }
+
+
+# ------------------------------------------------------------------ #
+# Proposition 5(ii): ranking divergence EHD vs EFE
+# ------------------------------------------------------------------ #
+RANKING_DEFAULTS = {
+    "mu_star": 0.50,
+    "sigma_star": 0.03,
+    "mu_a": 0.45,
+    "mu_b": 0.45,
+    "sigma2_a": 0.02,
+    "sigma2_b": 0.08,
+}
+
+
+def ranking_model(params: Dict, rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+    """
+    EFE ranks actions by the KL divergence of the predicted outcome from the
+    preferred distribution; the EHD pragmatic term depends on the predicted
+    means only (squared distance to mu_star), so it is blind to variance.
+    """
+    p = {**RANKING_DEFAULTS, **params}
+    sigma2_star = p["sigma_star"]**2
+    kl_a = float(kl_gaussian(p["mu_a"], p["sigma2_a"], p["mu_star"], sigma2_star))
+    kl_b = float(kl_gaussian(p["mu_b"], p["sigma2_b"], p["mu_star"], sigma2_star))
+    delta_kl = kl_a - kl_b
+    delta_ehd = (p["mu_b"] - p["mu_star"])**2 - (p["mu_a"] - p["mu_star"])**2
+    # Positive preference = the method ranks a above b
+    efe_pref = float(np.sign(-delta_kl))
+    ehd_pref = float(np.sign(delta_ehd))
+    return {
+        "kl_a": kl_a,
+        "kl_b": kl_b,
+        "delta_kl": delta_kl,
+        "delta_ehd": delta_ehd,
+        "rank_divergent": int(efe_pref != ehd_pref),
+    }
+
+
+# ------------------------------------------------------------------ #
+# Section 7: welfare trajectory
+# ------------------------------------------------------------------ #
+WELFARE_DEFAULTS = {
+    "months": 24,
+    "trend_amp": 0.08,
+    "trend_offset": 0.04,
+    "noise_sd": 0.01,
+    "ema_weight": 0.3,
+    "steepness": 3.0,
+    "theta_ext": 0.45,
+    "t_action": 3,
+    "hope_level": 0.62,
+    "hope_decay": 0.08,
+    "t_recover": 16,
+    "hope_bonus": 0.03,
+    "p1": 0.42,
+    "theta": 0.50,
+}
+
+
+def welfare_path(p: Dict, rng: Optional[np.random.Generator] = None) -> Dict[str, np.ndarray]:
+    """One realization of the Section 7 model on a monthly grid"""
+    rng = rng if rng is not None else np.random.default_rng()
+    t = np.arange(0, int(p["months"]) + 1, dtype=float)
+
+    noise = rng.normal(0, p["noise_sd"], len(t))
+    g_raw = p["trend_amp"] * np.sin(2 * np.pi * t / 24) + p["trend_offset"] + noise
+    g_smooth = np.zeros_like(g_raw)
+    g_smooth[0] = g_raw[0]
+    w = p["ema_weight"]
+    for i in range(1, len(t)):
+        g_smooth[i] = w * g_raw[i] + (1 - w) * g_smooth[i - 1]
+
+    W_ext = 1 / (1 + np.exp(p["steepness"] * g_smooth))
+
+    B = np.select(
+        [t < p["t_action"], t == p["t_action"], t < p["t_recover"]],
+        [W_ext, p["hope_level"], p["hope_level"] * np.exp(-p["hope_decay"] * (t - p["t_action"]))],
+        default=W_ext + p["hope_bonus"],
+    )
+
+    x2 = 0.80 * np.exp(-0.02 * t)
+    x2[6:] += 0.12 * np.exp(-0.02 * (t[6:] - 6))
+    x2 = np.clip(x2, 0, 1)
+    x3 = 0.72 * np.exp(-0.01 * t)
+
+    x1 = 0.70 * W_ext + 0.20 * B + 0.10 * p["p1"]
+    V = 0.55 * x1 + 0.25 * x2 + 0.20 * x3
+    return {"t": t, "W_ext": W_ext, "B": B, "x2": x2, "x3": x3, "V": V}
+
+
+def welfare_model(params: Dict, rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+    p = {**WELFARE_DEFAULTS, **params}
+    path = welfare_path(p, rng)
+    below = path["W_ext"] < p["theta_ext"]
+    triggered = np.nonzero(below)[0]
+    return {
+        "months_below_theta_ext": int(below.sum()),
+        "first_trigger": float(path["t"][triggered[0]]) if triggered.size else -1.0,
+        "min_w_ext": float(path["W_ext"].min()),
+        "mean_v": float(path["V"].mean()),
+        "min_v": float(path["V"].min()),
+        "final_v": float(path["V"][-1]),
+        "months_v_below_theta": int((path["V"] < p["theta"]).sum()),
+    }
+
+
+MODELS = {
+    "convergence": (convergence_model, CONVERGENCE_DEFAULTS),
+    "ranking": (ranking_model, RANKING_DEFAULTS),
+    "welfare": (welfare_model, WELFARE_DEFAULTS),
+}
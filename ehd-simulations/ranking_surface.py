@@ -0,0 +1,208 @@
+"""
+Batched EHD vs EFE ranking differences over dense parameter grids (Proposition 5).
+
+For two actions a and b with Gaussian predicted outcomes N(mu, sigma2) and a
+preferred outcome N(mu_star, sigma_star**2):
+
+    efe_margin = KL(b) - KL(a)                           > 0: EFE prefers a
+    ehd_margin = (mu_b - mu_star)**2 - (mu_a - mu_star)**2  > 0: EHD prefers a
+
+and the rankings diverge wherever the two signs differ. evaluate_grid() covers
+the full mu_a x mu_b x sigma2_a x sigma2_b x sigma_star grid by broadcasting
+over memory-bounded chunks, optionally straight into .npy memmaps so 10**8
+point grids never sit in RAM. flip_boundary() gives the sigma2_b values where
+the EFE ranking flips, in closed form via the Lambert W function.
+
+    python ranking_surface.py --mu-a 0.3:0.7:50 --mu-b 0.3:0.7:50 --sigma2-a 1e-4:0.15:200 \\
+        --sigma2-b 1e-4:0.15:200 --sigma-star 0.01:0.05:5 --out surfaces/dense
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from models import kl_gaussian
+
+AXES = ("mu_a", "mu_b", "sigma2_a", "sigma2_b", "sigma_star")
+
+# Points evaluated per chunk; a chunk holds a few float64 temporaries of this size
+DEFAULT_CHUNK_POINTS = 2**22
+
+
+def efe_margin(mu_a, mu_b, sigma2_a, sigma2_b, sigma_star, mu_star):
+    """KL(b) - KL(a) against N(mu_star, sigma_star**2); broadcasts"""
+    s2 = sigma_star**2
+    return 0.5 * (
+        ((mu_b - mu_star)**2 - (mu_a - mu_star)**2) / s2
+        + (sigma2_b - sigma2_a) / s2
+        - np.log(sigma2_b / sigma2_a)
+    )
+
+
+def ehd_margin(mu_a, mu_b, mu_star):
+    """Squared-distance pragmatic score of a minus that of b, sign flipped; broadcasts"""
+    return (mu_b - mu_star)**2 - (mu_a - mu_star)**2
+
+
+def _chunk_layout(sizes, chunk_points):
+    """Split axes into leading ones walked in row blocks and trailing ones broadcast whole"""
+    split, inner = len(sizes), 1
+    while split > 0 and inner * sizes[split - 1] <= chunk_points:
+        split -= 1
+        inner *= sizes[split]
+    return split, inner, max(1, chunk_points // inner)
+
+
+def evaluate_grid(
+    axes: Dict[str, np.ndarray],
+    mu_star: float,
+    out_dir: Optional[str] = None,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+) -> Dict[str, np.ndarray]:
+    """
+    Margins and divergence flags at every point of the grid spanned by `axes`
+    (one 1-D array per name in AXES, in AXES order).
+
+    Returns efe_margin (float32, full grid), divergent (bool, full grid) and
+    ehd_margin (float64, mu_a x mu_b only, since it ignores the variances).
+    With out_dir the full-grid arrays are .npy memmaps written there and the
+    directory can be reopened with load_surface().
+    """
+    values = [np.asarray(axes[name], dtype=np.float64) for name in AXES]
+    sizes = [len(v) for v in values]
+    ehd = ehd_margin(values[0][:, None], values[1][None, :], mu_star)
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        efe = np.lib.format.open_memmap(os.path.join(out_dir, "efe_margin.npy"), "w+", np.float32, tuple(sizes))
+        divergent = np.lib.format.open_memmap(os.path.join(out_dir, "divergent.npy"), "w+", np.bool_, tuple(sizes))
+    else:
+        efe = np.empty(sizes, dtype=np.float32)
+        divergent = np.empty(sizes, dtype=bool)
+
+    split, inner, rows = _chunk_layout(sizes, chunk_points)
+    outer_shape = sizes[:split]
+    n_outer = int(np.prod(outer_shape))
+    trailing = len(sizes) - split
+    # Trailing axes broadcast as (1, ..., n_k, ...); leading ones vary per row
+    fixed = {
+        i: values[i].reshape([1] + [sizes[i] if j == i else 1 for j in range(split, len(sizes))])
+        for i in range(split, len(sizes))
+    }
+    efe_rows = efe.reshape(n_outer, inner)
+    div_rows = divergent.reshape(n_outer, inner)
+
+    for start in range(0, n_outer, rows):
+        stop = min(start + rows, n_outer)
+        index = np.unravel_index(np.arange(start, stop), outer_shape) if split else ()
+        args = [
+            values[i][index[i]].reshape((-1,) + (1,) * trailing) if i < split else fixed[i]
+            for i in range(len(sizes))
+        ]
+        mu_a, mu_b, sigma2_a, sigma2_b, sigma_star = args
+        margin = efe_margin(mu_a, mu_b, sigma2_a, sigma2_b, sigma_star, mu_star)
+        margin = np.broadcast_to(margin, (stop - start,) + tuple(sizes[split:]))
+        ehd_chunk = ehd_margin(mu_a, mu_b, mu_star)
+        efe_rows[start:stop] = margin.reshape(stop - start, inner)
+        div_rows[start:stop] = (np.sign(margin) != np.sign(ehd_chunk)).reshape(stop - start, inner)
+
+    if out_dir is not None:
+        efe.flush()
+        divergent.flush()
+        np.savez(
+            os.path.join(out_dir, "axes.npz"),
+            mu_star=mu_star, ehd_margin=ehd, **dict(zip(AXES, values))
+        )
+    return {"efe_margin": efe, "divergent": divergent, "ehd_margin": ehd}
+
+
+def load_surface(out_dir: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """Reopen a grid written by evaluate_grid(out_dir=...)"""
+    mode = "r" if mmap else None
+    with np.load(os.path.join(out_dir, "axes.npz")) as meta:
+        surface = {name: meta[name] for name in meta.files}
+    surface["efe_margin"] = np.load(os.path.join(out_dir, "efe_margin.npy"), mmap_mode=mode)
+    surface["divergent"] = np.load(os.path.join(out_dir, "divergent.npy"), mmap_mode=mode)
+    return surface
+
+
+def flip_boundary(mu_a, mu_b, sigma2_a, sigma_star, mu_star) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The sigma2_b values at which EFE is indifferent between a and b; broadcasts.
+
+    With x = sigma2_b / sigma_star**2, KL(b) = KL(a) reduces to x - log(x) = c,
+    solved by x = -W_k(-exp(-c)): branch 0 gives the root below sigma_star**2
+    and branch -1 the one above. Returns (lower, upper), NaN where b can never
+    tie with a (c < 1).
+    """
+    from scipy.special import lambertw
+
+    s2 = np.asarray(sigma_star, dtype=np.float64)**2
+    kl_a = kl_gaussian(mu_a, sigma2_a, mu_star, s2)
+    c = np.asarray(2 * kl_a + 1 - (np.asarray(mu_b) - mu_star)**2 / s2, dtype=np.float64)
+    solvable = c >= 1
+    z = -np.exp(-np.where(solvable, c, 1.0))
+    lower = np.array(-lambertw(z, 0).real)
+    upper = np.array(-lambertw(z, -1).real)
+
+    # exp(-c) underflows for very large c; Newton on x - log(x) = c from the
+    # asymptotic guess x ~ c + log(c), where the derivative is close to 1
+    lost = solvable & ~np.isfinite(upper)
+    if lost.any():
+        x = c[lost] + np.log(c[lost])
+        for _ in range(6):
+            x -= (x - np.log(x) - c[lost]) / (1 - 1 / x)
+        upper[lost] = x
+        lower[lost] = 0.0
+
+    lower = np.where(solvable, lower * s2, np.nan)
+    upper = np.where(solvable, upper * s2, np.nan)
+    return lower, upper
+
+
+def _parse_axis(spec: str) -> np.ndarray:
+    """lo:hi:n for n points (log-spaced when prefixed with log:), or a single value"""
+    log = spec.startswith("log:")
+    parts = [float(v) for v in spec[4 if log else 0:].split(":")]
+    if len(parts) == 1:
+        return np.array(parts)
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"Expected lo:hi:n, got '{spec}'")
+    lo, hi, n = parts
+    return np.geomspace(lo, hi, int(n)) if log else np.linspace(lo, hi, int(n))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dense EHD vs EFE ranking-divergence grids")
+    for name, default in (("mu_a", "0.3:0.7:50"), ("mu_b", "0.3:0.7:50"),
+                          ("sigma2_a", "log:1e-4:0.15:100"), ("sigma2_b", "log:1e-4:0.15:100"),
+                          ("sigma_star", "0.03")):
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=_parse_axis, default=_parse_axis(default),
+                            metavar="[log:]LO:HI:N")
+    parser.add_argument("--mu-star", type=float, default=0.50)
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--chunk-points", type=int, default=DEFAULT_CHUNK_POINTS)
+    args = parser.parse_args(argv)
+
+    axes = {name: getattr(args, name) for name in AXES}
+    points = int(np.prod([len(v) for v in axes.values()]))
+    t0 = time.perf_counter()
+    surface = evaluate_grid(axes, args.mu_star, args.out, args.chunk_points)
+    elapsed = time.perf_counter() - t0
+
+    summary = {
+        "points": points,
+        "seconds": round(elapsed, 3),
+        "points_per_second": points / elapsed,
+        "divergent_share": float(surface["divergent"].mean(dtype=np.float64)),
+    }
+    with open(os.path.join(args.out, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+On-disk cache of experiment results.
+
+Entries are NPZ files named by a hash of the experiment name, its parameters,
+the seed and a code version string. Writes go to a temporary file and are
+renamed into place, so concurrent workers never read a partial entry.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def source_version(*paths) -> str:
+    """Short digest of the given source files plus the NumPy version"""
+    digest = hashlib.sha256(np.__version__.encode())
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    def __init__(self, root: str = ".cache"):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(name: str, params: Dict, seed: int, version: str) -> str:
+        payload = json.dumps(
+            {"name": name, "params": params, "seed": seed, "version": version},
+            sort_keys=True
+        )
+        return f"{name}-{hashlib.sha256(payload.encode()).hexdigest()[:16]}"
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self.path(key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                return {name: data[name] for name in data.files}
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
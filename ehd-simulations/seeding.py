@@ -0,0 +1,50 @@
+"""
+Random streams for the EHD simulations.
+
+Every stream derives from one root seed. Each experiment gets its own
+SeedSequence child, keyed by a stable hash of the experiment name, so its
+numbers do not depend on which other experiments ran before it or in which
+process. Work that is split into chunks takes one PCG64 substream per chunk,
+each one jump (about 2**127 draws) past the previous, so chunks never overlap
+and the result depends on the chunk layout only, not on the worker count.
+
+    rng = experiment_rng("welfare", seed=42)
+    streams = chunk_rngs("welfare", seed=42, n_chunks=8)
+"""
+import zlib
+from typing import List
+
+import numpy as np
+
+
+def name_key(name: str) -> int:
+    """Stable 32-bit spawn key for an experiment name"""
+    return zlib.crc32(name.encode())
+
+
+def seed_sequence(seed: int, *key: int) -> np.random.SeedSequence:
+    """Child of the root SeedSequence(seed) at the given spawn key"""
+    return np.random.SeedSequence(seed, spawn_key=tuple(key))
+
+
+def make_rng(seed_seq: np.random.SeedSequence) -> np.random.Generator:
+    return np.random.Generator(np.random.PCG64(seed_seq))
+
+
+def experiment_rng(name: str, seed: int, *key: int) -> np.random.Generator:
+    """Generator for one experiment; extra key entries select sub-experiments"""
+    return make_rng(seed_sequence(seed, name_key(name), *key))
+
+
+def jumped_rngs(rng: np.random.Generator, n: int) -> List[np.random.Generator]:
+    """
+    n non-overlapping substreams of rng, starting from its current state.
+    Substream 0 replays rng itself, so do not also draw from rng.
+    """
+    return [np.random.Generator(rng.bit_generator.jumped(i)) for i in range(n)]
+
+
+def chunk_rngs(name: str, seed: int, n_chunks: int, *key: int) -> List[np.random.Generator]:
+    """n_chunks non-overlapping substreams of experiment_rng(name, seed, *key)"""
+    return jumped_rngs(experiment_rng(name, seed, *key), n_chunks)
+
@@ -0,0 +1,215 @@
+"""
+Parallel parameter sweeps over the simulation models in models.py.
+
+A sweep evaluates one model at every point of a grid or random design. Point
+i always draws from its own Generator, experiment_rng(model, seed, i), so
+results are bit-for-bit identical whatever the worker count or chunking.
+Points are evaluated in fixed-size chunks across a process pool and each
+finished chunk is written atomically as out_dir/part-NNNNN.npz; re-running the
+same sweep skips chunks already on disk. The shards are then merged into one
+columnar file (results.npz, or Parquet when pyarrow is installed and the
+output name ends in .parquet).
+
+    python sweep.py convergence --grid sigma_obs=0.01,0.05,0.1 --grid alpha=0.6,0.75,0.9 --out sweeps/conv
+    python sweep.py welfare --random 1000 --bounds theta_ext=0.35:0.55 --bounds noise_sd=0:0.03 --out sweeps/welfare
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import MODELS
+from seeding import experiment_rng
+
+MANIFEST = "sweep.json"
+DEFAULT_CHUNK_SIZE = 64
+
+
+def grid(**axes: Sequence[float]) -> List[Dict[str, float]]:
+    """Cartesian product of the given parameter values, last axis fastest"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def random_design(n: int, bounds: Dict[str, Tuple[float, float]], seed: int = 0) -> List[Dict[str, float]]:
+    """n points drawn uniformly inside the given (low, high) bounds"""
+    rng = experiment_rng("design", seed)
+    names = list(bounds)
+    low = np.array([bounds[k][0] for k in names], dtype=float)
+    high = np.array([bounds[k][1] for k in names], dtype=float)
+    samples = rng.uniform(low, high, size=(n, len(names)))
+    return [dict(zip(names, row.tolist())) for row in samples]
+
+
+def spec_hash(spec: Dict) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _shard_path(out_dir: str, chunk: int) -> str:
+    return os.path.join(out_dir, f"part-{chunk:05d}.npz")
+
+
+def run_chunk(model: str, points: List[Dict[str, float]], start: int, seed: int) -> Dict[str, np.ndarray]:
+    """Evaluate points[start:] as design indices start, start+1, ..."""
+    fn, _ = MODELS[model]
+    rows = [fn(p, experiment_rng(model, seed, start + j)) for j, p in enumerate(points)]
+    columns = {"point": np.arange(start, start + len(points), dtype=np.int64)}
+    for name in points[0]:
+        columns[f"param_{name}"] = np.array([p[name] for p in points], dtype=float)
+    for name in rows[0]:
+        columns[name] = np.array([r[name] for r in rows])
+    return columns
+
+
+def _write_shard(path: str, columns: Dict[str, np.ndarray]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp, path)
+
+
+def _run_and_write(model, points, start, seed, path) -> str:
+    _write_shard(path, run_chunk(model, points, start, seed))
+    return path
+
+
+def run_sweep(
+    model: str,
+    points: List[Dict[str, float]],
+    out_dir: str,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> str:
+    """
+    Evaluate every point, resuming from shards already in out_dir, and merge
+    them into out_dir/results.npz. Returns the merged file path.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}' (expected one of {sorted(MODELS)})")
+    if not points:
+        raise ValueError("Sweep has no design points")
+    os.makedirs(out_dir, exist_ok=True)
+
+    spec = {"model": model, "seed": seed, "chunk_size": chunk_size, "points": points}
+    digest = spec_hash(spec)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            existing = json.load(f)
+        if existing.get("hash") != digest:
+            raise ValueError(
+                f"{out_dir} holds a different sweep (hash {existing.get('hash')}); "
+                f"use a new output directory"
+            )
+    else:
+        with open(manifest_path, "w") as f:
+            json.dump({**spec, "hash": digest}, f, indent=2)
+
+    chunks = range(0, len(points), chunk_size)
+    pending = [
+        (i // chunk_size, i) for i in chunks
+        if not os.path.exists(_shard_path(out_dir, i // chunk_size))
+    ]
+    print(f"{model}: {len(points)} points, {len(chunks)} chunks, {len(pending)} to run")
+
+    if pending:
+        if workers == 1:
+            for chunk, start in pending:
+                _run_and_write(model, points[start:start + chunk_size], start, seed,
+                               _shard_path(out_dir, chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_run_and_write, model, points[start:start + chunk_size],
+                                start, seed, _shard_path(out_dir, chunk))
+                    for chunk, start in pending
+                ]
+                for done, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    print(f"  {done}/{len(pending)} chunks done")
+
+    return collect(out_dir, len(chunks))
+
+
+def collect(out_dir: str, n_chunks: int, output: str = "results.npz") -> str:
+    """Concatenate the chunk shards in point order into one columnar file"""
+    columns: Dict[str, List[np.ndarray]] = {}
+    for chunk in range(n_chunks):
+        with np.load(_shard_path(out_dir, chunk)) as shard:
+            for name in shard.files:
+                columns.setdefault(name, []).append(shard[name])
+    merged = {name: np.concatenate(parts) for name, parts in columns.items()}
+
+    path = os.path.join(out_dir, output)
+    if output.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(merged), path)
+    else:
+        _write_shard(path, merged)
+    print(f"Results written to {path}")
+    return path
+
+
+def _parse_values(spec: str) -> Tuple[str, List[float]]:
+    name, _, values = spec.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"Expected name=v1,v2,... got '{spec}'")
+    return name, [float(v) for v in values.split(",")]
+
+
+def _parse_bounds(spec: str) -> Tuple[str, Tuple[float, float]]:
+    name, _, values = spec.partition("=")
+    low, sep, high = values.partition(":")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected name=low:high, got '{spec}'")
+    return name, (float(low), float(high))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parameter sweeps over the EHD simulation models")
+    parser.add_argument("model", choices=sorted(MODELS))
+    parser.add_argument("--grid", type=_parse_values, action="append", default=[],
+                        metavar="NAME=V1,V2,...", help="grid axis (repeatable)")
+    parser.add_argument("--random", type=int, metavar="N",
+                        help="draw N uniform design points instead of a grid")
+    parser.add_argument("--bounds", type=_parse_bounds, action="append", default=[],
+                        metavar="NAME=LOW:HIGH", help="random design bounds (repeatable)")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--format", choices=["npz", "parquet"], default="npz")
+    args = parser.parse_args(argv)
+
+    defaults = MODELS[args.model][1]
+    for name, _ in args.grid + args.bounds:
+        if name not in defaults:
+            parser.error(f"'{name}' is not a parameter of {args.model} ({', '.join(defaults)})")
+
+    if args.random:
+        if not args.bounds:
+            parser.error("--random needs at least one --bounds")
+        points = random_design(args.random, dict(args.bounds), seed=args.seed)
+    elif args.grid:
+        points = grid(**dict(args.grid))
+    else:
+        points = [{}]
+
+    path = run_sweep(args.model, points, args.out, seed=args.seed,
+                     workers=args.workers, chunk_size=args.chunk_size)
+    if args.format == "parquet":
+        n_chunks = -(-len(points) // args.chunk_size)
+        collect(args.out, n_chunks, output="results.parquet")
+    return path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Monte Carlo ensemble of the Section 7 welfare model.
+
+Simulates many noisy realizations of the external trend at once on any time
+grid (dt in months, e.g. 1/30 for daily steps). The exponential smoothing is
+one scipy.signal.lfilter call over all paths and the piecewise hope term is
+built from time masks, so a chunk of paths is a handful of array operations.
+
+Paths run in fixed-size chunks, each on its own jumped substream, optionally
+across a process pool. Every chunk reduces its paths to per-step counts over
+1000 fixed bins on [0, 1], a quantile sketch that resolves each band to
+0.001, so memory does not grow with the number of paths and the merged
+result is identical for any worker count.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from models import WELFARE_DEFAULTS
+from seeding import experiment_rng, jumped_rngs
+
+ENSEMBLE_DEFAULTS = {
+    **WELFARE_DEFAULTS,
+    "n_paths": 2000,
+    "dt": 1 / 30,
+    "chunk_size": 500,
+}
+
+BANDS = (5, 25, 50, 75, 95)
+
+# Resolution of the per-step quantile sketch over [0, 1]
+N_BINS = 1000
+
+# Month of the budget replenishment in the endocentric state
+_T_REPLENISH = 6
+
+
+def time_grid(months: float, dt: float) -> np.ndarray:
+    return np.arange(0, int(round(months / dt)) + 1) * dt
+
+
+def endocentric(t: np.ndarray):
+    """Deterministic budget x2 and knowledge x3 paths"""
+    x2 = 0.80 * np.exp(-0.02 * t)
+    after = t >= _T_REPLENISH
+    x2[after] += 0.12 * np.exp(-0.02 * (t[after] - _T_REPLENISH))
+    x2 = np.clip(x2, 0, 1)
+    x3 = 0.72 * np.exp(-0.01 * t)
+    return x2, x3
+
+
+def simulate_paths(p: Dict, t: np.ndarray, n_paths: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """(n_paths, len(t)) arrays of W_ext, B and V for one chunk of realizations"""
+    from scipy.signal import lfilter  # ~0.5 s to import; only paid when simulating
+
+    dt = t[1] - t[0] if len(t) > 1 else 1.0
+    noise = rng.normal(0, p["noise_sd"], size=(n_paths, len(t)))
+    g_raw = p["trend_amp"] * np.sin(2 * np.pi * t / 24) + p["trend_offset"] + noise
+
+    # g_s[i] = w g_raw[i] + (1 - w) g_s[i-1] with g_s[0] = g_raw[0]; the per-step
+    # weight keeps the smoothing's decay per month independent of dt
+    w = p["ema_weight"] if dt == 1 else 1 - (1 - p["ema_weight"]) ** dt
+    g_smooth, _ = lfilter([w], [1, -(1 - w)], g_raw, axis=1, zi=(1 - w) * g_raw[:, :1])
+
+    W_ext = 1 / (1 + np.exp(p["steepness"] * g_smooth))
+
+    # Hope term: tracks W_ext before the action, jumps to hope_level at
+    # t_action and decays until recovery, then tracks W_ext plus a bonus
+    hoping = (t >= p["t_action"]) & (t < p["t_recover"])
+    recovered = t >= p["t_recover"]
+    B = W_ext.copy()
+    B[:, hoping] = p["hope_level"] * np.exp(-p["hope_decay"] * (t[hoping] - p["t_action"]))
+    B[:, recovered] += p["hope_bonus"]
+
+    x2, x3 = endocentric(t)
+    x1 = 0.70 * W_ext + 0.20 * B + 0.10 * p["p1"]
+    V = 0.55 * x1 + 0.25 * x2 + 0.20 * x3
+    return {"W_ext": W_ext, "B": B, "V": V}
+
+
+def _bin_counts(values: np.ndarray) -> np.ndarray:
+    """(steps, N_BINS) counts of a (paths, steps) array over [0, 1]"""
+    steps = values.shape[1]
+    bins = np.clip((values * N_BINS).astype(np.int64), 0, N_BINS - 1)
+    index = bins + np.arange(steps) * N_BINS
+    return np.bincount(index.ravel(), minlength=steps * N_BINS).reshape(steps, N_BINS)
+
+
+def _run_chunk(p: Dict, t: np.ndarray, n_paths: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    paths = simulate_paths(p, t, n_paths, rng)
+    W_ext, V = paths["W_ext"], paths["V"]
+    below = W_ext < p["theta_ext"]
+    dt = t[1] - t[0] if len(t) > 1 else 1.0
+    first = np.where(below.any(axis=1), t[below.argmax(axis=1)], -1.0)
+    return {
+        "w_counts": _bin_counts(W_ext),
+        "v_counts": _bin_counts(V),
+        "w_sum": W_ext.sum(axis=0)[np.newaxis],
+        "v_sum": V.sum(axis=0)[np.newaxis],
+        "below": below.sum(axis=0),
+        "time_below": below.sum(axis=1) * dt,
+        "first_trigger": first,
+        "v_time_below": (V < p["theta"]).sum(axis=1) * dt,
+    }
+
+
+_COUNTS = ("w_counts", "v_counts", "below")
+_PER_CHUNK = ("w_sum", "v_sum")
+_PER_PATH = ("time_below", "first_trigger", "v_time_below")
+
+
+def _run_group(p: Dict, t: np.ndarray, sizes: Sequence[int], rngs: Sequence[np.random.Generator]) -> Dict[str, np.ndarray]:
+    """Run consecutive chunks in one process, merging their counts locally"""
+    chunks = [_run_chunk(p, t, n, rng) for n, rng in zip(sizes, rngs)]
+    out = {name: sum(c[name] for c in chunks) for name in _COUNTS}
+    out.update({name: np.concatenate([c[name] for c in chunks]) for name in _PER_CHUNK + _PER_PATH})
+    return out
+
+
+def _sketch_quantiles(counts: np.ndarray, qs: Sequence[float]) -> np.ndarray:
+    """(len(qs), steps) quantiles interpolated linearly within each bin"""
+    total = counts.sum(axis=1, keepdims=True)
+    cdf = np.cumsum(counts, axis=1)
+    out = np.empty((len(qs), counts.shape[0]))
+    for i, q in enumerate(qs):
+        target = q / 100 * total
+        b = np.minimum((cdf < target).sum(axis=1), N_BINS - 1)
+        below = np.take_along_axis(cdf, b[:, None], axis=1) - np.take_along_axis(counts, b[:, None], axis=1)
+        in_bin = np.take_along_axis(counts, b[:, None], axis=1)
+        frac = np.divide(target - below, in_bin, out=np.zeros_like(target, dtype=float), where=in_bin > 0)
+        out[i] = (b + frac[:, 0]) / N_BINS
+    return out
+
+
+@dataclass
+class WelfareEnsemble:
+    t: np.ndarray                       # time grid in months
+    W_ext: Dict[int, np.ndarray]        # band percentile -> W_ext at each step
+    V: Dict[int, np.ndarray]            # band percentile -> V at each step
+    mean_W_ext: np.ndarray
+    mean_V: np.ndarray
+    trigger_fraction: np.ndarray        # share of paths with W_ext < theta_ext at each step
+    time_below: np.ndarray              # (n_paths,) months with W_ext < theta_ext
+    first_trigger: np.ndarray           # (n_paths,) first month with W_ext < theta_ext, -1 if never
+    v_time_below: np.ndarray            # (n_paths,) months with V < theta
+
+    def summary(self) -> Dict[str, float]:
+        triggered = self.first_trigger >= 0
+        lo, mid, hi = np.percentile(self.time_below, [5, 50, 95])
+        return {
+            "paths": int(len(self.time_below)),
+            "time_below_mean": float(self.time_below.mean()),
+            "time_below_p5": float(lo),
+            "time_below_p50": float(mid),
+            "time_below_p95": float(hi),
+            "triggered_share": float(triggered.mean()),
+            "first_trigger_median": float(np.median(self.first_trigger[triggered])) if triggered.any() else -1.0,
+            "v_time_below_mean": float(self.v_time_below.mean()),
+        }
+
+
+def simulate_ensemble(
+    params: Optional[Dict] = None,
+    rng: Optional[np.random.Generator] = None,
+    workers: Optional[int] = 1,
+    bands: Sequence[int] = BANDS,
+) -> WelfareEnsemble:
+    """
+    Run params["n_paths"] realizations over params["months"] in steps of
+    params["dt"] months. workers=1 runs in-process; otherwise chunks are
+    spread over a process pool (None = CPU count).
+    """
+    p = {**ENSEMBLE_DEFAULTS, **(params or {})}
+    t = time_grid(p["months"], p["dt"])
+    n_paths, chunk_size = int(p["n_paths"]), int(p["chunk_size"])
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    rng = rng if rng is not None else experiment_rng("welfare_ensemble", 0)
+    rngs = jumped_rngs(rng, len(sizes))
+
+    workers = 1 if workers == 1 else min(workers or os.cpu_count() or 1, len(sizes))
+    groups = np.array_split(np.arange(len(sizes)), workers)
+    jobs = [([sizes[i] for i in g], [rngs[i] for i in g]) for g in groups if len(g)]
+    if workers == 1:
+        results = [_run_group(p, t, *job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_group, [p] * len(jobs), [t] * len(jobs), *zip(*jobs)))
+
+    # Counts are exact integers; float sums stay per chunk and are reduced in
+    # chunk order, so the grouping across workers cannot change the result
+    merged = {name: sum(r[name] for r in results) for name in _COUNTS}
+    merged.update({name: np.concatenate([r[name] for r in results]) for name in _PER_CHUNK + _PER_PATH})
+    w_sum, v_sum = merged["w_sum"].sum(axis=0), merged["v_sum"].sum(axis=0)
+    w_bands = _sketch_quantiles(merged["w_counts"], bands)
+    v_bands = _sketch_quantiles(merged["v_counts"], bands)
+    return WelfareEnsemble(
+        t=t,
+        W_ext=dict(zip(bands, w_bands)),
+        V=dict(zip(bands, v_bands)),
+        mean_W_ext=w_sum / n_paths,
+        mean_V=v_sum / n_paths,
+        trigger_fraction=merged["below"] / n_paths,
+        **{name: merged[name] for name in _PER_PATH},
+    )
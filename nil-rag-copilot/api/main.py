@@ -1,24 +1,49 @@
 import io
 import os
+import json
 import time
+import asyncio
 import uuid
 import logging
-import numpy as np
-import pdfplumber
-import faiss
-import openai
+from contextlib import asynccontextmanager
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from pydantic import BaseModel
 from fastapi import FastAPI, UploadFile, File, HTTPException, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from sentence_transformers import SentenceTransformer
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .startup import StartupState
+from .thread_budget import budget as thread_budget
+from .services.chunker import chunk_document, token_stats, OVERLAP_TOKENS
+from .services.singleflight import SingleFlight, fingerprint
+
+# numpy, pdfplumber, faiss, openai and sentence_transformers (torch) are
+# imported inside the functions that use them, so /health and /ready never
+# pay for them; the startup warm-up imports them in the background.
+if TYPE_CHECKING:
+    import openai
+    from sentence_transformers import SentenceTransformer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Before torch or FAISS are imported, so their OpenMP pools start at this worker's share
+thread_budget.export_env()
+
 # ── App ───────────────────────────────────────────────────────────────────────
-app = FastAPI(title="NIL RAG Copilot API", version="0.2.0")
+startup_state = StartupState()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    thread_budget.install_pools(asyncio.get_running_loop())
+    startup_state.start(get_model, build_index)
+    yield
+    await startup_state.stop()
+
+
+app = FastAPI(title="NIL RAG Copilot API", version="0.2.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +69,12 @@ class IngestResponse(BaseModel):
     word_count: int
     chunk_count: int
     message: str
+    tokens_per_chunk: Optional[float] = None
+    truncation_rate: Optional[float] = None
+    # Set when an existing session is updated with a new version of its document
+    reused_chunks: Optional[int] = None
+    embedded_chunks: Optional[int] = None
+    removed_chunks: Optional[int] = None
 
 class ChatRequest(BaseModel):
     session_id: str
@@ -58,10 +89,59 @@ class ChatResponse(BaseModel):
     answer: str
     citations: List[Citation]
     retrieval_latency_ms: float
+    prompt_tokens: Optional[int] = None
+    prompt_tokens_full: Optional[int] = None
+
+class BatchChatRequest(BaseModel):
+    session_id: str
+    questions: List[str]
+    max_concurrency: Optional[int] = None
+
+class BatchChatItem(ChatResponse):
+    index: int
+    question: str
+    llm_latency_ms: float
+
+class BatchChatError(BaseModel):
+    index: int
+    question: str
+    error: str
+
+class BatchChatSummary(BaseModel):
+    questions: int
+    failed: int
+    retrieval_latency_ms: float
+    llm_latency_ms_total: float
+    total_latency_ms: float
+    max_concurrency: int
 
 class EvalRequest(BaseModel):
     session_id: str
 
+class StorageCheckRequest(BaseModel):
+    session_id: str
+    questions: Optional[List[str]] = None
+    dims: Optional[List[int]] = None
+
+class StorageSetting(BaseModel):
+    storage: str
+    recall_at_k: float
+    top1_agreement: float
+    score_drift_mean: float
+    score_drift_max: float
+    bytes_per_vector: float
+    memory_vs_float32: float
+    search_us_per_query: float
+    search_vs_float32: float
+
+class StorageCheckResponse(BaseModel):
+    session_id: str
+    current_storage: str
+    chunk_count: int
+    query_count: int
+    k: int
+    settings: List[StorageSetting]
+
 class MetricResult(BaseModel):
     name: str
     score: float
@@ -79,20 +159,29 @@ _sessions: Dict[str, Any] = {}
 # ── Embedding model (loaded once) ─────────────────────────────────────────────
 _model = None
 
-def get_model() -> SentenceTransformer:
+def get_model() -> "SentenceTransformer":
+    """The embedder: a RemoteEmbedder when RAG_EMBED_SOCKET is set, else an in-process model."""
     global _model
     if _model is None:
+        from .services.embed_host import remote_embedder_from_env
+        _model = remote_embedder_from_env()
+        if _model is not None:
+            logger.info(f"Using embedding host(s) at {_model.paths}.")
+            return _model
+        from sentence_transformers import SentenceTransformer
         logger.info("Loading sentence-transformers model...")
         _model = SentenceTransformer("all-MiniLM-L6-v2")
+        thread_budget.apply()
         logger.info("Model loaded.")
     return _model
 
 # ── OpenAI client (loaded once) ───────────────────────────────────────────────
 _openai_client = None
 
-def get_openai_client() -> openai.OpenAI:
+def get_openai_client() -> "openai.OpenAI":
     global _openai_client
     if _openai_client is None:
+        import openai
         logger.info("Initializing OpenAI client...")
         _openai_client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY", ""))
         logger.info("OpenAI client initialized.")
@@ -100,12 +189,19 @@ def get_openai_client() -> openai.OpenAI:
 
 # ── Services ──────────────────────────────────────────────────────────────────
 MAX_WORDS = 5000
-CHUNK_SIZE = 200
-OVERLAP = 40
 TOP_K = 4
-MAX_SNIPPET_LENGTH = 150
+MAX_BATCH_QUESTIONS = 100
+BATCH_CONCURRENCY = int(os.environ.get("RAG_BATCH_CONCURRENCY", "4"))
+CHAT_SYSTEM_PROMPT = (
+    "You are an expert assistant on the uploaded documentation. "
+    "Answer ONLY from the provided context. "
+    "If the answer is not in the context reply: "
+    "'I could not find this information in the uploaded document.' "
+    "Cite relevant passages as [Chunk N]."
+)
 
 def extract_text(file_bytes: bytes) -> str:
+    import pdfplumber
     parts = []
     with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
         for page in pdf.pages:
@@ -123,50 +219,117 @@ def validate_words(text: str) -> int:
         )
     return wc
 
-def make_chunks(text: str) -> List[str]:
-    words = text.split()
-    chunks, start = [], 0
-    while start < len(words):
-        end = min(start + CHUNK_SIZE, len(words))
-        chunks.append(" ".join(words[start:end]))
-        if end == len(words):
-            break
-        start += CHUNK_SIZE - OVERLAP
-    return chunks
+def make_chunks(text: str):
+    """Pack text into chunks within the embedder's token limit; returns (chunks, stats)."""
+    model = get_model()
+    chunks, counts = chunk_document(text, model.tokenizer,
+                                    model.max_seq_length, OVERLAP_TOKENS)
+    return chunks, token_stats(counts, model.tokenizer, model.max_seq_length)
+
+def embed(texts: List[str]):
+    import numpy as np
+    return get_model().encode(texts, normalize_embeddings=True,
+                              show_progress_bar=False).astype(np.float32)
+
+def index_embeddings(emb):
+    """Index chunk vectors at the configured precision (RAG_VECTOR_PRECISION, RAG_PCA_DIM)."""
+    from .services.vector_store import index_vectors
+    return index_vectors(emb)
 
 def build_index(chunks: List[str]):
-    model = get_model()
-    emb = model.encode(chunks, normalize_embeddings=True,
-                       show_progress_bar=False).astype(np.float32)
-    index = faiss.IndexFlatIP(emb.shape[1])
-    index.add(emb)
-    return index
+    return index_embeddings(embed(chunks))
+
+def retrieve_batch(queries: List[str], index, n_chunks: int):
+    """Encode all queries in one model call and search them with one multi-row FAISS query.
 
-def retrieve(query: str, index, chunks: List[str]):
+    Returns a list of (ids, scores, query embedding) per query, ids best first.
+    """
+    import numpy as np
     model = get_model()
-    q = model.encode([query], normalize_embeddings=True).astype(np.float32)
-    scores, indices = index.search(q, min(TOP_K, len(chunks)))
-    return [(int(i), chunks[i], float(s))
-            for s, i in zip(scores[0], indices[0]) if i >= 0]
+    q = model.encode(queries, normalize_embeddings=True,
+                     show_progress_bar=False).astype(np.float32)
+    thread_budget.set_search_threads(len(queries))
+    scores, indices = index.search(q, min(TOP_K, n_chunks))
+    keep = indices >= 0
+    return [(indices[r][keep[r]], scores[r][keep[r]], q[r]) for r in range(len(queries))]
+
+def retrieve(query: str, index, n_chunks: int):
+    """Return (ids, scores) arrays of the top chunks, best first, and the query embedding."""
+    return retrieve_batch([query], index, n_chunks)[0]
+
+def chat_messages(context: str, question: str):
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"},
+    ]
+
+def make_citations(table, ctx) -> List[Citation]:
+    return [
+        Citation(chunk_id=i, text_snippet=t, score=s)
+        for i, t, s in zip(ctx.ids.tolist(), table.snippets(ctx.ids), ctx.scores.tolist())
+    ]
+
+def prompt_token_counts(messages, assembly):
+    """Prompt tokens as sent, and as they would be with every retrieved chunk in full."""
+    from .services.context import count_tokens
+    sent = sum(count_tokens([m["content"] for m in messages]))
+    return sent, sent - assembly.tokens + assembly.full_tokens
+
+# Identical prompts already in flight share one upstream call (see /api/v1/llm/stats)
+LLM_MODEL = "gpt-4o-mini"
+LLM_SINGLEFLIGHT = os.environ.get("RAG_LLM_SINGLEFLIGHT", "1").strip().lower() not in ("0", "false", "no")
+llm_flight = SingleFlight()
 
 def call_openai_chat(messages, max_tokens=600, temperature=0.1) -> str:
-    client = get_openai_client()
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-    return resp.choices[0].message.content
+    def request():
+        client = get_openai_client()
+        resp = client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return resp.choices[0].message.content
+    if not LLM_SINGLEFLIGHT:
+        return request()
+    key = fingerprint(model=LLM_MODEL, messages=messages,
+                      temperature=temperature, max_tokens=max_tokens)
+    return llm_flight.do(key, request)
+
+def call_openai_chat_stream(messages, max_tokens=600, temperature=0.1):
+    """Iterate over answer text deltas; concurrent identical requests share one stream."""
+    def request():
+        client = get_openai_client()
+        for event in client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        ):
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+    if not LLM_SINGLEFLIGHT:
+        return request()
+    key = fingerprint(model=LLM_MODEL, messages=messages,
+                      temperature=temperature, max_tokens=max_tokens)
+    return llm_flight.stream(key, request)
 
 # ── Routes ────────────────────────────────────────────────────────────────────
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok", "version": "0.2.0"}
 
 
-@api_router.post("/ingest", response_model=IngestResponse)
-async def ingest_pdf(file: UploadFile = File(...)):
+@app.get("/ready")
+async def ready():
+    """200 once the embedder is warmed up, 503 while warming or after a failed warm-up."""
+    return JSONResponse({**startup_state.report(), "threads": thread_budget.report()},
+                        status_code=200 if startup_state.ready else 503)
+
+
+async def read_document(file: UploadFile):
+    """Extracted text and word count of an uploaded PDF, or an HTTP error."""
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only PDF files are accepted.")
     content = await file.read()
@@ -180,17 +343,76 @@ async def ingest_pdf(file: UploadFile = File(...)):
         wc = validate_words(text)
     except ValueError as e:
         raise HTTPException(422, str(e))
-    chunks = make_chunks(text)
-    index = build_index(chunks)
+    return text, wc
+
+def make_session(chunks: List[str], emb, wc: int, previous: Optional[dict] = None) -> dict:
+    from .services.chunk_table import ChunkTable
+    from .services.context import ContextIndex
+    table = ChunkTable(chunks)
+    context_index = ContextIndex(table, encode=embed,
+                                 previous=previous["context"] if previous else None)
+    index = index_embeddings(emb)
+    # The float32 embeddings are kept so an update reuses them exactly; the
+    # index may hold them projected or quantized
+    return {"index": index, "embeddings": emb, "chunks": chunks, "table": table,
+            "context": context_index, "word_count": wc}
+
+
+@api_router.post("/ingest", response_model=IngestResponse)
+async def ingest_pdf(file: UploadFile = File(...)):
+    text, wc = await read_document(file)
+    # Chunking and embedding block (on the model, or on the embedding host's
+    # socket), so they run off the event loop like retrieval does
+    chunks, stats = await asyncio.to_thread(make_chunks, text)
+    emb = await asyncio.to_thread(embed, chunks)
     session_id = str(uuid.uuid4())
-    _sessions[session_id] = {"index": index, "chunks": chunks, "word_count": wc}
-    logger.info(f"Ingest OK: {wc} words, {len(chunks)} chunks, session={session_id}")
+    _sessions[session_id] = await asyncio.to_thread(make_session, chunks, emb, wc)
+    logger.info(f"Ingest OK: {wc} words, {len(chunks)} chunks, "
+                f"{stats['tokens_per_chunk']} tokens/chunk, "
+                f"truncation rate {stats['truncation_rate']}, session={session_id}")
     return IngestResponse(
         status="ok",
         session_id=session_id,
         word_count=wc,
         chunk_count=len(chunks),
         message=f"Indexing complete. {wc} words, {len(chunks)} chunks indexed.",
+        tokens_per_chunk=stats["tokens_per_chunk"],
+        truncation_rate=stats["truncation_rate"],
+    )
+
+
+@api_router.post("/ingest/{session_id}", response_model=IngestResponse)
+async def update_pdf(session_id: str, file: UploadFile = File(...)):
+    """
+    Replace a session's document with a new version of it.
+
+    Only chunks whose text is not in the indexed version are embedded; the
+    others keep their float32 embeddings from the session, and the index is
+    rebuilt from them in document order.
+    Requests already running keep the previous version.
+    """
+    if session_id not in _sessions:
+        raise HTTPException(404, "Session not found. Run /ingest first.")
+    from .services.incremental import reuse_embeddings
+    text, wc = await read_document(file)
+    previous = _sessions[session_id]
+    chunks, stats = await asyncio.to_thread(make_chunks, text)
+    emb, counts = await asyncio.to_thread(
+        reuse_embeddings, previous["chunks"], previous["embeddings"], chunks, embed)
+    _sessions[session_id] = await asyncio.to_thread(make_session, chunks, emb, wc, previous)
+    logger.info(f"Update OK: {wc} words, {len(chunks)} chunks "
+                f"({counts['reused_chunks']} reused, {counts['embedded_chunks']} embedded, "
+                f"{counts['removed_chunks']} removed), session={session_id}")
+    return IngestResponse(
+        status="ok",
+        session_id=session_id,
+        word_count=wc,
+        chunk_count=len(chunks),
+        message=(f"Update complete. {wc} words, {len(chunks)} chunks: "
+                 f"{counts['embedded_chunks']} embedded, {counts['reused_chunks']} reused."),
+        tokens_per_chunk=stats["tokens_per_chunk"],
+        truncation_rate=stats["truncation_rate"],
+        **counts,
     )
 
 
@@ -199,40 +421,162 @@ async def chat(req: ChatRequest):
     if req.session_id not in _sessions:
         raise HTTPException(404, "Session not found. Run /ingest first.")
     session = _sessions[req.session_id]
+    table = session["table"]
     t0 = time.perf_counter()
-    results = retrieve(req.question, session["index"], session["chunks"])
+    ids, scores, q = await asyncio.to_thread(retrieve, req.question, session["index"], len(table))
     latency = (time.perf_counter() - t0) * 1000
-    context = "\n\n".join(f"[Chunk {i}]: {t}" for i, t, _ in results)
-    answer = call_openai_chat([
-        {"role": "system", "content": (
-            "You are an expert assistant on the uploaded documentation. "
-            "Answer ONLY from the provided context. "
-            "If the answer is not in the context reply: "
-            "'I could not find this information in the uploaded document.' "
-            "Cite relevant passages as [Chunk N]."
-        )},
-        {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {req.question}"},
-    ])
+    ctx = session["context"].assemble(ids, scores, q)
+    messages = chat_messages(ctx.context, req.question)
+    prompt_tokens, prompt_tokens_full = prompt_token_counts(messages, ctx)
+    logger.info(f"Chat prompt: {prompt_tokens} tokens "
+                f"({prompt_tokens_full} with all {len(ids)} retrieved chunks)")
+    answer = await asyncio.to_thread(call_openai_chat, messages)
     return ChatResponse(
         answer=answer,
-        citations=[
-            Citation(
-                chunk_id=i,
-                text_snippet=t[:MAX_SNIPPET_LENGTH] + ("…" if len(t) > MAX_SNIPPET_LENGTH else ""),
-                score=s
-            )
-            for i, t, s in results
-        ],
+        citations=make_citations(table, ctx),
         retrieval_latency_ms=round(latency, 2),
+        prompt_tokens=prompt_tokens,
+        prompt_tokens_full=prompt_tokens_full,
     )
 
 
+@api_router.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Ask a question and stream the answer.
+
+    NDJSON: a first line with citations and token counts, then one
+    {"delta": "..."} line per piece of answer text, then {"done": true}.
+    """
+    if req.session_id not in _sessions:
+        raise HTTPException(404, "Session not found. Run /ingest first.")
+    session = _sessions[req.session_id]
+    table = session["table"]
+    t0 = time.perf_counter()
+    ids, scores, q = await asyncio.to_thread(retrieve, req.question, session["index"], len(table))
+    latency = (time.perf_counter() - t0) * 1000
+    ctx = session["context"].assemble(ids, scores, q)
+    messages = chat_messages(ctx.context, req.question)
+    prompt_tokens, prompt_tokens_full = prompt_token_counts(messages, ctx)
+    head = {
+        "citations": [c.model_dump() for c in make_citations(table, ctx)],
+        "retrieval_latency_ms": round(latency, 2),
+        "prompt_tokens": prompt_tokens,
+        "prompt_tokens_full": prompt_tokens_full,
+    }
+
+    # A sync iterator: Starlette drains it in a worker thread
+    def lines():
+        yield json.dumps(head) + "\n"
+        try:
+            for delta in call_openai_chat_stream(messages):
+                yield json.dumps({"delta": delta}) + "\n"
+        except Exception as e:
+            logger.warning(f"Chat stream failed: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        yield json.dumps({"done": True}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@api_router.get("/llm/stats")
+def llm_stats():
+    """Upstream LLM calls made and requests coalesced onto an identical in-flight call."""
+    return {"singleflight": LLM_SINGLEFLIGHT, **llm_flight.stats()}
+
+
+@api_router.post("/chat/batch")
+async def chat_batch(req: BatchChatRequest):
+    """
+    Answer several questions about one document.
+
+    Questions are encoded in one model call and searched with one multi-row
+    FAISS query; the LLM calls then run with at most max_concurrency in
+    flight, capped at RAG_BATCH_CONCURRENCY. The response is NDJSON, one BatchChatItem (or BatchChatError)
+    per question in completion order, followed by a final
+    {"summary": BatchChatSummary} line.
+    """
+    if req.session_id not in _sessions:
+        raise HTTPException(404, "Session not found. Run /ingest first.")
+    if not req.questions:
+        raise HTTPException(422, "Provide at least one question.")
+    if len(req.questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(422, f"A batch accepts at most {MAX_BATCH_QUESTIONS} questions.")
+    session = _sessions[req.session_id]
+    table, context_index = session["table"], session["context"]
+    concurrency = max(1, min(req.max_concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY,
+                             len(req.questions)))
+
+    t0 = time.perf_counter()
+    retrievals = await asyncio.to_thread(
+        retrieve_batch, req.questions, session["index"], len(table))
+    retrieval_ms = (time.perf_counter() - t0) * 1000
+    per_question_ms = round(retrieval_ms / len(req.questions), 2)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(i: int, question: str, ids, scores, q):
+        # Any failure becomes this question's error line; raising here would
+        # end the stream without the remaining items or the summary
+        try:
+            ctx = context_index.assemble(ids, scores, q)
+            messages = chat_messages(ctx.context, question)
+            prompt_tokens, prompt_tokens_full = prompt_token_counts(messages, ctx)
+            async with semaphore:
+                t = time.perf_counter()
+                text = await asyncio.to_thread(call_openai_chat, messages)
+                llm_ms = (time.perf_counter() - t) * 1000
+            return BatchChatItem(
+                index=i,
+                question=question,
+                answer=text,
+                citations=make_citations(table, ctx),
+                retrieval_latency_ms=per_question_ms,
+                prompt_tokens=prompt_tokens,
+                prompt_tokens_full=prompt_tokens_full,
+                llm_latency_ms=round(llm_ms, 2),
+            )
+        except Exception as e:
+            logger.warning(f"Batch question {i} failed: {e}")
+            return BatchChatError(index=i, question=question, error=str(e))
+
+    async def stream():
+        tasks = [asyncio.create_task(answer(i, question, *r))
+                 for i, (question, r) in enumerate(zip(req.questions, retrievals))]
+        failed, llm_total = 0, 0.0
+        try:
+            for done in asyncio.as_completed(tasks):
+                item = await done
+                if isinstance(item, BatchChatError):
+                    failed += 1
+                else:
+                    llm_total += item.llm_latency_ms
+                yield item.model_dump_json() + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        summary = BatchChatSummary(
+            questions=len(req.questions),
+            failed=failed,
+            retrieval_latency_ms=round(retrieval_ms, 2),
+            llm_latency_ms_total=round(llm_total, 2),
+            total_latency_ms=round((time.perf_counter() - t0) * 1000, 2),
+            max_concurrency=concurrency,
+        )
+        logger.info(f"Batch chat: {summary}")
+        yield json.dumps({"summary": summary.model_dump()}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @api_router.post("/eval", response_model=EvalResponse)
 async def run_eval(req: EvalRequest):
     if req.session_id not in _sessions:
         raise HTTPException(404, "Session not found. Run /ingest first.")
     session = _sessions[req.session_id]
-    chunks, index = session["chunks"], session["index"]
+    chunks, index, table = session["chunks"], session["index"], session["table"]
+    context_index = session["context"]
 
     # Generate synthetic test questions
     questions = []
@@ -244,31 +588,30 @@ async def run_eval(req: EvalRequest):
     if not questions:
         raise HTTPException(422, "Could not generate test questions.")
 
-    # Generate answers
-    answers = []
-    for q in questions:
-        results = retrieve(q, index, chunks)
-        context = "\n\n".join(f"[Chunk {i}]: {t}" for i, t, _ in results)
-        a = call_openai_chat([
+    # Generate answers; the retrievals are reused for the metrics below
+    answers, retrievals = [], []
+    results = await asyncio.to_thread(retrieve_batch, questions, index, len(table))
+    for q, (ids, scores, q_emb) in zip(questions, results):
+        retrievals.append((ids, scores))
+        context = context_index.assemble(ids, scores, q_emb).context
+        a = await asyncio.to_thread(call_openai_chat, [
             {"role": "system", "content": "Answer only from the context."},
             {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {q}"},
         ], max_tokens=200, temperature=0.0)
         answers.append(a)
 
     # Metrics
-    model = get_model()
+    import numpy as np
     rp_scores = []
     used_chunks = set()
-    for q in questions:
-        r = retrieve(q, index, chunks)
-        if r:
-            rp_scores.append(r[0][2])
-            for idx, _, _ in r:
-                used_chunks.add(idx)
+    for ids, scores in retrievals:
+        if len(ids):
+            rp_scores.append(float(scores[0]))
+            used_chunks.update(ids.tolist())
     retrieval_precision = float(np.mean(rp_scores)) if rp_scores else 0.0
 
-    q_emb = model.encode(questions, normalize_embeddings=True)
-    a_emb = model.encode(answers,   normalize_embeddings=True)
+    q_emb = await asyncio.to_thread(embed, questions)
+    a_emb = await asyncio.to_thread(embed, answers)
     answer_relevance = float(np.mean(np.sum(q_emb * a_emb, axis=1)))
 
     context_coverage = len(used_chunks) / len(chunks) if chunks else 0.0
@@ -297,6 +640,38 @@ async def run_eval(req: EvalRequest):
         answers=answers,
     )
 
+@api_router.post("/storage/check", response_model=StorageCheckResponse)
+def storage_check(req: StorageCheckRequest):
+    """
+    What each vector storage setting costs in retrieval quality on this document.
+
+    The chunks are re-embedded at full precision and searched with the given
+    questions (default: the first sentence of each chunk) under every
+    precision, and every PCA dimension the fitted projection allows, against
+    exact float32 search.
+    """
+    if req.session_id not in _sessions:
+        raise HTTPException(404, "Session not found. Run /ingest first.")
+    from .services import vector_store
+    session = _sessions[req.session_id]
+    chunks = session["chunks"]
+    questions = req.questions or vector_store.probe_queries(chunks)
+    if not questions:
+        raise HTTPException(422, "Could not generate check questions.")
+    projection = vector_store.get_projection()
+    dims = vector_store.check_dims(projection, req.dims or ())
+    settings = vector_store.storage_check(
+        embed(chunks), embed(questions), vector_store.all_configs(dims),
+        k=TOP_K, projection=projection)
+    return StorageCheckResponse(
+        session_id=req.session_id,
+        current_storage=vector_store.default_config(len(chunks)).label,
+        chunk_count=len(chunks),
+        query_count=len(questions),
+        k=min(TOP_K, len(chunks)),
+        settings=[StorageSetting(**s) for s in settings],
+    )
+
 # ── Include API Router ────────────────────────────────────────────────────────
 # Mount the API router with /api/v1 prefix
 app.include_router(api_router)
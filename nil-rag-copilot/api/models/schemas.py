@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class IngestResponse(BaseModel):
     status: str
@@ -7,6 +7,12 @@ class IngestResponse(BaseModel):
     word_count: int
     chunk_count: int
     message: str
+    tokens_per_chunk: Optional[float] = None
+    truncation_rate: Optional[float] = None
+    # Set when an existing session is updated with a new version of its document
+    reused_chunks: Optional[int] = None
+    embedded_chunks: Optional[int] = None
+    removed_chunks: Optional[int] = None
 
 class ChatRequest(BaseModel):
     session_id: str
@@ -21,6 +27,8 @@ class ChatResponse(BaseModel):
     answer: str
     citations: List[Citation]
     retrieval_latency_ms: float
+    prompt_tokens: Optional[int] = None
+    prompt_tokens_full: Optional[int] = None
 
 class EvalRequest(BaseModel):
     session_id: str
@@ -35,3 +43,27 @@ class EvalResponse(BaseModel):
     metrics: List[MetricResult]
     test_questions: List[str]
     answers: List[str]
+
+class StorageCheckRequest(BaseModel):
+    session_id: str
+    questions: Optional[List[str]] = None
+    dims: Optional[List[int]] = None
+
+class StorageSetting(BaseModel):
+    storage: str
+    recall_at_k: float
+    top1_agreement: float
+    score_drift_mean: float
+    score_drift_max: float
+    bytes_per_vector: float
+    memory_vs_float32: float
+    search_us_per_query: float
+    search_vs_float32: float
+
+class StorageCheckResponse(BaseModel):
+    session_id: str
+    current_storage: str
+    chunk_count: int
+    query_count: int
+    k: int
+    settings: List[StorageSetting]
@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException
 from ..models.schemas import ChatRequest, ChatResponse, Citation
 from ..store.session_store import get_session
 from ..services.retriever import retrieve
+from ..services.context import count_tokens
 
 router = APIRouter()
 
@@ -37,40 +38,41 @@ async def chat(req: ChatRequest):
     except KeyError as e:
         raise HTTPException(404, str(e))
     
+    table = session["table"]
+    
     # Retrieve relevant chunks
     t0 = time.perf_counter()
-    results = retrieve(req.question, session["index"], session["chunks"])
+    ids, scores, q = retrieve(req.question, session["index"], len(table))
     latency = (time.perf_counter() - t0) * 1000
     
-    # Build context from retrieved chunks
-    context = "\n\n".join(f"[Chunk {i}]: {t}" for i, t, _ in results)
+    # Assemble a budgeted context from the retrieved chunks
+    ctx = session["context"].assemble(ids, scores, q)
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{ctx.context}\n\nQuestion: {req.question}"}
+    ]
+    prompt_tokens = sum(count_tokens([m["content"] for m in messages]))
+    prompt_tokens_full = prompt_tokens - ctx.tokens + ctx.full_tokens
     
     # Generate answer using OpenAI
     client = get_openai_client()
     resp = client.chat.completions.create(
         model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {req.question}"}
-        ],
+        messages=messages,
         temperature=0.1,
         max_tokens=600
     )
     
-    # Safely truncate text snippets at word boundaries
-    citations = []
-    for i, t, s in results:
-        snippet = t[:150]
-        if len(t) > 150:
-            # Find last space to avoid cutting words
-            last_space = snippet.rfind(' ')
-            if last_space > 0:
-                snippet = snippet[:last_space]
-            snippet += "…"
-        citations.append(Citation(chunk_id=i, text_snippet=snippet, score=s))
+    # Snippets were cut at word boundaries at ingest
+    citations = [
+        Citation(chunk_id=i, text_snippet=t, score=s)
+        for i, t, s in zip(ctx.ids.tolist(), table.snippets(ctx.ids), ctx.scores.tolist())
+    ]
     
     return ChatResponse(
         answer=resp.choices[0].message.content,
         citations=citations,
-        retrieval_latency_ms=round(latency, 2)
+        retrieval_latency_ms=round(latency, 2),
+        prompt_tokens=prompt_tokens,
+        prompt_tokens_full=prompt_tokens_full
     )
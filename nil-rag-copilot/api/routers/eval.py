@@ -1,7 +1,14 @@
 import os
 import openai
 from fastapi import APIRouter, HTTPException
-from ..models.schemas import EvalRequest, EvalResponse, MetricResult
+from ..models.schemas import (
+    EvalRequest,
+    EvalResponse,
+    MetricResult,
+    StorageCheckRequest,
+    StorageCheckResponse,
+    StorageSetting
+)
 from ..store.session_store import get_session
 from ..services.evaluator import (
     generate_test_questions,
@@ -9,7 +16,9 @@ from ..services.evaluator import (
     compute_answer_relevance,
     compute_context_coverage
 )
-from ..services.retriever import retrieve
+from ..services.retriever import retrieve, TOP_K
+from ..services.embedder import encode
+from ..services import vector_store
 
 router = APIRouter()
 
@@ -36,19 +45,23 @@ async def run_eval(req: EvalRequest):
     
     chunks = session["chunks"]
     index = session["index"]
+    table = session["table"]
+    context_index = session["context"]
     
     # Generate test questions
     questions = generate_test_questions(chunks)
     if not questions:
         raise HTTPException(422, "Could not generate test questions from chunks.")
     
-    # Generate answers for each question
+    # Generate answers for each question; retrievals are reused by the metrics
     client = get_openai_client()
     answers = []
+    retrievals = []
     
     for q in questions:
-        results = retrieve(q, index, chunks)
-        context = "\n\n".join(f"[Chunk {i}]: {t}" for i, t, _ in results)
+        ids, scores, q_emb = retrieve(q, index, len(table))
+        retrievals.append((ids, scores))
+        context = context_index.assemble(ids, scores, q_emb).context
         
         r = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -65,7 +78,7 @@ async def run_eval(req: EvalRequest):
     metrics = [
         MetricResult(
             name="Retrieval Precision",
-            score=round(compute_retrieval_precision(questions, index, chunks), 3),
+            score=round(compute_retrieval_precision(retrievals), 3),
             description="Avg top-1 FAISS cosine score across test questions (0–1)"
         ),
         MetricResult(
@@ -75,7 +88,7 @@ async def run_eval(req: EvalRequest):
         ),
         MetricResult(
             name="Context Coverage",
-            score=round(compute_context_coverage(questions, index, chunks), 3),
+            score=round(compute_context_coverage(retrievals, len(chunks)), 3),
             description="Fraction of distinct chunks used at least once across all retrievals (0–1)"
         ),
     ]
@@ -86,3 +99,39 @@ async def run_eval(req: EvalRequest):
         test_questions=questions,
         answers=answers
     )
+
+@router.post("/storage/check", response_model=StorageCheckResponse)
+def storage_check(req: StorageCheckRequest):
+    """
+    Measure what each vector storage setting costs in retrieval quality.
+    Chunks are re-embedded at full precision and searched under every
+    precision and available PCA dimension against exact float32 search.
+    """
+    try:
+        session = get_session(req.session_id)
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    
+    chunks = session["chunks"]
+    questions = req.questions or vector_store.probe_queries(chunks)
+    if not questions:
+        raise HTTPException(422, "Could not generate check questions.")
+    
+    projection = vector_store.get_projection()
+    dims = vector_store.check_dims(projection, req.dims or ())
+    settings = vector_store.storage_check(
+        encode(chunks),
+        encode(questions),
+        vector_store.all_configs(dims),
+        k=TOP_K,
+        projection=projection
+    )
+    
+    return StorageCheckResponse(
+        session_id=req.session_id,
+        current_storage=vector_store.default_config(len(chunks)).label,
+        chunk_count=len(chunks),
+        query_count=len(questions),
+        k=min(TOP_K, len(chunks)),
+        settings=[StorageSetting(**s) for s in settings]
+    )
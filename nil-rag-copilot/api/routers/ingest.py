@@ -1,18 +1,15 @@
+import asyncio
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from ..services.pdf_parser import extract_text_from_pdf
-from ..services.chunker import validate_word_limit, chunk_text
-from ..services.embedder import build_index
-from ..store.session_store import create_session
+from ..services.chunker import validate_word_limit, chunk_document, token_stats
+from ..services.embedder import build_index, encode, get_model, update_index
+from ..store.session_store import create_session, get_session, update_session
 from ..models.schemas import IngestResponse
 
 router = APIRouter()
 
-@router.post("/ingest", response_model=IngestResponse)
-async def ingest_pdf(file: UploadFile = File(...)):
-    """
-    Upload and index a PDF document.
-    Extracts text, creates chunks, and builds a vector index.
-    """
+async def read_document(file: UploadFile):
+    """Extract and validate the text of an uploaded PDF; returns (text, word count)."""
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only PDF files are accepted.")
     
@@ -30,15 +27,59 @@ async def ingest_pdf(file: UploadFile = File(...)):
         wc = validate_word_limit(text)
     except ValueError as e:
         raise HTTPException(422, str(e))
+    return text, wc
+
+def make_chunks(text: str):
+    model = get_model()
+    chunks, counts = chunk_document(text, model.tokenizer, model.max_seq_length)
+    return chunks, token_stats(counts, model.tokenizer, model.max_seq_length)
+
+@router.post("/ingest", response_model=IngestResponse)
+async def ingest_pdf(file: UploadFile = File(...)):
+    """
+    Upload and index a PDF document.
+    Extracts text, creates chunks, and builds a vector index.
+    """
+    text, wc = await read_document(file)
+    chunks, stats = make_chunks(text)
+    index, embeddings = build_index(chunks)
+    session_id = create_session(index, chunks, wc, encode=encode, embeddings=embeddings)
+    
+    return IngestResponse(
+        status="ok",
+        session_id=session_id,
+        word_count=wc,
+        chunk_count=len(chunks),
+        message=f"Indexing complete. {wc} words, {len(chunks)} chunks indexed.",
+        tokens_per_chunk=stats["tokens_per_chunk"],
+        truncation_rate=stats["truncation_rate"]
+    )
+
+@router.post("/ingest/{session_id}", response_model=IngestResponse)
+async def update_pdf(session_id: str, file: UploadFile = File(...)):
+    """
+    Replace a session's document with a new version of it.
+    Only chunks that are not in the indexed version are embedded.
+    """
+    try:
+        previous = get_session(session_id)
+    except KeyError as e:
+        raise HTTPException(404, str(e))
     
-    chunks = chunk_text(text)
-    index, _ = build_index(chunks)
-    session_id = create_session(index, chunks, wc)
+    text, wc = await read_document(file)
+    chunks, stats = await asyncio.to_thread(make_chunks, text)
+    index, embeddings, counts = await asyncio.to_thread(
+        update_index, previous["chunks"], previous["embeddings"], chunks)
+    update_session(session_id, index, chunks, wc, encode=encode, embeddings=embeddings)
     
     return IngestResponse(
         status="ok",
         session_id=session_id,
         word_count=wc,
         chunk_count=len(chunks),
-        message=f"Indexing complete. {wc} words, {len(chunks)} chunks indexed."
+        message=(f"Update complete. {wc} words, {len(chunks)} chunks: "
+                 f"{counts['embedded_chunks']} embedded, {counts['reused_chunks']} reused."),
+        tokens_per_chunk=stats["tokens_per_chunk"],
+        truncation_rate=stats["truncation_rate"],
+        **counts
     )
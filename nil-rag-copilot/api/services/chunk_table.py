@@ -0,0 +1,76 @@
+import numpy as np
+from typing import List
+
+MAX_SNIPPET_LENGTH = 150
+
+class ChunkTable:
+    """
+    Per-chunk artifacts rendered once at ingest.
+
+    Every "[Chunk N]: text" context fragment is stored back to back in one
+    string, with int64 arrays mapping chunk id to fragment, text and
+    word-boundary snippet offsets. Assembling a context or citation snippets
+    for retrieved ids is then an array gather plus slicing and one join.
+    """
+
+    def __init__(self, chunks: List[str], snippet_length: int = MAX_SNIPPET_LENGTH):
+        self.chunks = chunks
+        prefixes = [f"[Chunk {i}]: " for i in range(len(chunks))]
+        self._blob = "".join(p + t for p, t in zip(prefixes, chunks))
+
+        n = len(chunks)
+        prefix_len = np.fromiter(map(len, prefixes), dtype=np.int64, count=n)
+        text_len = np.fromiter(map(len, chunks), dtype=np.int64, count=n)
+        self._ends = np.cumsum(prefix_len + text_len)
+        self._starts = self._ends - prefix_len - text_len
+        self._text_starts = self._starts + prefix_len
+        self._snippet_ends = self._text_starts + np.fromiter(
+            (_snippet_cut(t, snippet_length) for t in chunks), dtype=np.int64, count=n
+        )
+        self._truncated = text_len > snippet_length
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _slices(self, starts: np.ndarray, ends: np.ndarray, ids: np.ndarray) -> List[str]:
+        blob = self._blob
+        return [blob[s:e] for s, e in zip(starts[ids].tolist(), ends[ids].tolist())]
+
+    def context(self, ids: np.ndarray) -> str:
+        """
+        Render the LLM context for retrieved chunk ids.
+
+        Args:
+            ids: Chunk ids in rank order
+
+        Returns:
+            "[Chunk N]: text" fragments joined by blank lines
+        """
+        return "\n\n".join(self._slices(self._starts, self._ends, ids))
+
+    def texts(self, ids: np.ndarray) -> List[str]:
+        """Chunk texts for the given ids."""
+        return self._slices(self._text_starts, self._ends, ids)
+
+    def snippets(self, ids: np.ndarray) -> List[str]:
+        """
+        Citation snippets for the given ids, cut at a word boundary.
+
+        Args:
+            ids: Chunk ids in rank order
+
+        Returns:
+            Snippets, with "…" appended where the chunk was truncated
+        """
+        snippets = self._slices(self._text_starts, self._snippet_ends, ids)
+        for k, cut in enumerate(self._truncated[ids].tolist()):
+            if cut:
+                snippets[k] += "…"
+        return snippets
+
+def _snippet_cut(text: str, limit: int) -> int:
+    """Length of the snippet for text: up to the last space before limit."""
+    if len(text) <= limit:
+        return len(text)
+    last_space = text.rfind(" ", 0, limit)
+    return last_space if last_space > 0 else limit
@@ -1,9 +1,29 @@
-from typing import List
+import hashlib
+import os
+import re
+from typing import List, Tuple
 
 MAX_WORDS = 5000
 CHUNK_SIZE = 200
 OVERLAP = 40
 
+# all-MiniLM-L6-v2 truncates input at 256 word-piece tokens, [CLS]/[SEP] included
+MAX_SEQ_TOKENS = 256
+OVERLAP_TOKENS = 48
+# Close a chunk at a paragraph or page break once it is at least this full
+PARAGRAPH_MIN_FILL = 0.5
+
+# "content" anchors chunk boundaries on sentence hashes so an edit only
+# changes nearby chunks; "tokens" packs greedily from the start of the text
+CHUNKING = os.environ.get("RAG_CHUNKING", "content").strip().lower()
+# Content-defined chunks end after an anchor sentence once this full...
+CDC_MIN_FILL = 0.35
+# ...where one sentence in CDC_ANCHOR_EVERY (by hash) is an anchor
+CDC_ANCHOR_EVERY = 3
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
 def validate_word_limit(text: str) -> int:
     """
     Validate that the document doesn't exceed the word limit.
@@ -49,3 +69,264 @@ def chunk_text(text: str) -> List[str]:
         start += CHUNK_SIZE - OVERLAP
     
     return chunks
+
+def split_sentences(text: str) -> Tuple[List[str], List[bool]]:
+    """
+    Split text into whitespace-normalised sentences.
+    
+    Blank lines, which is how extract_text separates pdfplumber pages,
+    mark paragraph boundaries.
+    
+    Args:
+        text: Document text
+        
+    Returns:
+        Tuple of (sentences, flags marking the last sentence of each paragraph)
+    """
+    sentences, para_ends = [], []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        parts = [" ".join(p.split()) for p in _SENTENCE_RE.split(paragraph)]
+        parts = [p for p in parts if p]
+        sentences.extend(parts)
+        para_ends.extend([False] * (len(parts) - 1) + [True] * bool(parts))
+    return sentences, para_ends
+
+def _split_long(sentence: str, offsets: List[Tuple[int, int]], budget: int):
+    """Cut an over-budget sentence into word-aligned windows of at most budget tokens."""
+    pieces, start, n = [], 0, len(offsets)
+    while start < n:
+        stop = min(start + budget, n)
+        # Back off to a whitespace gap so no word is split across pieces
+        cut = stop
+        while start < cut < n and offsets[cut][0] == offsets[cut - 1][1]:
+            cut -= 1
+        if cut > start:
+            stop = cut
+        base = offsets[start][0]
+        pieces.append((sentence[base:offsets[stop - 1][1]],
+                       [(a - base, b - base) for a, b in offsets[start:stop]]))
+        start = stop
+    return pieces
+
+def _pieces(text: str, tokenizer, budget: int):
+    """
+    Sentences of text as (text, token offsets, ends paragraph) tuples.
+    
+    All sentences are tokenized in one batch call; sentences over budget
+    tokens are split into word-aligned pieces.
+    """
+    sentences, para_ends = split_sentences(text)
+    if not sentences:
+        return []
+    
+    offsets = tokenizer(
+        sentences,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )["offset_mapping"]
+    
+    pieces = []
+    for sentence, offs, para_end in zip(sentences, offsets, para_ends):
+        offs = [tuple(o) for o in offs]
+        if len(offs) <= budget:
+            pieces.append((sentence, offs, para_end))
+            continue
+        parts = _split_long(sentence, offs, budget)
+        for k, (part, part_offs) in enumerate(parts):
+            pieces.append((part, part_offs, para_end and k == len(parts) - 1))
+    return pieces
+
+def chunk_text_by_tokens(
+    text: str,
+    tokenizer,
+    max_tokens: int = MAX_SEQ_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS,
+) -> Tuple[List[str], List[int]]:
+    """
+    Pack sentences into chunks that fit the embedder's token limit.
+    
+    All sentences are tokenized in one batch call to the model's fast
+    tokenizer. Chunks are filled greedily up to max_tokens minus the special
+    tokens; a chunk is closed early at a paragraph or page break when it is
+    at least PARAGRAPH_MIN_FILL full and the next paragraph would not fit.
+    A chunk closed for lack of room starts the next one with its trailing
+    sentences, up to overlap_tokens (or the last overlap_tokens tokens of
+    its final sentence when that sentence alone is longer).
+    
+    Args:
+        text: Document text
+        tokenizer: Hugging Face fast tokenizer, e.g. SentenceTransformer.tokenizer
+        max_tokens: Model sequence limit, special tokens included
+        overlap_tokens: Token overlap between consecutive chunks
+        
+    Returns:
+        Tuple of (chunks, token count per chunk without special tokens)
+    """
+    budget = max_tokens - tokenizer.num_special_tokens_to_add(pair=False)
+    overlap_tokens = min(overlap_tokens, budget // 2)
+    pieces = _pieces(text, tokenizer, budget)
+    if not pieces:
+        return [], []
+    
+    # Tokens left in each piece's paragraph, counting from that piece
+    para_left = [0] * (len(pieces) + 1)
+    for i in range(len(pieces) - 1, -1, -1):
+        following = 0 if pieces[i][2] else para_left[i + 1]
+        para_left[i] = len(pieces[i][1]) + following
+    
+    chunks, counts = [], []
+    current, used = [], 0
+    
+    def close():
+        chunks.append(" ".join(current))
+        counts.append(used)
+    
+    for i, (piece, offs, para_end) in enumerate(pieces):
+        n = len(offs)
+        if current and used + n > budget:
+            close()
+            current, used = _overlap_tail(pieces, i, len(current), overlap_tokens)
+            if used + n > budget:
+                current, used = [], 0
+        current.append(piece)
+        used += n
+        if para_end and used >= PARAGRAPH_MIN_FILL * budget and used + para_left[i + 1] > budget:
+            close()
+            current, used = [], 0
+    if current:
+        close()
+    return chunks, counts
+
+def _overlap_tail(pieces, end: int, n_current: int, overlap_tokens: int):
+    """Trailing text of the chunk ending before pieces[end], at most overlap_tokens long."""
+    tail, used = [], 0
+    for j in range(end - 1, end - 1 - n_current, -1):
+        n = len(pieces[j][1])
+        if used + n > overlap_tokens:
+            break
+        tail.insert(0, pieces[j][0])
+        used += n
+    if not tail and overlap_tokens > 0:
+        piece, offs, _ = pieces[end - 1]
+        start = len(offs) - overlap_tokens
+        # Keep the tail word-aligned, as in _split_long
+        while start < len(offs) and start > 0 and offs[start][0] == offs[start - 1][1]:
+            start += 1
+        if start < len(offs):
+            tail, used = [piece[offs[start][0]:]], len(offs) - start
+    return tail, used
+
+def _is_anchor(piece: str, anchor_every: int) -> bool:
+    """Whether a sentence may end a content-defined chunk; stable across processes."""
+    digest = hashlib.blake2b(piece.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % anchor_every == 0
+
+def chunk_text_by_content(
+    text: str,
+    tokenizer,
+    max_tokens: int = MAX_SEQ_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS,
+    min_fill: float = CDC_MIN_FILL,
+    anchor_every: int = CDC_ANCHOR_EVERY,
+) -> Tuple[List[str], List[int]]:
+    """
+    Pack sentences into chunks whose boundaries are chosen by content.
+    
+    A chunk ends after an anchor sentence, one whose hash is 0 modulo
+    anchor_every, once its own sentences (overlap excluded) fill min_fill
+    of the token budget, or earlier when the next sentence would not fit.
+    Because boundaries depend on the sentences rather than on their
+    position, an edit changes only the chunks around it: chunking resumes
+    on the same boundaries as before at the first anchor past the edit,
+    and those chunks come out identical. Every chunk starts with the
+    trailing sentences of the one before, up to overlap_tokens, as in
+    chunk_text_by_tokens. Paragraph breaks are not used as boundaries,
+    since page breaks move when a PDF reflows.
+    
+    Args:
+        text: Document text
+        tokenizer: Hugging Face fast tokenizer, e.g. SentenceTransformer.tokenizer
+        max_tokens: Model sequence limit, special tokens included
+        overlap_tokens: Token overlap between consecutive chunks
+        min_fill: Fraction of the budget a chunk's own sentences must fill
+            before it can end at an anchor
+        anchor_every: One sentence in anchor_every is an anchor on average
+        
+    Returns:
+        Tuple of (chunks, token count per chunk without special tokens)
+    """
+    budget = max_tokens - tokenizer.num_special_tokens_to_add(pair=False)
+    overlap_tokens = min(overlap_tokens, budget // 2)
+    pieces = _pieces(text, tokenizer, budget)
+    
+    chunks, counts = [], []
+    current, used, own = [], 0, 0
+    
+    def close():
+        chunks.append(" ".join(current))
+        counts.append(used)
+    
+    for i, (piece, offs, _) in enumerate(pieces):
+        n = len(offs)
+        if current and used + n > budget:
+            if own:
+                close()
+                current, used = _overlap_tail(pieces, i, len(current), overlap_tokens)
+                own = 0
+            if used + n > budget:
+                current, used = [], 0
+        current.append(piece)
+        used += n
+        own += n
+        if own >= min_fill * budget and _is_anchor(piece, anchor_every):
+            close()
+            current, used = _overlap_tail(pieces, i + 1, len(current), overlap_tokens)
+            own = 0
+    if own:
+        close()
+    return chunks, counts
+
+def chunk_document(
+    text: str,
+    tokenizer,
+    max_tokens: int = MAX_SEQ_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS,
+    method: str = CHUNKING,
+) -> Tuple[List[str], List[int]]:
+    """
+    Chunk text with the configured method ("content" or "tokens").
+    
+    Returns:
+        Tuple of (chunks, token count per chunk without special tokens)
+    """
+    if method == "tokens":
+        return chunk_text_by_tokens(text, tokenizer, max_tokens, overlap_tokens)
+    if method == "content":
+        return chunk_text_by_content(text, tokenizer, max_tokens, overlap_tokens)
+    raise ValueError(f"Unknown chunking method {method!r}; use 'content' or 'tokens'")
+
+def token_stats(counts: List[int], tokenizer, max_tokens: int = MAX_SEQ_TOKENS) -> dict:
+    """
+    Summarise chunk token counts against the embedder's sequence limit.
+    
+    Args:
+        counts: Tokens per chunk without special tokens
+        tokenizer: Tokenizer the counts came from
+        max_tokens: Model sequence limit, special tokens included
+        
+    Returns:
+        Dict with mean and max tokens per chunk (special tokens included)
+        and the fraction of chunks the embedder will truncate
+    """
+    if not counts:
+        return {"tokens_per_chunk": 0.0, "max_tokens_per_chunk": 0, "truncation_rate": 0.0}
+    special = tokenizer.num_special_tokens_to_add(pair=False)
+    truncated = sum(1 for c in counts if c + special > max_tokens)
+    return {
+        "tokens_per_chunk": round(sum(counts) / len(counts) + special, 1),
+        "max_tokens_per_chunk": max(counts) + special,
+        "truncation_rate": round(truncated / len(counts), 4),
+    }
@@ -0,0 +1,194 @@
+import os
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from .chunk_table import ChunkTable
+from .chunker import split_sentences
+
+# Tokenizer of gpt-4o-mini, used for budgeting and prompt-size reporting
+LLM_ENCODING = "o200k_base"
+
+# Context tokens allowed per prompt (0 disables the budget)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("RAG_CONTEXT_TOKENS", "600"))
+# Drop retrieved chunks scoring below this fraction of the top score
+SCORE_CUTOFF = float(os.environ.get("RAG_SCORE_CUTOFF", "0.8"))
+# Keep only the N sentences closest to the question from each passage (0 keeps whole chunks)
+CONTEXT_SENTENCES = int(os.environ.get("RAG_CONTEXT_SENTENCES", "0"))
+
+_encoding = None
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """
+    Count gpt-4o-mini tokens for each text in one batch call.
+
+    Args:
+        texts: Strings to count
+
+    Returns:
+        Token count per string
+    """
+    global _encoding
+    if _encoding is None:
+        import tiktoken
+        _encoding = tiktoken.get_encoding(LLM_ENCODING)
+    return [len(t) for t in _encoding.encode_ordinary_batch(texts)]
+
+def _overlap_chars(prev: str, cur: str) -> int:
+    """Length of the longest word-aligned suffix of prev that cur starts with."""
+    start = max(0, len(prev) - len(cur))
+    for p in range(start, len(prev)):
+        if (p == 0 or prev[p - 1] == " ") and cur.startswith(prev[p:]):
+            return len(prev) - p
+    return 0
+
+@dataclass
+class Assembly:
+    context: str
+    ids: np.ndarray          # chunk ids that contributed text, in rank order
+    scores: np.ndarray       # their retrieval scores
+    tokens: int              # tokens in context
+    full_tokens: int         # tokens all retrieved chunks would have cost
+
+class ContextIndex:
+    """
+    Per-document data for budgeted context assembly, built once at ingest.
+
+    For each chunk it records how many leading characters repeat the end of
+    the previous chunk, the sentences of the remaining text with their token
+    counts and, when sentence extraction is enabled, their embeddings.
+    When rebuilt for an updated document, sentence embeddings are copied
+    from the previous ContextIndex and only new sentences are encoded.
+    """
+
+    def __init__(self, table: ChunkTable, encode: Optional[Callable] = None,
+                 previous: Optional["ContextIndex"] = None):
+        chunks = table.chunks
+        self.table = table
+        self.overlap = [0] + [_overlap_chars(a, b) for a, b in zip(chunks, chunks[1:])]
+        self.own = [c[o:].lstrip() for c, o in zip(chunks, self.overlap)]
+
+        sentences, bounds = [], [0]
+        for text in self.own:
+            sentences.extend(split_sentences(text)[0])
+            bounds.append(len(sentences))
+        self.sentences = sentences
+        self.bounds = bounds
+
+        counts = count_tokens(sentences + [f"[Chunk {i}]: {c}" for i, c in enumerate(chunks)])
+        self.sentence_tokens = np.asarray(counts[:len(sentences)], dtype=np.int64)
+        self.fragment_tokens = np.asarray(counts[len(sentences):], dtype=np.int64)
+
+        self.sentence_emb = None
+        if encode is not None and CONTEXT_SENTENCES > 0 and sentences:
+            if previous is not None and previous.sentence_emb is not None:
+                from .incremental import reuse_embeddings
+                self.sentence_emb, _ = reuse_embeddings(
+                    previous.sentences, previous.sentence_emb, sentences,
+                    lambda s: np.asarray(encode(s), dtype=np.float32))
+            else:
+                self.sentence_emb = np.asarray(encode(sentences), dtype=np.float32)
+
+    def _fragments_cost(self, ids: np.ndarray) -> int:
+        """Tokens of the pre-rendered fragments for ids joined by blank lines."""
+        return int(self.fragment_tokens[ids].sum()) + 2 * (len(ids) - 1)
+
+    def assemble(
+        self,
+        ids: np.ndarray,
+        scores: np.ndarray,
+        query_emb: Optional[np.ndarray] = None,
+        budget: int = CONTEXT_TOKEN_BUDGET,
+        cutoff: float = SCORE_CUTOFF,
+        n_sentences: int = CONTEXT_SENTENCES,
+    ) -> Assembly:
+        """
+        Build the LLM context for retrieved chunks within a token budget.
+
+        Chunks scoring below cutoff times the top score are dropped, runs of
+        adjacent chunk ids are merged so their overlap appears once, and
+        passages are added best first until the budget is spent. With
+        n_sentences and a query embedding, each passage is reduced to its
+        n_sentences sentences most similar to the question; a passage that
+        does not fit whole is cut down to its best-fitting sentences.
+
+        Args:
+            ids: Retrieved chunk ids, best first
+            scores: Their similarity scores
+            query_emb: Normalised query embedding from retrieval
+            budget: Maximum context tokens (0 for no limit)
+            cutoff: Relative score cutoff (0 keeps every chunk)
+            n_sentences: Sentences kept per passage (0 keeps whole passages)
+
+        Returns:
+            Assembly with the context string and before/after token counts
+        """
+        if len(ids) == 0:
+            return Assembly("", ids, scores, 0, 0)
+        full_tokens = self._fragments_cost(ids)
+
+        if cutoff > 0 and scores[0] > 0:
+            keep = scores >= cutoff * scores[0]
+            ids, scores = ids[keep], scores[keep]
+
+        use_sentences = (n_sentences > 0 and query_emb is not None
+                         and self.sentence_emb is not None)
+        sorted_ids = np.sort(ids)
+        adjacent = bool(np.any(np.diff(sorted_ids) == 1))
+        if not use_sentences and not adjacent:
+            cost = self._fragments_cost(ids)
+            if not budget or cost <= budget:
+                # Nothing to merge or trim: gather the pre-rendered fragments
+                return Assembly(self.table.context(ids), ids, scores, cost, full_tokens)
+
+        # Runs of consecutive ids, ranked by their best-ranked member
+        runs = np.split(sorted_ids, np.flatnonzero(np.diff(sorted_ids) != 1) + 1)
+        rank = {int(i): r for r, i in enumerate(ids.tolist())}
+        runs.sort(key=lambda run: min(rank[int(i)] for i in run))
+        q = None if query_emb is None else np.asarray(query_emb, dtype=np.float32).reshape(-1)
+
+        parts, used_ids, used = [], [], 0
+        for run in runs:
+            a, b = int(run[0]), int(run[-1])
+            label = f"[Chunk {a}]" if a == b else "[Chunk " + ", ".join(map(str, range(a, b + 1))) + "]"
+            lo, hi = self.bounds[a], self.bounds[b + 1]
+            picked = np.arange(lo, hi)
+            if use_sentences and len(picked) > n_sentences:
+                sims = self.sentence_emb[lo:hi] @ q
+                picked = np.sort(picked[np.argsort(-sims)[:n_sentences]])
+
+            if use_sentences:
+                text = " ".join(self.sentences[s] for s in picked)
+                cost = int(self.sentence_tokens[picked].sum()) + len(picked)
+            else:
+                text = " ".join([self.table.chunks[a]] + self.own[a + 1:b + 1])
+                cost = int(self.fragment_tokens[a] + self.sentence_tokens[self.bounds[a + 1]:hi].sum())
+
+            remaining = budget - used if budget else None
+            if remaining is not None and cost > remaining:
+                # Keep the best sentences that still fit, in document order
+                if q is not None and self.sentence_emb is not None:
+                    order = picked[np.argsort(-(self.sentence_emb[picked] @ q))]
+                else:
+                    order = picked
+                fits, spent = [], 0
+                for s in order.tolist():
+                    c = int(self.sentence_tokens[s]) + 1
+                    if spent + c <= remaining:
+                        fits.append(s)
+                        spent += c
+                if not fits:
+                    break
+                fits.sort()
+                text = " ".join(self.sentences[s] for s in fits)
+                cost = spent
+
+            parts.append(f"{label}: {text}")
+            used_ids.extend(range(a, b + 1))
+            used += cost
+            if budget and used >= budget:
+                break
+
+        context = "\n\n".join(parts)
+        mask = np.isin(ids, used_ids)
+        return Assembly(context, ids[mask], scores[mask],
+                        count_tokens([context])[0] if context else 0, full_tokens)
@@ -0,0 +1,263 @@
+"""
+Out-of-process embedding host.
+
+One model-host process loads the SentenceTransformer and serves every API
+worker over a local Unix socket, so workers no longer each hold their own
+copy of the torch weights and thread pools. Requests from all connections
+are queued and encoded together in one model call per batch.
+
+Wire format (little-endian), one request per round trip:
+    request   op:u8 n:u32, then for OP_ENCODE normalize:u8, n lengths:u32
+              and the concatenated UTF-8 texts
+    response  status:u8 a:u32 b:u32, then for OP_ENCODE rows*dim float32
+              (a=rows, b=dim); for OP_INFO a=dim, b=max_seq_length;
+              on error a=message length followed by the UTF-8 message
+
+Run a host (from nil-rag-copilot):
+    python -m api.services.embed_host --socket /tmp/rag-embed.sock
+
+and point the API workers at it with RAG_EMBED_SOCKET=/tmp/rag-embed.sock
+(comma-separate several sockets to spread workers over several hosts).
+"""
+import argparse
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+OP_INFO = 0
+OP_ENCODE = 1
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_HEADER = struct.Struct("<BI")
+_RESPONSE = struct.Struct("<BII")
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:], n - got)
+        if k == 0:
+            raise ConnectionError("embedding host connection closed")
+        got += k
+    return bytes(buf)
+
+# ── Host ──────────────────────────────────────────────────────────────────────
+class _Batcher:
+    """Collects encode requests from all connections and runs them in shared model calls."""
+
+    def __init__(self, model, max_batch: int, max_wait_ms: float):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: "queue.Queue" = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, texts: List[str], normalize: bool) -> Future:
+        fut = Future()
+        self.queue.put((texts, normalize, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            pending = [self.queue.get()]
+            n = len(pending[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while n < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                n += len(item[0])
+            for normalize in (True, False):
+                group = [p for p in pending if p[1] == normalize]
+                if group:
+                    self._encode(group, normalize)
+
+    def _encode(self, group, normalize: bool):
+        texts = [t for item in group for t in item[0]]
+        try:
+            emb = self.model.encode(texts, normalize_embeddings=normalize,
+                                    show_progress_bar=False, convert_to_numpy=True)
+            emb = np.ascontiguousarray(emb, dtype=np.float32)
+        except Exception as e:
+            for _, _, fut in group:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.texts += len(texts)
+        start = 0
+        for item_texts, _, fut in group:
+            fut.set_result(emb[start:start + len(item_texts)])
+            start += len(item_texts)
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        server = self.server
+        while True:
+            try:
+                op, n = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+            except ConnectionError:
+                return
+            try:
+                if op == OP_INFO:
+                    sock.sendall(_RESPONSE.pack(STATUS_OK, server.dim, server.max_seq_length))
+                    continue
+                if op != OP_ENCODE:
+                    message = f"unknown op {op}".encode("utf-8")
+                    sock.sendall(_RESPONSE.pack(STATUS_ERROR, len(message), 0) + message)
+                    return
+                normalize = _recv_exact(sock, 1)[0] == 1
+                lengths = np.frombuffer(_recv_exact(sock, 4 * n), dtype="<u4")
+                blob = _recv_exact(sock, int(lengths.sum()))
+                texts, start = [], 0
+                for length in lengths.tolist():
+                    texts.append(blob[start:start + length].decode("utf-8"))
+                    start += length
+                emb = server.batcher.submit(texts, normalize).result()
+                rows, dim = emb.shape if emb.ndim == 2 else (0, server.dim)
+                sock.sendall(_RESPONSE.pack(STATUS_OK, rows, dim) + emb.tobytes())
+            except ConnectionError:
+                return
+            except Exception as e:
+                message = str(e).encode("utf-8")
+                sock.sendall(_RESPONSE.pack(STATUS_ERROR, len(message), 0) + message)
+
+class EmbeddingHost(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, model, max_batch: int = 64, max_wait_ms: float = 5.0):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _Handler)
+        self.dim = model.get_sentence_embedding_dimension()
+        self.max_seq_length = model.max_seq_length
+        self.batcher = _Batcher(model, max_batch, max_wait_ms)
+
+def serve(path: str, max_batch: int = 64, max_wait_ms: float = 5.0):
+    from ..thread_budget import budget
+    budget.export_env()
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(MODEL_NAME)
+    budget.apply()
+    with EmbeddingHost(path, model, max_batch, max_wait_ms) as host:
+        logger.info(f"Embedding host serving {MODEL_NAME} on {path} "
+                    f"(max_batch={max_batch}, max_wait_ms={max_wait_ms})")
+        host.serve_forever()
+
+# ── Client ────────────────────────────────────────────────────────────────────
+class RemoteEmbedder:
+    """
+    Drop-in for the parts of SentenceTransformer the API uses: encode(),
+    tokenizer and max_seq_length. Only the tokenizer is loaded in-process.
+
+    Each thread keeps its own connection; with several sockets, threads are
+    spread over the hosts round-robin.
+    """
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self._local = threading.local()
+        self._next = 0
+        self._lock = threading.Lock()
+        self.dim, self.max_seq_length = self._request_info()
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+        return self._tokenizer
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _conn(self) -> socket.socket:
+        sock: Optional[socket.socket] = getattr(self._local, "sock", None)
+        if sock is None:
+            with self._lock:
+                path = self.paths[self._next % len(self.paths)]
+                self._next += 1
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(path)
+            self._local.sock = sock
+        return sock
+
+    def _roundtrip(self, payload: bytes):
+        sock = self._conn()
+        try:
+            sock.sendall(payload)
+            status, a, b = _RESPONSE.unpack(_recv_exact(sock, _RESPONSE.size))
+        except (ConnectionError, OSError):
+            sock.close()
+            self._local.sock = None
+            raise
+        if status != STATUS_OK:
+            raise RuntimeError(f"embedding host error: {_recv_exact(sock, a).decode('utf-8')}")
+        return sock, a, b
+
+    def _request_info(self):
+        _, dim, max_seq_length = self._roundtrip(_HEADER.pack(OP_INFO, 0))
+        return dim, max_seq_length
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **_) -> np.ndarray:
+        """Encode texts on the host; returns a float32 array of shape (n, dim)."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.empty((0, self.dim), dtype=np.float32)
+        data = [s.encode("utf-8") for s in sentences]
+        lengths = np.fromiter(map(len, data), dtype="<u4", count=len(data))
+        payload = b"".join([
+            _HEADER.pack(OP_ENCODE, len(data)),
+            bytes([1 if normalize_embeddings else 0]),
+            lengths.tobytes(),
+            *data,
+        ])
+        sock, rows, dim = self._roundtrip(payload)
+        body = _recv_exact(sock, rows * dim * 4)
+        return np.frombuffer(body, dtype="<f4").reshape(rows, dim)
+
+def remote_embedder_from_env() -> Optional[RemoteEmbedder]:
+    """RemoteEmbedder for RAG_EMBED_SOCKET, or None when the variable is unset."""
+    value = os.environ.get("RAG_EMBED_SOCKET", "").strip()
+    if not value:
+        return None
+    return RemoteEmbedder([p.strip() for p in value.split(",") if p.strip()])
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings over a Unix socket.")
+    parser.add_argument("--socket", default=os.environ.get("RAG_EMBED_SOCKET", "/tmp/rag-embed.sock"))
+    parser.add_argument("--max-batch", type=int, default=64,
+                        help="texts encoded together across connections")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="how long a batch waits for more requests")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve(args.socket, args.max_batch, args.max_wait_ms)
+
+if __name__ == "__main__":
+    main()
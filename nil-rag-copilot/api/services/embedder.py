@@ -2,6 +2,8 @@ from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 from typing import List, Tuple
+from .incremental import reuse_embeddings
+from .vector_store import index_vectors
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 _model = None
@@ -19,9 +21,19 @@ def get_model() -> SentenceTransformer:
         _model = SentenceTransformer(MODEL_NAME)
     return _model
 
-def build_index(chunks: List[str]) -> Tuple[faiss.IndexFlatIP, np.ndarray]:
+def encode(texts: List[str]) -> np.ndarray:
+    """Normalised float32 embeddings for texts."""
+    return get_model().encode(
+        texts,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    ).astype(np.float32)
+
+def build_index(chunks: List[str]) -> Tuple[faiss.Index, np.ndarray]:
     """
     Build FAISS index from text chunks.
+    Vectors are stored at the configured precision and dimension
+    (see vector_store).
     
     Args:
         chunks: List of text chunks to index
@@ -36,8 +48,29 @@ def build_index(chunks: List[str]) -> Tuple[faiss.IndexFlatIP, np.ndarray]:
         show_progress_bar=False
     ).astype(np.float32)
     
-    # Create FAISS index using inner product (cosine similarity with normalized vectors)
-    index = faiss.IndexFlatIP(embeddings.shape[1])
-    index.add(embeddings)
+    # Inner-product index (cosine similarity with normalized vectors)
+    index = index_vectors(embeddings)
     
     return index, embeddings
+
+def update_index(
+    old_chunks: List[str],
+    old_embeddings: np.ndarray,
+    chunks: List[str]
+) -> Tuple[faiss.Index, np.ndarray, dict]:
+    """
+    Build the index for a new version of a document, embedding only new chunks.
+    Unchanged chunks keep their float32 embeddings; the new index is built
+    (and int8 ranges retrained) over all of the new version's vectors.
+    
+    Args:
+        old_chunks: Chunks of the indexed version
+        old_embeddings: Their float32 embeddings, one row per chunk
+        chunks: Chunks of the new version
+        
+    Returns:
+        Tuple of (FAISS index, embeddings array, reused/embedded/removed chunk counts)
+    """
+    embeddings, counts = reuse_embeddings(old_chunks, old_embeddings, chunks, encode)
+    index = index_vectors(embeddings)
+    return index, embeddings, counts
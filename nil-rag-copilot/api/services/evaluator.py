@@ -1,8 +1,9 @@
 import numpy as np
-from typing import List
-from .retriever import retrieve
+from typing import List, Tuple
 from .embedder import get_model
 
+Retrieval = Tuple[np.ndarray, np.ndarray]
+
 def generate_test_questions(chunks: List[str], n: int = 5) -> List[str]:
     """
     Generate test questions from document chunks.
@@ -32,23 +33,17 @@ def generate_test_questions(chunks: List[str], n: int = 5) -> List[str]:
     
     return questions[:n]
 
-def compute_retrieval_precision(questions: List[str], index, chunks: List[str]) -> float:
+def compute_retrieval_precision(retrievals: List[Retrieval]) -> float:
     """
     Compute average retrieval precision across test questions.
     
     Args:
-        questions: List of test questions
-        index: FAISS index
-        chunks: List of text chunks
+        retrievals: (ids, scores) from retrieve() for each test question
         
     Returns:
         Average top-1 similarity score (0-1)
     """
-    scores = []
-    for question in questions:
-        results = retrieve(question, index, chunks)
-        if results:
-            scores.append(results[0][2])  # Top-1 score
+    scores = [float(s[0]) for _, s in retrievals if len(s)]  # Top-1 score
     
     return float(np.mean(scores)) if scores else 0.0
 
@@ -73,23 +68,20 @@ def compute_answer_relevance(questions: List[str], answers: List[str]) -> float:
     
     return float(np.mean(similarities))
 
-def compute_context_coverage(questions: List[str], index, chunks: List[str]) -> float:
+def compute_context_coverage(retrievals: List[Retrieval], n_chunks: int) -> float:
     """
     Compute what fraction of chunks are used across all retrievals.
     
     Args:
-        questions: List of test questions
-        index: FAISS index
-        chunks: List of text chunks
+        retrievals: (ids, scores) from retrieve() for each test question
+        n_chunks: Number of chunks in the document
         
     Returns:
         Fraction of chunks used (0-1)
     """
     used_chunks = set()
     
-    for question in questions:
-        results = retrieve(question, index, chunks)
-        for chunk_idx, _, _ in results:
-            used_chunks.add(chunk_idx)
+    for ids, _ in retrievals:
+        used_chunks.update(ids.tolist())
     
-    return len(used_chunks) / len(chunks) if chunks else 0.0
+    return len(used_chunks) / n_chunks if n_chunks else 0.0
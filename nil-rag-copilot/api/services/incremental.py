@@ -0,0 +1,56 @@
+import numpy as np
+from typing import Callable, List, Tuple
+
+def match_chunks(old_chunks: List[str], new_chunks: List[str]) -> np.ndarray:
+    """
+    Find each new chunk among the old ones by exact text.
+
+    Args:
+        old_chunks: Chunks of the indexed version of the document
+        new_chunks: Chunks of the re-uploaded version
+
+    Returns:
+        int64 array with, per new chunk, the row of an identical old chunk
+        or -1 where the chunk is new
+    """
+    rows = {}
+    for i, chunk in enumerate(old_chunks):
+        rows.setdefault(chunk, i)
+    return np.fromiter((rows.get(c, -1) for c in new_chunks), dtype=np.int64,
+                       count=len(new_chunks))
+
+def reuse_embeddings(
+    old_chunks: List[str],
+    old_embeddings: np.ndarray,
+    new_chunks: List[str],
+    encode: Callable[[List[str]], np.ndarray],
+) -> Tuple[np.ndarray, dict]:
+    """
+    Embeddings for new_chunks, encoding only chunks the old version lacks.
+
+    Rows follow new_chunks, so chunk ids stay positions in the document
+    (ContextIndex merges adjacent ids) and a flat index can be rebuilt from
+    them with a copy instead of a model pass.
+
+    Args:
+        old_chunks: Chunks of the indexed version of the document
+        old_embeddings: Their embeddings, one row per chunk
+        new_chunks: Chunks of the re-uploaded version
+        encode: Encoder returning normalised float32 rows for a list of texts
+
+    Returns:
+        Tuple of (embeddings, counts of reused, re-embedded and removed chunks)
+    """
+    src = match_chunks(old_chunks, new_chunks)
+    reused = src >= 0
+    fresh = np.flatnonzero(~reused)
+    embeddings = np.empty((len(new_chunks), old_embeddings.shape[1]), dtype=np.float32)
+    embeddings[reused] = old_embeddings[src[reused]]
+    if len(fresh):
+        embeddings[fresh] = encode([new_chunks[i] for i in fresh.tolist()])
+    current = set(new_chunks)
+    return embeddings, {
+        "reused_chunks": int(reused.sum()),
+        "embedded_chunks": len(fresh),
+        "removed_chunks": sum(1 for c in old_chunks if c not in current),
+    }
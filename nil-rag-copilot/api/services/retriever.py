@@ -1,20 +1,22 @@
 import numpy as np
-from typing import List, Tuple
+from typing import Tuple
 from .embedder import get_model
 
 TOP_K = 4
 
-def retrieve(query: str, index, chunks: List[str]) -> List[Tuple[int, str, float]]:
+def retrieve(query: str, index, n_chunks: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Retrieve most relevant chunks for a query.
     
     Args:
         query: User question
         index: FAISS index
-        chunks: List of text chunks
+        n_chunks: Number of chunks in the index
         
     Returns:
-        List of tuples (chunk_index, chunk_text, similarity_score)
+        Tuple of (chunk ids, similarity scores) arrays, best match first,
+        and the normalised query embedding; render text with the session's
+        ChunkTable or ContextIndex
     """
     # Encode query
     query_embedding = get_model().encode(
@@ -23,12 +25,8 @@ def retrieve(query: str, index, chunks: List[str]) -> List[Tuple[int, str, float
     ).astype(np.float32)
     
     # Search index
-    scores, indices = index.search(query_embedding, min(TOP_K, len(chunks)))
+    scores, indices = index.search(query_embedding, min(TOP_K, n_chunks))
     
-    # Return results
-    results = []
-    for score, idx in zip(scores[0], indices[0]):
-        if idx >= 0:  # FAISS returns -1 for empty slots
-            results.append((int(idx), chunks[idx], float(score)))
-    
-    return results
+    # FAISS returns -1 for empty slots
+    keep = indices[0] >= 0
+    return indices[0][keep], scores[0][keep], query_embedding[0]
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+def fingerprint(**request: Any) -> str:
+    """
+    Stable key for an LLM request.
+
+    Args:
+        request: JSON-serialisable request fields (model, messages, temperature, ...)
+
+    Returns:
+        SHA-256 hex digest of the canonical JSON encoding
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class _Call:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.done = False
+        self.result: Any = None
+        self.error: BaseException = None
+        self.pieces: list = []
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    with the same key before it finishes (followers) wait for and share its
+    result or exception. Nothing is kept once the call completes, so this is
+    not a cache: a request made after the answer exists starts a new call.
+
+    Calls are blocking and thread-safe; run them off the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.coalesced_streams = 0
+
+    def _join(self, key: str, stream: bool) -> Tuple[_Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                if stream:
+                    self.coalesced_streams += 1
+                else:
+                    self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.calls += 1
+            return call, True
+
+    def _finish(self, key: str, call: _Call):
+        with self._lock:
+            self._calls.pop(key, None)
+        with call.cond:
+            call.done = True
+            call.cond.notify_all()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Request fingerprint
+            fn: Zero-argument callable performing the request
+
+        Returns:
+            fn's result, shared by the leader and its followers
+        """
+        call, leader = self._join("call:" + key, stream=False)
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                self._finish("call:" + key, call)
+        else:
+            with call.cond:
+                call.cond.wait_for(lambda: call.done)
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stream(self, key: str, fn: Callable[[], Iterable[str]]) -> Iterator[str]:
+        """
+        Share one upstream stream among all concurrent callers with the same key.
+
+        The leader's upstream is drained by a background thread into a shared
+        buffer, so a disconnecting client never stalls the others. Every
+        caller, including followers that join mid-stream, receives the full
+        sequence of pieces from the start.
+
+        Args:
+            key: Request fingerprint
+            fn: Zero-argument callable returning an iterator of text pieces
+
+        Returns:
+            Iterator over the pieces
+        """
+        call, leader = self._join("stream:" + key, stream=True)
+        if leader:
+            threading.Thread(target=self._produce, args=(key, call, fn), daemon=True).start()
+        return self._replay(call)
+
+    def _produce(self, key: str, call: _Call, fn: Callable[[], Iterable[str]]):
+        try:
+            for piece in fn():
+                with call.cond:
+                    call.pieces.append(piece)
+                    call.cond.notify_all()
+        except BaseException as e:
+            call.error = e
+        finally:
+            self._finish("stream:" + key, call)
+
+    def _replay(self, call: _Call) -> Iterator[str]:
+        sent = 0
+        while True:
+            with call.cond:
+                call.cond.wait_for(lambda: call.done or len(call.pieces) > sent)
+                new, finished = call.pieces[sent:], call.done
+            yield from new
+            sent += len(new)
+            if finished:
+                if call.error is not None:
+                    raise call.error
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "llm_calls": self.calls,
+            "coalesced_requests": self.coalesced,
+            "coalesced_streams": self.coalesced_streams,
+            "in_flight": in_flight,
+        }
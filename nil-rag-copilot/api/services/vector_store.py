@@ -0,0 +1,314 @@
+"""
+Session vector storage: precision, optional dimension reduction, and a
+quality check against full precision.
+
+Sessions store chunk vectors in a FAISS inner-product index whose codes can
+be float32 (IndexFlatIP, exact), float16 or int8 (IndexScalarQuantizer; int8
+trains per-dimension ranges on the document, and is retrained on every
+rebuild so vectors of an updated document are not clipped to the first
+version's ranges). Sessions with fewer than INT8_MIN_VECTORS chunks store
+float16 instead of int8, since ranges trained on a handful of vectors are
+degenerate (a single vector has min == max in every dimension). With RAG_PCA_DIM, vectors are
+first projected onto the top principal directions of the model's embedding
+space (an IndexPreTransform). The projection is fitted once per model on a
+sample corpus with
+
+    python -m api.services.vector_store fit-pca --dim 128 docs/*.pdf
+
+and loaded from RAG_PCA_PATH. It is uncentered (top right singular vectors
+of the raw embeddings), so projected inner products approximate the original
+cosine scores instead of shifting them by a per-chunk mean term.
+
+storage_check() measures, for each setting, recall@k and top-1 agreement with
+exact float32 search, how far the returned scores drift from the exact
+cosine scores, index bytes per vector, and search time.
+
+Configuration (environment):
+    RAG_VECTOR_PRECISION  float32 (default), float16 or int8
+    RAG_PCA_DIM           projected dimension (0, the default, keeps all)
+    RAG_PCA_PATH          projection file (default pca-<model>-<dim>.npy)
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+PRECISIONS = ("float32", "float16", "int8")
+
+VECTOR_PRECISION = os.environ.get("RAG_VECTOR_PRECISION", "float32").strip().lower()
+PCA_DIM = int(os.environ.get("RAG_PCA_DIM", "0"))
+PCA_PATH = os.environ.get("RAG_PCA_PATH", "") or f"pca-{MODEL_NAME}-{PCA_DIM}.npy"
+
+# Fewest vectors int8 ranges are trained on; smaller sessions use float16
+INT8_MIN_VECTORS = 16
+
+
+@dataclass(frozen=True)
+class StorageConfig:
+    precision: str = "float32"
+    dim: int = 0            # projected dimension; 0 keeps the model's
+
+    @property
+    def label(self) -> str:
+        return self.precision + (f"/pca{self.dim}" if self.dim else "")
+
+
+def fit_projection(embeddings: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Uncentered PCA: the top `dim` right singular vectors of the embeddings.
+
+    Args:
+        embeddings: Sample of normalised model embeddings, one row each
+        dim: Output dimension
+
+    Returns:
+        (dim, d) float32 matrix with orthonormal rows
+    """
+    n, d = embeddings.shape
+    if not 0 < dim < d:
+        raise ValueError(f"PCA dimension must be between 1 and {d - 1}, got {dim}")
+    if n < dim:
+        raise ValueError(f"Need at least {dim} sample vectors to fit {dim} dimensions, got {n}")
+    _, _, vt = np.linalg.svd(np.asarray(embeddings, dtype=np.float64), full_matrices=False)
+    return np.ascontiguousarray(vt[:dim], dtype=np.float32)
+
+
+def explained_energy(embeddings: np.ndarray, projection: np.ndarray) -> float:
+    """Fraction of the embeddings' squared norm the projection keeps."""
+    kept = np.square(embeddings @ projection.T).sum()
+    return float(kept / np.square(embeddings).sum())
+
+
+_projection = None
+_projection_loaded = False
+
+
+def get_projection() -> Optional[np.ndarray]:
+    """The configured projection, loaded once; None when RAG_PCA_DIM is 0 or the file is missing."""
+    global _projection, _projection_loaded
+    if not _projection_loaded:
+        _projection_loaded = True
+        if PCA_DIM > 0:
+            try:
+                projection = np.load(PCA_PATH)
+            except FileNotFoundError:
+                logger.warning(f"RAG_PCA_DIM={PCA_DIM} but {PCA_PATH} does not exist; "
+                               f"storing full-dimension vectors. Fit it with "
+                               f"`python -m api.services.vector_store fit-pca`.")
+            else:
+                if projection.shape[0] != PCA_DIM:
+                    raise ValueError(f"{PCA_PATH} projects to {projection.shape[0]} "
+                                     f"dimensions, RAG_PCA_DIM is {PCA_DIM}")
+                _projection = projection.astype(np.float32)
+                logger.info(f"Projecting session vectors to {PCA_DIM} dimensions ({PCA_PATH}).")
+    return _projection
+
+
+def default_config(n_vectors: Optional[int] = None) -> StorageConfig:
+    """The configured storage, for an index of n_vectors vectors when given."""
+    if VECTOR_PRECISION not in PRECISIONS:
+        raise ValueError(f"RAG_VECTOR_PRECISION must be one of {', '.join(PRECISIONS)}")
+    projection = get_projection()
+    config = StorageConfig(VECTOR_PRECISION, 0 if projection is None else projection.shape[0])
+    if config.precision == "int8" and n_vectors is not None and n_vectors < INT8_MIN_VECTORS:
+        config = replace(config, precision="float16")
+    return config
+
+
+def make_index(d: int, config: StorageConfig, projection: Optional[np.ndarray] = None):
+    """
+    Empty inner-product index for d-dimensional vectors stored per config.
+
+    Args:
+        d: Model embedding dimension
+        config: Precision and projected dimension
+        projection: (config.dim, d) matrix, required when config.dim is set
+
+    Returns:
+        Untrained FAISS index taking d-dimensional vectors
+    """
+    import faiss
+    stored = config.dim or d
+    if config.precision == "float32":
+        index = faiss.IndexFlatIP(stored)
+    else:
+        qtype = {"float16": faiss.ScalarQuantizer.QT_fp16,
+                 "int8": faiss.ScalarQuantizer.QT_8bit}[config.precision]
+        index = faiss.IndexScalarQuantizer(stored, qtype, faiss.METRIC_INNER_PRODUCT)
+    if not config.dim:
+        return index
+    if projection is None or projection.shape != (config.dim, d):
+        raise ValueError(f"{config.label} needs a ({config.dim}, {d}) projection")
+    transform = faiss.LinearTransform(d, config.dim, False)
+    faiss.copy_array_to_vector(np.ascontiguousarray(projection, dtype=np.float32).ravel(),
+                               transform.A)
+    transform.is_trained = True
+    transform.set_is_orthonormal()
+    return faiss.IndexPreTransform(transform, index)
+
+
+def index_vectors(embeddings: np.ndarray, config: Optional[StorageConfig] = None,
+                  projection: Optional[np.ndarray] = None):
+    """
+    Index embeddings with the given (default: configured) storage.
+
+    A new index is built and, for int8, trained on these embeddings, so an
+    updated document gets ranges covering all of its current vectors.
+
+    Args:
+        embeddings: Normalised float32 vectors, one row per chunk
+        config: Storage setting; defaults to the environment's, with
+            float16 in place of int8 below INT8_MIN_VECTORS vectors
+        projection: PCA projection; defaults to the configured one
+
+    Returns:
+        FAISS index holding the embeddings
+    """
+    if config is None:
+        config = default_config(len(embeddings))
+        projection = get_projection() if projection is None else projection
+    index = make_index(embeddings.shape[1], config, projection)
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    return index
+
+
+def index_bytes(index) -> int:
+    """Serialized size of an index: codes, trained parameters and any projection."""
+    import faiss
+    return int(faiss.serialize_index(index).size)
+
+
+def storage_check(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    configs: Sequence[StorageConfig],
+    k: int = 4,
+    projection: Optional[np.ndarray] = None,
+    repeat: int = 5,
+) -> List[dict]:
+    """
+    Compare storage settings against exact float32 search.
+
+    Args:
+        embeddings: Full-precision chunk embeddings
+        queries: Normalised query embeddings
+        configs: Settings to measure; PCA settings need `projection`
+            fitted to at least their dimension
+        k: Neighbours retrieved per query
+        projection: Projection whose first `dim` rows serve each PCA setting
+        repeat: Searches timed per setting (the best is reported)
+
+    Returns:
+        One dict per setting with recall@k and top-1 agreement against exact
+        search, mean and max drift of the returned scores from the exact
+        cosine scores of the same chunks, bytes per vector and relative to
+        float32, and search time per query and relative to exact search
+    """
+    import faiss
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, len(embeddings))
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+    exact_s = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _, exact_ids = exact.search(queries, k)
+        exact_s = min(exact_s, time.perf_counter() - t0)
+    baseline = index_bytes(exact)
+
+    results = []
+    for config in configs:
+        proj = projection[:config.dim] if config.dim else None
+        index = index_vectors(embeddings, config, proj)
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            scores, ids = index.search(queries, k)
+            best = min(best, time.perf_counter() - t0)
+        true_scores = np.einsum("qkd,qd->qk", embeddings[ids], queries)
+        drift = np.abs(scores - true_scores)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(ids.tolist(), exact_ids.tolist())])
+        size = index_bytes(index)
+        results.append({
+            "storage": config.label,
+            "recall_at_k": round(float(recall), 4),
+            "top1_agreement": round(float(np.mean(ids[:, 0] == exact_ids[:, 0])), 4),
+            "score_drift_mean": round(float(drift.mean()), 5),
+            "score_drift_max": round(float(drift.max()), 5),
+            "bytes_per_vector": round(size / len(embeddings), 1),
+            "memory_vs_float32": round(size / baseline, 3),
+            "search_us_per_query": round(best / len(queries) * 1e6, 2),
+            "search_vs_float32": round(best / exact_s, 3),
+        })
+    return results
+
+
+def probe_queries(chunks: List[str], limit: int = 200) -> List[str]:
+    """First sentence of each chunk (up to limit), as stand-in questions for the check."""
+    from .chunker import split_sentences
+    step = max(1, len(chunks) // limit)
+    queries = []
+    for chunk in chunks[::step][:limit]:
+        sentences = split_sentences(chunk)[0]
+        if sentences:
+            queries.append(sentences[0])
+    return queries
+
+
+def check_dims(projection: Optional[np.ndarray], requested: Sequence[int] = ()) -> List[int]:
+    """PCA dimensions the projection can serve: requested ones, or its own and half of it."""
+    if projection is None:
+        return []
+    if requested:
+        return [d for d in requested if 0 < d <= projection.shape[0]]
+    return sorted({projection.shape[0], projection.shape[0] // 2} - {0}, reverse=True)
+
+
+def all_configs(dims: Sequence[int] = ()) -> List[StorageConfig]:
+    """Every precision at full dimension and at each of dims."""
+    return [StorageConfig(p, dim) for dim in (0, *dims) for p in PRECISIONS]
+
+
+def main():
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="Fit the PCA projection for session vectors")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit = sub.add_parser("fit-pca", help="fit on PDFs or text files and save RAG_PCA_PATH")
+    fit.add_argument("files", nargs="+", type=Path, help="sample PDFs or .txt files")
+    fit.add_argument("--dim", type=int, default=PCA_DIM or 128)
+    fit.add_argument("--out", help="output path (default RAG_PCA_PATH or pca-<model>-<dim>.npy)")
+    args = parser.parse_args()
+
+    from .chunker import chunk_document
+    from .embedder import encode, get_model
+    from .pdf_parser import extract_text_from_pdf
+
+    model = get_model()
+    chunks = []
+    for path in args.files:
+        if path.suffix.lower() == ".pdf":
+            text = extract_text_from_pdf(path.read_bytes())
+        else:
+            text = path.read_text()
+        chunks.extend(chunk_document(text, model.tokenizer, model.max_seq_length)[0])
+    embeddings = encode(chunks)
+    projection = fit_projection(embeddings, args.dim)
+    out = args.out or os.environ.get("RAG_PCA_PATH") or f"pca-{MODEL_NAME}-{args.dim}.npy"
+    np.save(out, projection)
+    print(f"Fitted {args.dim} of {embeddings.shape[1]} dimensions on {len(chunks)} chunks "
+          f"({explained_energy(embeddings, projection):.1%} of the energy kept); saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Startup subsystem for the RAG API.
+
+The heavy dependencies (pdfplumber, faiss, openai and sentence-transformers,
+which pulls in torch) are no longer imported when api.main loads. Instead the
+lifespan hook starts a warm-up task that imports them, loads the embedder,
+encodes a probe sentence, runs a tiny FAISS search and loads the tiktoken
+encoding used for context budgeting, so the first /ingest or /chat does not
+pay for any of it. /health answers as soon as the process is listening;
+/ready only reports ready once warm-up has finished.
+
+Configuration (environment):
+    RAG_WARMUP          "eager" (default) warms up in the background at startup,
+                        "lazy" skips warm-up and loads on first use (/ready is
+                        immediately ready), "off" is an alias for "lazy".
+    RAG_IMPORT_PROFILE  "1" logs the wall time of each heavy import.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HEAVY_MODULES = ("numpy", "faiss", "sentence_transformers", "pdfplumber", "openai")
+WARMUP_PROBE = "Warm-up probe sentence for the embedding model."
+
+# Time the interpreter had started by the time this module was imported;
+# close enough to process start for the uvicorn entry point.
+_PROCESS_T0 = time.perf_counter()
+
+
+def warmup_mode() -> str:
+    mode = os.environ.get("RAG_WARMUP", "eager").strip().lower()
+    if mode == "off":
+        mode = "lazy"
+    if mode not in ("eager", "lazy"):
+        logger.warning(f"Unknown RAG_WARMUP={mode!r}, falling back to 'eager'.")
+        mode = "eager"
+    return mode
+
+
+def import_profiling_enabled() -> bool:
+    return os.environ.get("RAG_IMPORT_PROFILE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def heavy_modules():
+    """HEAVY_MODULES, without torch when embeddings come from an embedding host."""
+    if os.environ.get("RAG_EMBED_SOCKET", "").strip():
+        return tuple("transformers" if m == "sentence_transformers" else m for m in HEAVY_MODULES)
+    return HEAVY_MODULES
+
+
+def profile_imports(modules=None) -> Dict[str, float]:
+    """
+    Import each module in turn and return the wall time it took in ms.
+
+    Modules already in sys.modules report (close to) zero, so the order
+    matters: numpy first keeps its cost out of the faiss figure.
+    """
+    if modules is None:
+        modules = heavy_modules()
+    timings = {}
+    for name in modules:
+        t0 = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+    if import_profiling_enabled():
+        for name, ms in timings.items():
+            logger.info(f"import {name}: {ms:.1f} ms")
+    return timings
+
+
+class StartupState:
+    """Tracks warm-up progress for /ready."""
+
+    def __init__(self):
+        self.mode = warmup_mode()
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.import_ms: Dict[str, float] = {}
+        self.timings_ms: Dict[str, float] = {}
+        self.ready_after_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def mark_ready(self):
+        self.status = "ready"
+        self.ready_after_ms = round((time.perf_counter() - _PROCESS_T0) * 1000, 1)
+        logger.info(f"Ready {self.ready_after_ms:.0f} ms after process start "
+                    f"(warm-up mode: {self.mode}).")
+
+    def report(self) -> dict:
+        return {
+            "status": self.status,
+            "warmup_mode": self.mode,
+            "ready_after_ms": self.ready_after_ms,
+            "import_ms": self.import_ms,
+            "warmup_ms": self.timings_ms,
+            "error": self.error,
+        }
+
+    def run_warmup(self, get_model: Callable, build_index: Callable):
+        """Blocking warm-up; run in a worker thread so the event loop stays free."""
+        self.status = "warming"
+        self.import_ms = profile_imports()
+
+        t0 = time.perf_counter()
+        get_model().tokenizer
+        t1 = time.perf_counter()
+        index = build_index([WARMUP_PROBE])
+        t2 = time.perf_counter()
+        q = get_model().encode([WARMUP_PROBE], normalize_embeddings=True).astype("float32")
+        index.search(q, 1)
+        t3 = time.perf_counter()
+        from .services.context import count_tokens
+        count_tokens([WARMUP_PROBE])
+        t4 = time.perf_counter()
+
+        self.timings_ms = {
+            "model_load": round((t1 - t0) * 1000, 1),
+            "encode_and_index": round((t2 - t1) * 1000, 1),
+            "encode_and_search": round((t3 - t2) * 1000, 1),
+            "llm_tokenizer": round((t4 - t3) * 1000, 1),
+        }
+        logger.info(f"Warm-up done: {self.timings_ms}")
+
+    def start(self, get_model: Callable, build_index: Callable):
+        """Kick off warm-up from the lifespan hook without blocking startup."""
+        if self.mode == "lazy":
+            self.mark_ready()
+            return
+
+        async def _warm():
+            try:
+                await asyncio.to_thread(self.run_warmup, get_model, build_index)
+            except Exception as e:
+                self.status = "failed"
+                self.error = str(e)
+                logger.exception("Warm-up failed.")
+                return
+            self.mark_ready()
+
+        self._task = asyncio.create_task(_warm())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
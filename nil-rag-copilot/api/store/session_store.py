@@ -1,29 +1,65 @@
 import uuid
 from typing import Dict, Any
+from ..services.chunk_table import ChunkTable
+from ..services.context import ContextIndex
 
 # In-memory session storage
 _sessions: Dict[str, Any] = {}
 
-def create_session(index, chunks: list, word_count: int) -> str:
+def _session(index, chunks: list, word_count: int, encode=None, previous: dict = None,
+             embeddings=None) -> dict:
+    table = ChunkTable(chunks)
+    return {
+        "index": index,
+        "embeddings": embeddings,
+        "chunks": chunks,
+        "table": table,
+        "context": ContextIndex(table, encode, previous["context"] if previous else None),
+        "word_count": word_count
+    }
+
+def create_session(index, chunks: list, word_count: int, encode=None,
+                   embeddings=None) -> str:
     """
     Create a new session with document index and metadata.
+    Citation and context artifacts are rendered once here into a ChunkTable
+    and a ContextIndex.
     
     Args:
         index: FAISS index
         chunks: List of text chunks
         word_count: Total word count in document
+        encode: Sentence encoder for context sentence extraction (optional)
+        embeddings: float32 chunk embeddings, kept for document updates (optional)
         
     Returns:
         Session ID (UUID)
     """
     session_id = str(uuid.uuid4())
-    _sessions[session_id] = {
-        "index": index,
-        "chunks": chunks,
-        "word_count": word_count
-    }
+    _sessions[session_id] = _session(index, chunks, word_count, encode, embeddings=embeddings)
     return session_id
 
+def update_session(session_id: str, index, chunks: list, word_count: int,
+                   encode=None, embeddings=None) -> None:
+    """
+    Replace a session's document with a new version of it.
+    The session is swapped in one assignment, so requests already holding
+    the previous version finish with it.
+    
+    Args:
+        session_id: Session to update
+        index: FAISS index of the new version
+        chunks: Its text chunks
+        word_count: Its word count
+        encode: Sentence encoder for context sentence extraction (optional)
+        embeddings: float32 chunk embeddings, kept for document updates (optional)
+        
+    Raises:
+        KeyError: If session not found
+    """
+    previous = get_session(session_id)
+    _sessions[session_id] = _session(index, chunks, word_count, encode, previous, embeddings)
+
 def get_session(session_id: str) -> dict:
     """
     Retrieve a session by ID.
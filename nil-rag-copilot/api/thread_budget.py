@@ -0,0 +1,118 @@
+"""
+CPU thread budget for the RAG API.
+
+torch (SentenceTransformer.encode) and FAISS (OpenMP inside index.search)
+each default to one thread per core, per process. With several uvicorn
+workers on one host that oversubscribes the CPU many times over.
+ThreadBudget splits a per-host core budget across the workers and sizes
+both from the worker's share:
+
+    torch intra-op threads   share (set once; torch's setting is process-wide)
+    FAISS OpenMP threads     1 for one-row searches, share for multi-row
+                             searches (omp_set_num_threads is per calling
+                             thread, so this is set on every search)
+
+The thread pools behind asyncio.to_thread and Starlette's sync endpoints are
+not part of the budget: their threads mostly wait on OpenAI calls and
+streamed responses, so they stay large (RAG_THREAD_POOL, default
+max(40, 4 x share)) to keep long requests from queueing everything else.
+
+Configuration (environment):
+    RAG_CPU_BUDGET   cores available to all workers on this host
+                     (default: the CPUs this process may run on)
+    RAG_WORKERS      workers sharing the budget (default: WEB_CONCURRENCY,
+                     which uvicorn also reads, or 1)
+    RAG_THREAD_POOL  size of the blocking I/O pools per worker
+"""
+import logging
+import os
+import sys
+from dataclasses import dataclass, asdict
+
+logger = logging.getLogger(__name__)
+
+# Floor for the I/O pools; Starlette's own default limiter is 40 threads
+MIN_POOL_SIZE = 40
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    return max(1, int(value)) if value else default
+
+
+@dataclass
+class ThreadBudget:
+    cpu_budget: int
+    workers: int
+    per_worker: int
+    torch_threads: int
+    faiss_single_threads: int
+    faiss_batch_threads: int
+    pool_size: int
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        cpu_budget = _env_int("RAG_CPU_BUDGET", _available_cpus())
+        workers = _env_int("RAG_WORKERS", _env_int("WEB_CONCURRENCY", 1))
+        share = max(1, cpu_budget // workers)
+        return cls(
+            cpu_budget=cpu_budget,
+            workers=workers,
+            per_worker=share,
+            torch_threads=share,
+            faiss_single_threads=1,
+            faiss_batch_threads=share,
+            pool_size=_env_int("RAG_THREAD_POOL", max(MIN_POOL_SIZE, 4 * share)),
+        )
+
+    def export_env(self):
+        """Cap OpenMP/MKL pools for libraries imported later; explicit settings win."""
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ.setdefault(name, str(self.per_worker))
+
+    def apply(self):
+        """Apply the budget to whichever of torch and FAISS are already imported."""
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.get_num_threads() != self.torch_threads:
+            torch.set_num_threads(self.torch_threads)
+            logger.info(f"torch threads: {self.torch_threads}")
+        faiss = sys.modules.get("faiss")
+        if faiss is not None:
+            faiss.omp_set_num_threads(self.faiss_batch_threads)
+
+    def faiss_threads(self, rows: int) -> int:
+        """OpenMP threads for a FAISS search over `rows` query vectors."""
+        return self.faiss_single_threads if rows <= 1 else min(rows, self.faiss_batch_threads)
+
+    def set_search_threads(self, rows: int):
+        """Set FAISS OpenMP threads for the calling thread's next search."""
+        faiss = sys.modules.get("faiss")
+        if faiss is not None:
+            faiss.omp_set_num_threads(self.faiss_threads(rows))
+
+    def install_pools(self, loop):
+        """Size the pools behind asyncio.to_thread and Starlette's sync endpoints."""
+        from concurrent.futures import ThreadPoolExecutor
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="rag-blocking"))
+        try:
+            import anyio.to_thread
+            anyio.to_thread.current_default_thread_limiter().total_tokens = self.pool_size
+        except (ImportError, RuntimeError):
+            pass
+
+    def report(self) -> dict:
+        report = asdict(self)
+        torch = sys.modules.get("torch")
+        report["torch_threads_actual"] = torch.get_num_threads() if torch is not None else None
+        return report
+
+
+budget = ThreadBudget.from_env()
@@ -0,0 +1,116 @@
+"""
+Per-worker memory and total encode throughput: in-process model vs embedding host.
+
+Starts --workers processes that each encode --requests batches of --batch
+sentences at the same time, once with their own SentenceTransformer and
+once through a shared embedding host (api/services/embed_host.py). Reports
+the RSS of every worker and of the host, and texts encoded per second
+across all workers.
+
+Usage (from nil-rag-copilot):
+    python benchmarks/bench_embed_host.py --workers 4 --batch 8 --requests 50
+"""
+import argparse
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+TEXT = "Spiking neural networks communicate through discrete events rather than dense activations."
+
+
+def rss_mb(pid="self") -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def worker(mode: str, socket_path: str, batch: int, requests: int, barrier, results):
+    if mode == "host":
+        from api.services.embed_host import RemoteEmbedder
+        model = RemoteEmbedder([socket_path])
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+    texts = [f"{TEXT} ({i})" for i in range(batch)]
+    model.encode(texts, normalize_embeddings=True)
+    barrier.wait()
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        model.encode(texts, normalize_embeddings=True)
+    results.put((time.perf_counter() - t0, rss_mb()))
+
+
+def wait_for_socket(path: str, proc: subprocess.Popen, timeout: float = 300):
+    deadline = time.perf_counter() + timeout
+    while not os.path.exists(path):
+        if proc.poll() is not None:
+            raise RuntimeError(f"embedding host exited with code {proc.returncode}")
+        if time.perf_counter() > deadline:
+            raise TimeoutError("embedding host did not start")
+        time.sleep(0.1)
+
+
+def run(mode: str, args) -> dict:
+    ctx = mp.get_context("spawn")
+    host, socket_path = None, os.path.join(tempfile.mkdtemp(), "embed.sock")
+    if mode == "host":
+        host = subprocess.Popen(
+            [sys.executable, "-m", "api.services.embed_host", "--socket", socket_path,
+             "--max-batch", str(args.max_batch), "--max-wait-ms", str(args.max_wait_ms)],
+            cwd=ROOT)
+        wait_for_socket(socket_path, host)
+    try:
+        barrier, results = ctx.Barrier(args.workers), ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(mode, socket_path, args.batch,
+                                                  args.requests, barrier, results))
+                 for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        out = [results.get() for _ in procs]
+        host_rss = rss_mb(host.pid) if host else 0.0
+        for p in procs:
+            p.join()
+    finally:
+        if host:
+            host.terminate()
+            host.wait(timeout=30)
+    elapsed = max(e for e, _ in out)
+    worker_rss = [r for _, r in out]
+    return {
+        "texts_per_s": args.workers * args.requests * args.batch / elapsed,
+        "worker_rss_mb": sum(worker_rss) / len(worker_rss),
+        "host_rss_mb": host_rss,
+        "total_rss_mb": sum(worker_rss) + host_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=8, help="texts per encode call")
+    parser.add_argument("--requests", type=int, default=50, help="encode calls per worker")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--modes", nargs="+", default=["inprocess", "host"],
+                        choices=["inprocess", "host"])
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.requests} requests x {args.batch} texts")
+    print(f"{'mode':<10}{'texts/s':>10}{'RSS/worker MB':>15}{'host RSS MB':>13}{'total RSS MB':>14}")
+    for mode in args.modes:
+        r = run(mode, args)
+        print(f"{mode:<10}{r['texts_per_s']:>10.0f}{r['worker_rss_mb']:>15.0f}"
+              f"{r['host_rss_mb']:>13.0f}{r['total_rss_mb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
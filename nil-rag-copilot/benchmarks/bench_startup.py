@@ -0,0 +1,161 @@
+"""
+Cold-start benchmark for the RAG API.
+
+Starts uvicorn in a fresh process, polls a readiness path until it returns
+200 and records the time from process start, then times the first /ingest
+(PDF parse, model use, FAISS build) and a second one for comparison. Each
+configuration is run --runs times in new processes so nothing is cached in
+memory between measurements.
+
+Usage (from nil-rag-copilot):
+    python benchmarks/bench_startup.py                    # lazy vs eager warm-up
+    python benchmarks/bench_startup.py --modes eager --runs 5
+
+To measure the code before the startup subsystem existed, check out that
+revision in a separate worktree and point --app-dir at it with
+--ready-path /health (it has no /ready):
+    git worktree add /tmp/rag-before <rev>
+    python benchmarks/bench_startup.py --app-dir /tmp/rag-before/nil-rag-copilot \\
+        --ready-path /health --modes lazy
+
+For a per-module import breakdown, run with RAG_IMPORT_PROFILE=1 and read the
+server log, or use `python -X importtime -c "import api.main"`.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_pdf(text: str) -> bytes:
+    """Build a minimal single-page PDF with one line of Helvetica text."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref)
+    return bytes(out)
+
+
+def post_pdf(url: str, pdf: bytes) -> int:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="bench.pdf"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + pdf + f"\r\n--{boundary}--\r\n".encode()
+    req = urllib.request.Request(
+        url, data=body, method="POST",
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        return resp.status
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def run_once(app_dir: Path, mode: str, ready_path: str, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, RAG_WARMUP=mode)
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    pdf = make_pdf("Neuromorphic inference benchmark document " * 4)
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir, env=env)
+    try:
+        wait_ready(base + ready_path, proc, timeout)
+        t_ready = time.perf_counter()
+        post_pdf(base + "/api/v1/ingest", pdf)
+        t_first = time.perf_counter()
+        post_pdf(base + "/api/v1/ingest", pdf)
+        t_second = time.perf_counter()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    return {
+        "start_to_ready_s": t_ready - t0,
+        "first_request_s": t_first - t_ready,
+        "second_request_s": t_second - t_first,
+        "start_to_first_response_s": t_first - t0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--app-dir", type=Path, default=ROOT)
+    parser.add_argument("--modes", nargs="+", default=["lazy", "eager"],
+                        choices=["lazy", "eager"])
+    parser.add_argument("--ready-path", default="/ready")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        runs = [run_once(args.app_dir, mode, args.ready_path, args.timeout)
+                for _ in range(args.runs)]
+        results[mode] = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    keys = ["start_to_ready_s", "first_request_s", "second_request_s",
+            "start_to_first_response_s"]
+    print(f"{'mode':<8}" + "".join(f"{k:>28}" for k in keys))
+    for mode, r in results.items():
+        print(f"{mode:<8}" + "".join(f"{r[k]:>28.3f}" for k in keys))
+    print(f"(median of {args.runs} runs, ready path {args.ready_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Retrieval throughput across workers x threads.
+
+For each (workers, threads) pair, starts `workers` processes that each pin
+torch and OpenMP to `threads` threads, then run encode + FAISS search for
+--seconds: single questions (as /chat does) or batches of --batch questions
+(as /chat/batch and /eval do). FAISS uses one thread for single-row searches
+and `threads` for batches, as ThreadBudget chooses. Prints host-wide
+questions per second so oversubscription (workers x threads > cores) shows
+up directly.
+
+Usage (from nil-rag-copilot):
+    python benchmarks/bench_threads.py --workers 1 2 4 --threads 1 2 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+QUESTION = "How are latency percentiles computed for the inference service?"
+N_CHUNKS = 2000
+DIM = 384
+
+
+def worker(threads: int, batch: int, seconds: float, barrier, results):
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    import faiss
+    import numpy as np
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((N_CHUNKS, DIM)).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    index = faiss.IndexFlatIP(DIM)
+    index.add(emb)
+    questions = [f"{QUESTION} ({i})" for i in range(batch)]
+
+    def step():
+        q = model.encode(questions, normalize_embeddings=True,
+                         show_progress_bar=False).astype(np.float32)
+        faiss.omp_set_num_threads(1 if batch == 1 else threads)
+        index.search(q, 4)
+
+    step()
+    barrier.wait()
+    done, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        step()
+        done += batch
+    results.put(done / (time.perf_counter() - t0))
+
+
+def run(workers: int, threads: int, args) -> float:
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(threads, args.batch, args.seconds, barrier, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    total = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch", type=int, default=1, help="questions per encode + search")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{cores} cores, batch={args.batch}, questions/s summed over workers")
+    print(f"{'workers':>8}" + "".join(f"{f'{t} thr':>10}" for t in args.threads))
+    for w in args.workers:
+        row = [run(w, t, args) for t in args.threads]
+        print(f"{w:>8}" + "".join(f"{qps:>10.1f}" for qps in row))
+
+
+if __name__ == "__main__":
+    main()
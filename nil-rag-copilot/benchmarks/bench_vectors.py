@@ -0,0 +1,73 @@
+"""
+Session vector storage: quality against memory and search time.
+
+Chunks the given documents into one corpus, embeds it once at full
+precision and runs vector_store.storage_check for float32, float16 and int8
+storage at full dimension and at each --dims PCA dimension. Prints recall@k
+and top-1 agreement against exact float32 search, score drift, bytes per
+vector and search time per query.
+
+The projection is fitted on --fit files when given, otherwise on the corpus
+itself, which flatters PCA; fit on other documents to see what a projection
+fitted once per model costs on unseen text.
+
+Usage (from nil-rag-copilot):
+    python benchmarks/bench_vectors.py docs/*.pdf --dims 192 128 64
+    python benchmarks/bench_vectors.py docs/a.pdf --fit docs/other/*.pdf
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.services import vector_store  # noqa: E402
+from api.services.chunker import chunk_document  # noqa: E402
+
+
+def load_chunks(paths, model):
+    from api.services.pdf_parser import extract_text_from_pdf
+    chunks = []
+    for path in paths:
+        text = (extract_text_from_pdf(path.read_bytes()) if path.suffix.lower() == ".pdf"
+                else path.read_text())
+        chunks.extend(chunk_document(text, model.tokenizer, model.max_seq_length)[0])
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="+", type=Path, help="PDFs or .txt files to index")
+    parser.add_argument("--fit", nargs="+", type=Path, help="documents to fit the projection on")
+    parser.add_argument("--dims", type=int, nargs="+", default=[192, 128, 64])
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    from api.services.embedder import encode, get_model
+    model = get_model()
+    chunks = load_chunks(args.files, model)
+    embeddings = encode(chunks)
+    queries = encode(vector_store.probe_queries(chunks))
+
+    fit = encode(load_chunks(args.fit, model)) if args.fit else embeddings
+    dims = [d for d in args.dims if d <= min(len(fit), embeddings.shape[1] - 1)]
+    if len(dims) < len(args.dims):
+        print(f"Skipping PCA dimensions above {min(len(fit), embeddings.shape[1] - 1)} "
+              f"(the fitting set has {len(fit)} chunks)")
+    projection = vector_store.fit_projection(fit, max(dims)) if dims else None
+
+    print(f"{len(chunks)} chunks, {len(queries)} queries, k={args.k}, "
+          f"projection fitted on {'--fit files' if args.fit else 'the corpus'}")
+    print(f"{'storage':<15}{'recall@k':>9}{'top-1':>8}{'drift':>9}{'max drift':>11}"
+          f"{'B/vector':>10}{'memory':>8}{'us/query':>10}{'time':>7}")
+    results = vector_store.storage_check(embeddings, queries, vector_store.all_configs(dims),
+                                         k=args.k, projection=projection)
+    for r in results:
+        print(f"{r['storage']:<15}{r['recall_at_k']:>9.3f}{r['top1_agreement']:>8.3f}"
+              f"{r['score_drift_mean']:>9.4f}{r['score_drift_max']:>11.4f}"
+              f"{r['bytes_per_vector']:>10.0f}{r['memory_vs_float32']:>8.2f}"
+              f"{r['search_us_per_query']:>10.1f}{r['search_vs_float32']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
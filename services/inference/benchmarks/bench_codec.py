@@ -0,0 +1,119 @@
+"""
+Microbenchmarks for the /predict request and response codecs.
+
+Compares per-request parse and serialize cost of the original JSON path
+(json + pydantic) against orjson, raw float32 buffers and msgpack at
+10, 100 and 1000 features.
+
+Usage (from services/inference):
+    python benchmarks/bench_codec.py
+"""
+import json
+import sys
+import timeit
+from pathlib import Path
+from typing import List
+
+import msgpack
+import numpy as np
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import codec  # noqa: E402
+
+FEATURE_COUNTS = [10, 100, 1000]
+
+
+class PredictionRequest(BaseModel):
+    features: List[float]
+
+
+class PredictionResponse(BaseModel):
+    predicted_class: int
+    probability: float
+    model_version: str
+
+
+RESPONSE = {"predicted_class": 1, "probability": 0.87, "model_version": "1.0.0"}
+
+
+def per_call_us(fn) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e6
+
+
+def bench(n_features: int) -> dict:
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=n_features).astype(np.float32)
+    as_list = values.astype(np.float64).tolist()
+
+    json_body = json.dumps({"features": as_list}).encode()
+    binary_body = values.tobytes()
+    msgpack_list_body = msgpack.packb({"features": as_list})
+    msgpack_bytes_body = msgpack.packb({"features": binary_body})
+    parsed = codec.decode_features(binary_body, codec.OCTET_STREAM)
+
+    return {
+        "parse": {
+            "json+pydantic": per_call_us(
+                lambda: PredictionRequest(**json.loads(json_body))
+            ),
+            "orjson": per_call_us(lambda: codec.decode_features(json_body, codec.JSON)),
+            "msgpack(list)": per_call_us(
+                lambda: codec.decode_features(msgpack_list_body, codec.MSGPACK)
+            ),
+            "msgpack(f32)": per_call_us(
+                lambda: codec.decode_features(msgpack_bytes_body, codec.MSGPACK)
+            ),
+            "octet-stream": per_call_us(
+                lambda: codec.decode_features(binary_body, codec.OCTET_STREAM)
+            ),
+        },
+        "serialize": {
+            "json+pydantic": per_call_us(
+                lambda: (
+                    json.dumps({"features": as_list}),
+                    PredictionResponse(**RESPONSE).model_dump_json(),
+                )
+            ),
+            "orjson": per_call_us(
+                lambda: (
+                    codec.dump_log_features(parsed),
+                    codec.encode_response(RESPONSE, codec.JSON),
+                )
+            ),
+            "msgpack": per_call_us(
+                lambda: (
+                    codec.dump_log_features(parsed),
+                    codec.encode_response(RESPONSE, codec.MSGPACK),
+                )
+            ),
+        },
+        "body_bytes": {
+            "json": len(json_body),
+            "msgpack(list)": len(msgpack_list_body),
+            "msgpack(f32)": len(msgpack_bytes_body),
+            "octet-stream": len(binary_body),
+        },
+    }
+
+
+def main():
+    for n in FEATURE_COUNTS:
+        result = bench(n)
+        print(f"\n=== {n} features ===")
+        for stage in ("parse", "serialize"):
+            baseline = result[stage]["json+pydantic"]
+            print(f"{stage} (us/request):")
+            for name, us in result[stage].items():
+                print(f"  {name:<15} {us:9.2f}   x{baseline / us:5.1f}")
+        print("body size (bytes):")
+        for name, size in result["body_bytes"].items():
+            print(f"  {name:<15} {size:9d}")
+
+
+if __name__ == "__main__":
+    main()
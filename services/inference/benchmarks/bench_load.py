@@ -0,0 +1,492 @@
+"""
+Offline load and latency harness for /predict and /predict/batch.
+
+Runs the app in-process (direct ASGI calls, no sockets or HTTP client) with
+prediction_log writes going to FakePool, an asyncpg pool stand-in whose
+connections take --db-latency-ms per statement plus --db-row-latency-ms per
+executemany row, or to a throwaway local Postgres with --database-url (the
+prediction_log table must exist). Workloads are open-loop at a fixed rate:
+requests are started on schedule whether or not earlier ones have finished,
+and latency is measured from the scheduled start, so a slow sink shows up as
+queueing and tail latency rather than as a lower send rate.
+
+Workloads:
+    single      /predict at --rps
+    batch       /predict/batch with --batch-size rows at --batch-rps
+    concurrent  both at once, competing for the same connection pool
+
+The JSON report has, per workload, achieved throughput, p50/p90/p99/max
+latency, errors, and the DB sink's behaviour: statements and rows written,
+connections in use, how many requests were queued waiting for a connection
+(mean and peak) and how long they waited. --save stores the report as a
+baseline; --baseline compares throughput and p50/p99 against one and exits
+with status 1 if any is worse by more than --tolerance.
+
+Usage (from services/inference):
+    python benchmarks/bench_load.py --save benchmarks/baseline.json
+    python benchmarks/bench_load.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_load.py --db-latency-ms 20 --pool-size 2 --workloads single
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKLOADS = ["single", "batch", "concurrent"]
+
+# (metric path, True if higher is better) compared against the baseline
+COMPARED = [
+    ("throughput_rps", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p99", False),
+]
+
+SAMPLE_INTERVAL = 0.005
+
+
+class SinkStats:
+    """Connection pool and write counters for one workload"""
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self.waiting = 0
+        self.in_use = 0
+        self.statements = 0
+        self.rows = 0
+        self.errors = 0
+        self.acquire_wait_ms: List[float] = []
+        self.samples: List[tuple] = []
+
+    def sample(self):
+        self.samples.append((self.waiting, self.in_use))
+
+    def report(self) -> dict:
+        waits = np.asarray(self.acquire_wait_ms or [0.0])
+        samples = np.asarray(self.samples or [(0, 0)], dtype=np.float64)
+        return {
+            "pool_size": self.pool_size,
+            "statements": self.statements,
+            "rows": self.rows,
+            "errors": self.errors,
+            "in_use_mean": round(float(samples[:, 1].mean()), 2),
+            "in_use_max": int(samples[:, 1].max()),
+            "queued_mean": round(float(samples[:, 0].mean()), 2),
+            "queued_max": int(samples[:, 0].max()),
+            "acquire_wait_ms": percentiles(waits),
+        }
+
+
+class FakeConnection:
+    """Accepts prediction_log writes and sleeps instead of running them"""
+
+    def __init__(self, latency: float, row_latency: float):
+        self.latency = latency
+        self.row_latency = row_latency
+
+    async def execute(self, query: str, *args) -> str:
+        await asyncio.sleep(self.latency)
+        return "INSERT 0 1"
+
+    async def executemany(self, query: str, args) -> None:
+        await asyncio.sleep(self.latency + self.row_latency * len(args))
+
+
+class FakePool:
+    """asyncpg.Pool stand-in: at most `size` connections, each with fixed latency"""
+
+    def __init__(self, size: int, latency: float, row_latency: float):
+        self._slots = asyncio.Semaphore(size)
+        self._connection = FakeConnection(latency, row_latency)
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._slots:
+            yield self._connection
+
+    async def close(self):
+        pass
+
+
+class _MeteredConnection:
+    def __init__(self, conn, stats: SinkStats):
+        self._conn = conn
+        self._stats = stats
+
+    async def execute(self, query: str, *args):
+        try:
+            result = await self._conn.execute(query, *args)
+        except Exception:
+            self._stats.errors += 1
+            raise
+        self._stats.statements += 1
+        self._stats.rows += 1
+        return result
+
+    async def executemany(self, query: str, args):
+        args = list(args)
+        try:
+            result = await self._conn.executemany(query, args)
+        except Exception:
+            self._stats.errors += 1
+            raise
+        self._stats.statements += 1
+        self._stats.rows += len(args)
+        return result
+
+
+class MeteredPool:
+    """Wraps a real or fake pool, counting queued acquires, waits and writes"""
+
+    def __init__(self, pool, size: int):
+        self._pool = pool
+        self.size = size
+        self.stats = SinkStats(size)
+
+    def reset(self) -> SinkStats:
+        self.stats = SinkStats(self.size)
+        return self.stats
+
+    @asynccontextmanager
+    async def acquire(self):
+        stats = self.stats
+        stats.waiting += 1
+        acquired = False
+        t0 = time.perf_counter()
+        try:
+            async with self._pool.acquire() as conn:
+                stats.waiting -= 1
+                acquired = True
+                stats.acquire_wait_ms.append((time.perf_counter() - t0) * 1000)
+                stats.in_use += 1
+                try:
+                    yield _MeteredConnection(conn, stats)
+                finally:
+                    stats.in_use -= 1
+        finally:
+            if not acquired:
+                stats.waiting -= 1
+
+    async def close(self):
+        await self._pool.close()
+
+
+def percentiles(values: np.ndarray) -> dict:
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+async def asgi_post(app, path: str, body: bytes, headers: Dict[str, str]) -> int:
+    """POST one request straight into the ASGI app and return the status code"""
+    raw_headers = [(b"host", b"bench"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    body_sent = False
+    done = asyncio.Event()
+    status = 500
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status
+
+
+class Payloads:
+    """Pre-encoded request bodies, cycled so no single vector dominates"""
+
+    def __init__(self, n_features: int, batch_size: int, encoding: str, count: int = 256):
+        rng = np.random.default_rng(0)
+        single = rng.normal(size=(count, n_features)).astype(np.float32)
+        batches = rng.normal(size=(count, batch_size, n_features)).astype(np.float32)
+        if encoding == "octet":
+            self.single_headers = {"content-type": "application/octet-stream"}
+            self.batch_headers = {"content-type": "application/octet-stream",
+                                  "x-feature-dim": str(n_features)}
+            self.single = [row.tobytes() for row in single]
+            self.batch = [b.tobytes() for b in batches]
+        else:
+            self.single_headers = self.batch_headers = {"content-type": "application/json"}
+            self.single = [json.dumps({"features": row.tolist()}).encode() for row in single]
+            self.batch = [json.dumps({"instances": b.tolist()}).encode() for b in batches]
+
+
+async def open_loop(app, path: str, bodies: List[bytes], headers: Dict[str, str],
+                    rate: float, seconds: float) -> dict:
+    """Start requests at a fixed rate for `seconds` and time each from its scheduled start"""
+    loop = asyncio.get_running_loop()
+    latencies: List[float] = []
+    errors = 0
+    finished = 0.0
+
+    async def one(body: bytes, scheduled: float):
+        nonlocal errors, finished
+        code = await asgi_post(app, path, body, headers)
+        now = loop.time()
+        finished = max(finished, now)
+        if code == 200:
+            latencies.append((now - scheduled) * 1000)
+        else:
+            errors += 1
+
+    n = max(1, int(rate * seconds))
+    start = loop.time()
+    tasks = []
+    for i in range(n):
+        scheduled = start + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(bodies[i % len(bodies)], scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = max(finished - start, 1e-9)
+    return {
+        "path": path,
+        "offered_rps": rate,
+        "requests": n,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": percentiles(np.asarray(latencies or [0.0])),
+    }
+
+
+async def sampler(pool: MeteredPool, stop: asyncio.Event):
+    while not stop.is_set():
+        pool.stats.sample()
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def run_workload(name: str, app, pool: Optional[MeteredPool], payloads: Payloads,
+                       args) -> dict:
+    streams = []
+    if name in ("single", "concurrent"):
+        streams.append(open_loop(app, "/predict", payloads.single, payloads.single_headers,
+                                 args.rps, args.seconds))
+    if name in ("batch", "concurrent"):
+        streams.append(open_loop(app, "/predict/batch", payloads.batch, payloads.batch_headers,
+                                 args.batch_rps, args.seconds))
+
+    stats = pool.reset() if pool else None
+    stop = asyncio.Event()
+    sampling = asyncio.create_task(sampler(pool, stop)) if pool else None
+    results = await asyncio.gather(*streams)
+    stop.set()
+    if sampling:
+        await sampling
+
+    if len(results) == 1:
+        report = dict(results[0])
+    else:
+        # Headline numbers cover both streams; per-endpoint detail is kept below
+        total = sum(r["throughput_rps"] for r in results)
+        report = {
+            "requests": sum(r["requests"] for r in results),
+            "errors": sum(r["errors"] for r in results),
+            "throughput_rps": round(total, 1),
+            "latency_ms": {
+                key: max(r["latency_ms"][key] for r in results)
+                for key in ("p50", "p90", "p99", "max")
+            },
+            "streams": results,
+        }
+    report["db_sink"] = stats.report() if stats else None
+    return report
+
+
+async def warm_up(app, payloads: Payloads, requests: int):
+    for i in range(requests):
+        await asgi_post(app, "/predict", payloads.single[i % len(payloads.single)],
+                        payloads.single_headers)
+        await asgi_post(app, "/predict/batch", payloads.batch[i % len(payloads.batch)],
+                        payloads.batch_headers)
+
+
+async def start_service(service, args) -> Optional[MeteredPool]:
+    """Run the app's startup with the fake (or a local) pool wrapped in MeteredPool"""
+    if args.database_url:
+        await service.startup_event()
+        if service.db_pool is None:
+            raise SystemExit(f"could not connect to {args.database_url}")
+        pool = service.db_pool
+    else:
+        async def create_pool(*_, max_size: int, **__):
+            return FakePool(max_size, args.db_latency_ms / 1000, args.db_row_latency_ms / 1000)
+
+        with mock.patch.object(service.asyncpg, "create_pool", create_pool):
+            await service.startup_event()
+        pool = service.db_pool
+    if args.no_db:
+        await pool.close()
+        service.db_pool = None
+        return None
+    service.db_pool = MeteredPool(pool, service.db_pool_max_size())
+    return service.db_pool
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[dict]:
+    """Relative change of each compared metric; `regressed` if worse than tolerance"""
+    rows = []
+    for name, current in report["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if previous is None:
+            continue
+        for path, higher_is_better in COMPARED:
+            now, before = current, previous
+            for key in path.split("."):
+                now, before = now[key], before[key]
+            if not before:
+                continue
+            change = (now - before) / before
+            worse = -change if higher_is_better else change
+            rows.append({
+                "workload": name,
+                "metric": path,
+                "baseline": before,
+                "current": now,
+                "change": round(change, 3),
+                "regressed": worse > tolerance,
+            })
+    return rows
+
+
+async def bench(args) -> dict:
+    os.chdir(ROOT)
+    os.environ["PREDICTION_LOG_MAINTENANCE"] = "false"
+    os.environ["DB_POOL_MAX_CONNECTIONS"] = str(args.pool_size)
+    os.environ.pop("INFERENCE_WORKERS", None)
+    os.environ.pop("WEB_CONCURRENCY", None)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    import main as service
+
+    pool = await start_service(service, args)
+    payloads = Payloads(args.features, args.batch_size, args.encoding)
+    try:
+        await warm_up(service.app, payloads, args.warmup)
+        workloads = {}
+        for name in args.workloads:
+            workloads[name] = await run_workload(name, service.app, pool, payloads, args)
+    finally:
+        await service.shutdown_event()
+
+    return {
+        "config": {
+            "seconds": args.seconds,
+            "rps": args.rps,
+            "batch_rps": args.batch_rps,
+            "batch_size": args.batch_size,
+            "features": args.features,
+            "encoding": args.encoding,
+            "db_sink": "none" if args.no_db else ("postgres" if args.database_url else "fake"),
+            "db_latency_ms": None if args.database_url else args.db_latency_ms,
+            "db_row_latency_ms": None if args.database_url else args.db_row_latency_ms,
+            "pool_size": args.pool_size,
+        },
+        "host": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "workloads": workloads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workloads", nargs="+", default=WORKLOADS, choices=WORKLOADS)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each workload")
+    parser.add_argument("--rps", type=float, default=500.0, help="/predict requests per second")
+    parser.add_argument("--batch-rps", type=float, default=50.0,
+                        help="/predict/batch requests per second")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--features", type=int, default=3)
+    parser.add_argument("--encoding", choices=["json", "octet"], default="json")
+    parser.add_argument("--warmup", type=int, default=200, help="requests per endpoint before timing")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0,
+                        help="fake pool: time per execute/executemany")
+    parser.add_argument("--db-row-latency-ms", type=float, default=0.02,
+                        help="fake pool: extra time per executemany row")
+    parser.add_argument("--database-url", help="log to this Postgres instead of the fake pool")
+    parser.add_argument("--no-db", action="store_true", help="run without a prediction_log sink")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--save", help="also store the report as a baseline at this path")
+    parser.add_argument("--baseline", help="compare against a stored baseline report")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative regression before failing (default 0.10)")
+    args = parser.parse_args()
+    # bench() changes into services/inference, so pin paths to where they were given
+    for name in ("output", "save", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    report = asyncio.run(bench(args))
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(report, baseline, args.tolerance)
+        if baseline.get("config") != report["config"]:
+            report["comparison_warning"] = "baseline was recorded with a different config"
+        regressed = any(row["regressed"] for row in report["comparison"])
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    for row in report.get("comparison", []):
+        if row["regressed"]:
+            print(f"REGRESSION {row['workload']} {row['metric']}: "
+                  f"{row['baseline']} -> {row['current']} ({row['change']:+.1%})", file=sys.stderr)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Microbenchmarks for per-request metrics recording.
+
+Compares the original pattern (a .labels() lookup for predictions_total and
+http_requests_total on every request, one observe per batch row) against
+the pre-bound children and batch aggregation in metrics.py.
+
+Usage (from services/inference):
+    python benchmarks/bench_metrics.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import (  # noqa: E402
+    HTTPMetricsMiddleware,
+    http_requests_total,
+    prediction_latency,
+    prediction_metrics,
+    prediction_score,
+    predictions_total,
+)
+
+MODEL_VERSION = "1.0.0"
+BATCH_SIZES = [10, 100, 1000]
+
+
+def per_call_us(fn) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e6
+
+
+def legacy_request():
+    prediction_score.observe(0.87)
+    predictions_total.labels(predicted_class="1", model_version=MODEL_VERSION).inc()
+    prediction_latency.observe(0.002)
+    http_requests_total.labels(handler="/predict", method="POST", status="200").inc()
+
+
+middleware = HTTPMetricsMiddleware(app=None, handlers=["/predict"])
+
+
+def bound_request():
+    prediction_metrics.record(1, 0.87, 0.002)
+    middleware._counter("/predict", "POST", 200).inc()
+
+
+def legacy_batch(classes, probs):
+    for cls, prob in zip(classes.tolist(), probs.tolist()):
+        prediction_score.observe(prob)
+        predictions_total.labels(predicted_class=str(cls), model_version=MODEL_VERSION).inc()
+    prediction_latency.observe(0.002)
+
+
+def main():
+    prediction_metrics.set_model_version(MODEL_VERSION)
+
+    legacy = per_call_us(legacy_request)
+    bound = per_call_us(bound_request)
+    print("single request (us):")
+    print(f"  labels() per request   {legacy:8.2f}")
+    print(f"  pre-bound children     {bound:8.2f}   x{legacy / bound:4.1f}")
+
+    rng = np.random.default_rng(0)
+    print("batch request (us):")
+    for n in BATCH_SIZES:
+        classes = rng.integers(0, 3, size=n)
+        probs = rng.random(n)
+        legacy = per_call_us(lambda: legacy_batch(classes, probs))
+        aggregated = per_call_us(lambda: prediction_metrics.record_batch(classes, probs, 0.002))
+        print(f"  {n:5d} rows  per-row {legacy:9.2f}   aggregated {aggregated:8.2f}"
+              f"   x{legacy / aggregated:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
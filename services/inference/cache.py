@@ -0,0 +1,115 @@
+"""
+In-process LRU/TTL cache for repeated prediction requests
+"""
+import hashlib
+import random
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Logging policies for cache hits
+LOG_ALL = "all"
+LOG_SAMPLE = "sample"
+LOG_SKIP = "skip"
+LOG_MODES = (LOG_ALL, LOG_SAMPLE, LOG_SKIP)
+
+# Rough per-entry overhead of the OrderedDict slot and the cached tuple
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def feature_key(features: np.ndarray, model_version: str) -> bytes:
+    """Hash the float32 feature bytes together with the model version"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_version.encode())
+    digest.update(b"\x00")
+    digest.update(np.asarray(features, dtype=np.float32).tobytes())
+    return digest.digest()
+
+
+class PredictionCache:
+    """
+    LRU cache of (predicted_class, probability) results with an optional TTL.
+
+    Entries are keyed by a hash of the float32 feature bytes plus the model
+    version, and the whole cache is dropped when the model version changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float = 0.0,
+        log_mode: str = LOG_ALL,
+        log_sample_rate: float = 0.1,
+    ):
+        if log_mode not in LOG_MODES:
+            raise ValueError(f"log_mode must be one of {LOG_MODES}, got '{log_mode}'")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.log_mode = log_mode
+        self.log_sample_rate = log_sample_rate
+        self.model_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, int, float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_model_version(self, model_version: str) -> None:
+        """Invalidate every entry when the serving model version changes"""
+        if model_version != self.model_version:
+            self.clear()
+            self.model_version = model_version
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, key: bytes) -> Optional[Tuple[int, float]]:
+        """Return the cached (predicted_class, probability) or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, predicted_class, probability = entry
+        if expires_at and expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return predicted_class, probability
+
+    def put(self, key: bytes, predicted_class: int, probability: float) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        self._entries[key] = (expires_at, predicted_class, probability)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def should_log_hit(self) -> bool:
+        """Apply the configured logging policy to a cache hit"""
+        if self.log_mode == LOG_ALL:
+            return True
+        if self.log_mode == LOG_SKIP:
+            return False
+        return random.random() < self.log_sample_rate
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by cached entries"""
+        if not self._entries:
+            return sys.getsizeof(self._entries)
+        key_size = sys.getsizeof(next(iter(self._entries)))
+        return sys.getsizeof(self._entries) + len(self._entries) * (
+            key_size + _ENTRY_OVERHEAD_BYTES
+        )
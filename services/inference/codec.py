@@ -0,0 +1,139 @@
+"""
+Content negotiation for the prediction endpoints.
+
+Requests may be sent as JSON, as a raw little-endian float32 buffer
+(application/octet-stream) or as msgpack. Binary feature buffers are decoded
+zero-copy with np.frombuffer; responses are rendered with orjson or msgpack.
+"""
+from typing import Any, Optional
+
+import msgpack
+import numpy as np
+import orjson
+from fastapi.responses import Response
+
+JSON = "application/json"
+OCTET_STREAM = "application/octet-stream"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+# Header carrying the row width of a binary batch buffer
+FEATURE_DIM_HEADER = "x-feature-dim"
+
+FLOAT32_LE = np.dtype("<f4")
+
+
+class DecodeError(ValueError):
+    """Raised when a request body cannot be decoded into features"""
+
+
+def media_type(header: Optional[str]) -> str:
+    """Strip parameters (charset etc.) from a Content-Type header"""
+    if not header:
+        return JSON
+    return header.split(";", 1)[0].strip().lower()
+
+
+def _from_float32_bytes(buf: bytes) -> np.ndarray:
+    if len(buf) % FLOAT32_LE.itemsize:
+        raise DecodeError(
+            f"Binary feature buffer length {len(buf)} is not a multiple of 4 bytes"
+        )
+    return np.frombuffer(buf, dtype=FLOAT32_LE)
+
+
+def _from_list(values: Any, ndim: int) -> np.ndarray:
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise DecodeError(f"Features must be numeric: {e}")
+    if not arr.size:
+        # [] has no row shape; report it as empty like an empty binary buffer
+        return arr.reshape((0,) * ndim)
+    if arr.ndim != ndim:
+        raise DecodeError(f"Expected a {ndim}-dimensional feature array, got {arr.ndim}")
+    return arr
+
+
+def _load_document(body: bytes, content_type: str) -> Any:
+    try:
+        if content_type in MSGPACK_TYPES:
+            return msgpack.unpackb(body, raw=False)
+        return orjson.loads(body)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise DecodeError(f"Malformed request body: {e}")
+
+
+def decode_features(body: bytes, content_type: str) -> np.ndarray:
+    """
+    Decode a single /predict request into a 1-D feature array.
+
+    JSON and msgpack bodies are {"features": [...]}; msgpack may also carry
+    the features as float32 bytes. octet-stream bodies are the raw buffer.
+    """
+    if content_type == OCTET_STREAM:
+        return _from_float32_bytes(body)
+
+    doc = _load_document(body, content_type)
+    if not isinstance(doc, dict) or "features" not in doc:
+        raise DecodeError("Request body must be an object with a 'features' field")
+    features = doc["features"]
+    if isinstance(features, (bytes, bytearray)):
+        return _from_float32_bytes(features)
+    return _from_list(features, ndim=1)
+
+
+def decode_batch(body: bytes, content_type: str, feature_dim: Optional[str]) -> np.ndarray:
+    """
+    Decode a /predict/batch request into a 2-D (rows, features) array.
+
+    JSON and msgpack bodies are {"instances": [[...], ...]}; msgpack may
+    instead send {"features": <float32 bytes>, "dim": n}. octet-stream
+    bodies are a row-major float32 buffer with the row width given in the
+    X-Feature-Dim header.
+    """
+    if content_type == OCTET_STREAM:
+        return _reshape(_from_float32_bytes(body), feature_dim)
+
+    doc = _load_document(body, content_type)
+    if not isinstance(doc, dict):
+        raise DecodeError("Request body must be an object")
+    if isinstance(doc.get("features"), (bytes, bytearray)):
+        return _reshape(_from_float32_bytes(doc["features"]), doc.get("dim"))
+    if "instances" not in doc:
+        raise DecodeError("Request body must have an 'instances' field")
+    return _from_list(doc["instances"], ndim=2)
+
+
+def _reshape(flat: np.ndarray, feature_dim: Any) -> np.ndarray:
+    try:
+        dim = int(feature_dim)
+    except (TypeError, ValueError):
+        raise DecodeError("Binary batch requests must specify the feature dimension")
+    if dim <= 0 or flat.size % dim:
+        raise DecodeError(f"Buffer of {flat.size} floats does not split into rows of {dim}")
+    return flat.reshape(-1, dim)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Cannot serialize {type(obj).__name__} to msgpack")
+
+
+def encode_response(payload: Any, accept: Optional[str]) -> Response:
+    """Render a response as msgpack when the client asks for it, else orjson"""
+    if accept and any(t in accept for t in MSGPACK_TYPES):
+        return Response(
+            content=msgpack.packb(payload, default=_msgpack_default),
+            media_type=MSGPACK,
+        )
+    return Response(
+        content=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type=JSON,
+    )
+
+
+def dump_log_features(features: np.ndarray) -> str:
+    """Serialize features for the prediction_log JSONB column"""
+    return orjson.dumps({"features": features}, option=orjson.OPT_SERIALIZE_NUMPY).decode()
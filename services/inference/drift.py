@@ -0,0 +1,291 @@
+"""
+Streaming drift monitoring against the training reference in metadata.json.
+
+Each monitored feature keeps Welford running moments, min/max and counts over
+the reference bin edges, so memory is O(1) per feature and batch updates are
+vectorized. NaN and infinite values (which binary and msgpack requests can
+carry) are left out of every statistic and counted per feature as
+non_finite. The bin counts double as a fixed-bin quantile sketch: PSI and a
+binned KS statistic are computed against the reference bin fractions, and live
+quantiles are interpolated from the same counts. Predicted classes are
+compared against the reference class frequencies.
+"""
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from prometheus_client import Gauge
+
+# Floor applied to bin fractions so empty bins do not make PSI infinite
+_PSI_EPSILON = 1e-4
+
+# Conventional PSI reading: < 0.1 stable, 0.1-0.2 moderate, > 0.2 drifted
+PSI_ALERT_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))
+
+REPORTED_QUANTILES = (0.1, 0.5, 0.9)
+
+feature_drift_psi = Gauge(
+    "feature_drift_psi",
+    "Population stability index of live feature values against the training reference",
+    ["feature"],
+    multiprocess_mode="liveall"
+)
+
+feature_drift_ks = Gauge(
+    "feature_drift_ks",
+    "Binned Kolmogorov-Smirnov distance of live feature values against the training reference",
+    ["feature"],
+    multiprocess_mode="liveall"
+)
+
+feature_mean_shift = Gauge(
+    "feature_mean_shift",
+    "Live feature mean minus reference mean, in reference standard deviations",
+    ["feature"],
+    multiprocess_mode="liveall"
+)
+
+class_distribution_psi = Gauge(
+    "class_distribution_psi",
+    "Population stability index of predicted classes against reference class frequencies",
+    multiprocess_mode="liveall"
+)
+
+drift_window_observations = Gauge(
+    "drift_window_observations",
+    "Observations in the current drift monitoring window",
+    multiprocess_mode="liveall"
+)
+
+
+def psi(live: np.ndarray, reference: np.ndarray) -> float:
+    """Population stability index between two fraction vectors"""
+    live = np.maximum(live, _PSI_EPSILON)
+    reference = np.maximum(reference, _PSI_EPSILON)
+    return float(np.sum((live - reference) * np.log(live / reference)))
+
+
+class FeatureStats:
+    """Running moments and reference-bin counts for one feature"""
+
+    def __init__(self, name: str, reference: Dict[str, Any]):
+        self.name = name
+        self.ref_mean = float(reference["mean"])
+        self.ref_std = float(reference["std"])
+        self.edges = np.asarray(reference["bin_edges"], dtype=np.float64)
+        self.ref_fractions = np.asarray(reference["bin_fractions"], dtype=np.float64)
+        if len(self.ref_fractions) != len(self.edges) + 1:
+            raise ValueError(
+                f"Feature '{name}': bin_fractions needs one more entry than bin_edges"
+            )
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.non_finite = 0
+        self.bin_counts = np.zeros(len(self.ref_fractions), dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """Merge a block of observations (Chan et al. parallel Welford update)"""
+        finite = np.isfinite(values)
+        if not finite.all():
+            # One NaN would make the moments NaN for the rest of the window
+            self.non_finite += int(values.size - np.count_nonzero(finite))
+            values = values[finite]
+        n = values.size
+        if not n:
+            return
+        block_mean = float(values.mean())
+        block_m2 = float(((values - block_mean) ** 2).sum())
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += block_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.bin_counts += np.bincount(
+            np.searchsorted(self.edges, values, side="right"),
+            minlength=len(self.bin_counts)
+        )
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def fractions(self) -> np.ndarray:
+        return self.bin_counts / self.count if self.count else np.zeros_like(self.ref_fractions)
+
+    def psi(self) -> float:
+        return psi(self.fractions(), self.ref_fractions) if self.count else 0.0
+
+    def ks(self) -> float:
+        """Largest CDF gap at the reference bin edges"""
+        if not self.count:
+            return 0.0
+        live_cdf = np.cumsum(self.fractions())[:-1]
+        ref_cdf = np.cumsum(self.ref_fractions)[:-1]
+        return float(np.max(np.abs(live_cdf - ref_cdf))) if live_cdf.size else 0.0
+
+    def mean_shift(self) -> float:
+        if not self.count or not self.ref_std:
+            return 0.0
+        return (self.mean - self.ref_mean) / self.ref_std
+
+    def quantiles(self, qs=REPORTED_QUANTILES) -> List[Optional[float]]:
+        """Quantiles interpolated linearly within the reference bins"""
+        if not self.count:
+            return [None for _ in qs]
+        # Outer bins are bounded by the observed min and max
+        lo = min(self.min, self.edges[0]) if self.edges.size else self.min
+        hi = max(self.max, self.edges[-1]) if self.edges.size else self.max
+        knots = np.concatenate(([lo], self.edges, [hi]))
+        cdf = np.concatenate(([0.0], np.cumsum(self.fractions())))
+        return [float(np.interp(q, cdf, knots)) for q in qs]
+
+    def summary(self) -> Dict[str, Any]:
+        score = self.psi()
+        return {
+            "count": self.count,
+            "non_finite": self.non_finite,
+            "mean": self.mean,
+            "std": self.std,
+            "reference_mean": self.ref_mean,
+            "reference_std": self.ref_std,
+            "quantiles": dict(zip([str(q) for q in REPORTED_QUANTILES], self.quantiles())),
+            "psi": score,
+            "ks": self.ks(),
+            "mean_shift": self.mean_shift(),
+            "drifted": score > PSI_ALERT_THRESHOLD,
+        }
+
+
+class DriftMonitor:
+    """
+    Per-feature and class-frequency drift over a tumbling window.
+
+    Scores are published to Prometheus every `publish_every` observations and
+    when a window closes; `window_size` of 0 keeps accumulating forever.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 10000,
+        publish_every: int = 100,
+    ):
+        self.window_size = window_size
+        self.publish_every = publish_every
+        self.features: List[FeatureStats] = []
+        self.ref_class_fractions: Dict[int, float] = {}
+        self.class_counts: Dict[int, int] = {}
+        self.observations = 0
+        self.skipped = 0
+        self.last_window: Optional[Dict[str, Any]] = None
+        self._since_publish = 0
+        self._psi_gauges = {}
+        self._ks_gauges = {}
+        self._shift_gauges = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.features)
+
+    def load_reference(self, metadata: Dict[str, Any]) -> None:
+        """Configure monitored features from metadata.json's "reference" block"""
+        reference = metadata.get("reference", {})
+        names = metadata.get("features", list(reference.get("features", {})))
+        self.features = [
+            FeatureStats(name, reference["features"][name])
+            for name in names
+            if name in reference.get("features", {})
+        ]
+        self.ref_class_fractions = {
+            int(cls): float(freq)
+            for cls, freq in reference.get("class_frequencies", {}).items()
+        }
+        self._psi_gauges = {f.name: feature_drift_psi.labels(feature=f.name) for f in self.features}
+        self._ks_gauges = {f.name: feature_drift_ks.labels(feature=f.name) for f in self.features}
+        self._shift_gauges = {f.name: feature_mean_shift.labels(feature=f.name) for f in self.features}
+        self.reset()
+
+    def reset(self) -> None:
+        for feature in self.features:
+            feature.reset()
+        self.class_counts = {}
+        self.observations = 0
+        self.skipped = 0
+        self._since_publish = 0
+
+    def update(self, features: np.ndarray, predicted_class: int) -> None:
+        """Record one feature vector and its predicted class"""
+        self.update_batch(features.reshape(1, -1), np.asarray([predicted_class]))
+
+    def update_batch(self, features: np.ndarray, predicted_class: np.ndarray) -> None:
+        """Record a (rows, features) batch and its predicted classes"""
+        if not self.enabled:
+            return
+        rows = len(features)
+        # Vectors narrower than the reference cannot be attributed to features
+        if features.shape[1] < len(self.features):
+            self.skipped += rows
+            return
+        for column, stats in enumerate(self.features):
+            stats.update(np.asarray(features[:, column], dtype=np.float64))
+        for cls, count in enumerate(np.bincount(predicted_class).tolist()):
+            if count:
+                self.class_counts[cls] = self.class_counts.get(cls, 0) + count
+
+        self.observations += rows
+        self._since_publish += rows
+        if self.window_size and self.observations >= self.window_size:
+            self.publish()
+            self.last_window = self.report()
+            self.reset()
+        elif self._since_publish >= self.publish_every:
+            self.publish()
+
+    def class_psi(self) -> float:
+        if not self.observations or not self.ref_class_fractions:
+            return 0.0
+        classes = sorted(set(self.ref_class_fractions) | set(self.class_counts))
+        live = np.array([self.class_counts.get(c, 0) for c in classes]) / self.observations
+        reference = np.array([self.ref_class_fractions.get(c, 0.0) for c in classes])
+        return psi(live, reference)
+
+    def publish(self) -> None:
+        """Push current scores to the Prometheus gauges"""
+        for stats in self.features:
+            self._psi_gauges[stats.name].set(stats.psi())
+            self._ks_gauges[stats.name].set(stats.ks())
+            self._shift_gauges[stats.name].set(stats.mean_shift())
+        class_distribution_psi.set(self.class_psi())
+        drift_window_observations.set(self.observations)
+        self._since_publish = 0
+
+    def report(self) -> Dict[str, Any]:
+        """Current window summary for the /drift endpoint"""
+        total = self.observations
+        class_score = self.class_psi()
+        return {
+            "window_size": self.window_size,
+            "observations": total,
+            "skipped": self.skipped,
+            "psi_threshold": PSI_ALERT_THRESHOLD,
+            "features": {stats.name: stats.summary() for stats in self.features},
+            "classes": {
+                "counts": {str(c): n for c, n in sorted(self.class_counts.items())},
+                "frequencies": {
+                    str(c): n / total for c, n in sorted(self.class_counts.items())
+                } if total else {},
+                "reference_frequencies": {
+                    str(c): f for c, f in sorted(self.ref_class_fractions.items())
+                },
+                "psi": class_score,
+                "drifted": class_score > PSI_ALERT_THRESHOLD,
+            },
+        }
@@ -1,55 +1,65 @@
 """
 FastAPI Inference Service with Prometheus Metrics
 """
+import asyncio
 import json
 import os
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import Response
 from pydantic import BaseModel
-from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 import asyncpg
 
-
-# Initialize FastAPI app
-app = FastAPI(title="ML Inference Service", version="1.0.0")
-
-# Prometheus metrics
-prediction_score = Histogram(
-    "prediction_score_distribution",
-    "Distribution of prediction probabilities",
-    buckets=[0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0]
-)
-
-predictions_total = Counter(
-    "predictions_total",
-    "Total predictions by class and model version",
-    ["predicted_class", "model_version"]
+import codec
+from cache import PredictionCache, feature_key
+from drift import DriftMonitor
+from maintenance import maintenance_loop
+from metrics import (
+    HTTPMetricsMiddleware,
+    mark_process_dead,
+    model_f1,
+    prediction_cache_hit_ratio,
+    prediction_cache_memory,
+    prediction_metrics,
+    render_latest,
 )
 
-model_f1 = Gauge("model_f1_score", "Current model F1 score")
 
-prediction_latency = Histogram(
-    "prediction_latency_seconds",
-    "Inference latency in seconds",
-    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
-)
-
-http_requests_total = Counter(
-    "http_requests_total",
-    "Total HTTP requests",
-    ["handler", "method", "status"]
-)
+# Initialize FastAPI app
+app = FastAPI(title="ML Inference Service", version="1.0.0")
 
 # Database connection pool
 db_pool: Optional[asyncpg.Pool] = None
 
+# Connections allowed across all workers; each worker's pool gets an equal share
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "10"))
+
+# Background partition/retention/rollup maintenance for prediction_log
+MAINTENANCE_ENABLED = os.getenv("PREDICTION_LOG_MAINTENANCE", "true").lower() == "true"
+maintenance_task: Optional[asyncio.Task] = None
+
 # Model metadata
 MODEL_VERSION = "1.0.0"
 MODEL_METADATA = {}
+MODEL_LOADED = False
+
+# Optional cache of repeated feature vectors (disabled when size is 0)
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "0")),
+    ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "0")),
+    log_mode=os.getenv("PREDICTION_CACHE_LOG_MODE", "all"),
+    log_sample_rate=float(os.getenv("PREDICTION_CACHE_LOG_SAMPLE_RATE", "0.1")),
+)
+
+# Streaming drift against the training reference in metadata.json
+drift_monitor = DriftMonitor(
+    window_size=int(os.getenv("DRIFT_WINDOW_SIZE", "10000")),
+    publish_every=int(os.getenv("DRIFT_PUBLISH_EVERY", "100")),
+)
 
 
 class PredictionRequest(BaseModel):
@@ -62,44 +72,94 @@ class PredictionResponse(BaseModel):
     model_version: str
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Load model metadata and initialize database connection"""
-    global MODEL_VERSION, MODEL_METADATA, db_pool
+class PredictionBatchRequest(BaseModel):
+    instances: List[List[float]]
+
+
+class PredictionBatchResponse(BaseModel):
+    predicted_class: List[int]
+    probability: List[float]
+    model_version: str
+
+
+def load_model():
+    """
+    Load model metadata and the drift reference.
+
+    serve.py calls this once in the parent before forking workers so the
+    loaded state is shared copy-on-write; under plain uvicorn each worker
+    loads it in startup_event.
+    """
+    global MODEL_VERSION, MODEL_METADATA, MODEL_LOADED
+    if MODEL_LOADED:
+        return
     
     # Load metadata.json if it exists
     metadata_path = Path("metadata.json")
     if metadata_path.exists():
         with open(metadata_path, "r") as f:
             MODEL_METADATA = json.load(f)
-            
-        # Set F1 score metric
-        if "f1_score" in MODEL_METADATA:
-            f1_value = MODEL_METADATA["f1_score"]
-            model_f1.set(f1_value)
-            print(f"Loaded model F1 score: {f1_value}")
         
         # Update model version if available
         if "version" in MODEL_METADATA:
             MODEL_VERSION = MODEL_METADATA["version"]
             print(f"Model version: {MODEL_VERSION}")
+        
+        drift_monitor.load_reference(MODEL_METADATA)
+        if drift_monitor.enabled:
+            print(f"Drift monitoring {len(drift_monitor.features)} features")
+    MODEL_LOADED = True
+
+
+def db_pool_max_size() -> int:
+    """This worker's share of DB_POOL_MAX_CONNECTIONS"""
+    workers = int(os.getenv("INFERENCE_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1")
+    return max(1, DB_POOL_MAX_CONNECTIONS // max(1, workers))
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Load model metadata and initialize database connection"""
+    global db_pool, maintenance_task
+    
+    load_model()
+    
+    # Set F1 score metric (per worker, so multiprocess gauges see every pid)
+    if "f1_score" in MODEL_METADATA:
+        f1_value = MODEL_METADATA["f1_score"]
+        model_f1.set(f1_value)
+        print(f"Loaded model F1 score: {f1_value}")
+    
+    # Rebind labeled metrics and drop cached predictions of any other version
+    prediction_metrics.set_model_version(MODEL_VERSION)
+    prediction_cache.set_model_version(MODEL_VERSION)
+    if prediction_cache.enabled:
+        print(f"Prediction cache enabled: {prediction_cache.max_entries} entries, "
+              f"log mode '{prediction_cache.log_mode}'")
     
     # Initialize database connection pool
     database_url = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/mlops")
     try:
-        db_pool = await asyncpg.create_pool(database_url, min_size=1, max_size=10)
-        print(f"Database connection pool created")
+        max_size = db_pool_max_size()
+        db_pool = await asyncpg.create_pool(database_url, min_size=1, max_size=max_size)
+        print(f"Database connection pool created (max {max_size} connections)")
     except Exception as e:
         print(f"Warning: Failed to initialize database pool: {e}")
         db_pool = None
+    
+    if db_pool and MAINTENANCE_ENABLED:
+        maintenance_task = asyncio.create_task(maintenance_loop(db_pool))
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection pool"""
+    """Stop maintenance and close database connection pool"""
     global db_pool
+    if maintenance_task:
+        maintenance_task.cancel()
     if db_pool:
         await db_pool.close()
+    mark_process_dead()
 
 
 @app.get("/")
@@ -118,8 +178,57 @@ async def health():
     return {"status": "healthy", "model_version": MODEL_VERSION}
 
 
-@app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
+def score_features(features: np.ndarray) -> Tuple[int, float]:
+    """
+    Score a feature vector, returning (predicted_class, probability)
+    """
+    # Simple prediction logic (replace with actual model)
+    # Using sum of features to determine class and probability
+    feature_sum = float(np.sum(features, dtype=np.float64)) % 10
+    predicted_class = int(feature_sum % 3)  # 3 classes: 0, 1, 2
+    probability = (feature_sum / 10.0 + 0.5) % 1.0  # Probability between 0 and 1
+    if probability < 0.1:
+        probability += 0.5
+    return predicted_class, probability
+
+
+def score_batch(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized score_features over the rows of a (n, d) feature matrix
+    """
+    feature_sum = features.sum(axis=1, dtype=np.float64) % 10
+    predicted_class = (feature_sum % 3).astype(np.int64)
+    probability = (feature_sum / 10.0 + 0.5) % 1.0
+    probability = np.where(probability < 0.1, probability + 0.5, probability)
+    return predicted_class, probability
+
+
+# Request bodies are decoded by codec.py, so document them explicitly
+_PREDICT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            codec.JSON: {"schema": PredictionRequest.model_json_schema()},
+            codec.MSGPACK: {"schema": PredictionRequest.model_json_schema()},
+            codec.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+_PREDICT_BATCH_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            codec.JSON: {"schema": PredictionBatchRequest.model_json_schema()},
+            codec.MSGPACK: {"schema": PredictionBatchRequest.model_json_schema()},
+            codec.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+@app.post("/predict", response_model=PredictionResponse, openapi_extra=_PREDICT_BODY)
+async def predict(request: Request):
     """
     Make predictions and record metrics
     """
@@ -128,32 +237,42 @@ async def predict(request: PredictionRequest):
     try:
         # Simulate prediction (replace with actual model inference)
         # For demonstration, we'll create a simple prediction based on input features
-        features = request.features
-        if not features:
+        try:
+            features = codec.decode_features(
+                await request.body(), codec.media_type(request.headers.get("content-type"))
+            )
+        except codec.DecodeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if not features.size:
             raise HTTPException(status_code=400, detail="Features list cannot be empty")
         
-        # Simple prediction logic (replace with actual model)
-        # Using sum of features to determine class and probability
-        feature_sum = sum(features) % 10
-        predicted_class = int(feature_sum % 3)  # 3 classes: 0, 1, 2
-        probability = (feature_sum / 10.0 + 0.5) % 1.0  # Probability between 0 and 1
-        if probability < 0.1:
-            probability += 0.5
+        cache_key = None
+        cached = None
+        if prediction_cache.enabled:
+            cache_key = feature_key(features, MODEL_VERSION)
+            cached = prediction_cache.get(cache_key)
+        
+        if cached is not None:
+            predicted_class, probability = cached
+        else:
+            predicted_class, probability = score_features(features)
+            if cache_key is not None:
+                prediction_cache.put(cache_key, predicted_class, probability)
+        
+        if cache_key is not None:
+            prediction_cache_hit_ratio.set(prediction_cache.hit_ratio())
+            prediction_cache_memory.set(prediction_cache.memory_bytes())
         
         # Calculate latency
         latency_seconds = time.time() - start_time
         latency_ms = latency_seconds * 1000
         
         # Record Prometheus metrics
-        prediction_score.observe(probability)
-        predictions_total.labels(
-            predicted_class=str(predicted_class),
-            model_version=MODEL_VERSION
-        ).inc()
-        prediction_latency.observe(latency_seconds)
+        prediction_metrics.record(predicted_class, probability, latency_seconds)
+        drift_monitor.update(features, predicted_class)
         
-        # Log prediction to database
-        if db_pool:
+        # Log prediction to database (cache hits follow the configured policy)
+        if db_pool and (cached is None or prediction_cache.should_log_hit()):
             try:
                 async with db_pool.acquire() as conn:
                     await conn.execute(
@@ -162,7 +281,7 @@ async def predict(request: PredictionRequest):
                         (input_json, predicted_class, probability, model_version, latency_ms)
                         VALUES ($1, $2, $3, $4, $5)
                         """,
-                        json.dumps({"features": features}),
+                        codec.dump_log_features(features),
                         predicted_class,
                         probability,
                         MODEL_VERSION,
@@ -172,39 +291,114 @@ async def predict(request: PredictionRequest):
                 # Don't block response if DB is down
                 print(f"Warning: Failed to log prediction to database: {e}")
         
-        # Record HTTP request metric
-        http_requests_total.labels(
-            handler="/predict",
-            method="POST",
-            status="200"
-        ).inc()
+        return codec.encode_response(
+            {
+                "predicted_class": predicted_class,
+                "probability": probability,
+                "model_version": MODEL_VERSION,
+            },
+            request.headers.get("accept"),
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post(
+    "/predict/batch",
+    response_model=PredictionBatchResponse,
+    openapi_extra=_PREDICT_BATCH_BODY,
+)
+async def predict_batch(request: Request):
+    """
+    Score a batch of feature vectors in one vectorized call.
+
+    Binary (octet-stream) batches are row-major float32 buffers with the row
+    width in the X-Feature-Dim header. The prediction cache is not consulted.
+    """
+    start_time = time.time()
+    
+    try:
+        try:
+            features = codec.decode_batch(
+                await request.body(),
+                codec.media_type(request.headers.get("content-type")),
+                request.headers.get(codec.FEATURE_DIM_HEADER),
+            )
+        except codec.DecodeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if not features.size:
+            raise HTTPException(status_code=400, detail="Instances list cannot be empty")
         
-        return PredictionResponse(
-            predicted_class=predicted_class,
-            probability=probability,
-            model_version=MODEL_VERSION
+        predicted_class, probability = score_batch(features)
+        
+        latency_seconds = time.time() - start_time
+        # Amortized per-prediction latency for the log
+        latency_ms = latency_seconds * 1000 / len(features)
+        
+        prediction_metrics.record_batch(predicted_class, probability, latency_seconds)
+        drift_monitor.update_batch(features, predicted_class)
+        
+        if db_pool:
+            try:
+                async with db_pool.acquire() as conn:
+                    await conn.executemany(
+                        """
+                        INSERT INTO prediction_log 
+                        (input_json, predicted_class, probability, model_version, latency_ms)
+                        VALUES ($1, $2, $3, $4, $5)
+                        """,
+                        [
+                            (codec.dump_log_features(row), cls, prob, MODEL_VERSION, latency_ms)
+                            for row, cls, prob in zip(
+                                features, predicted_class.tolist(), probability.tolist()
+                            )
+                        ]
+                    )
+            except Exception as e:
+                print(f"Warning: Failed to log predictions to database: {e}")
+        
+        return codec.encode_response(
+            {
+                "predicted_class": predicted_class,
+                "probability": probability,
+                "model_version": MODEL_VERSION,
+            },
+            request.headers.get("accept"),
         )
     
     except HTTPException:
-        http_requests_total.labels(
-            handler="/predict",
-            method="POST",
-            status="400"
-        ).inc()
         raise
     except Exception as e:
-        http_requests_total.labels(
-            handler="/predict",
-            method="POST",
-            status="500"
-        ).inc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/drift")
+async def drift():
+    """
+    Live feature and class drift against the training reference
+    """
+    if not drift_monitor.enabled:
+        raise HTTPException(status_code=404, detail="No drift reference in metadata.json")
+    drift_monitor.publish()
+    return {
+        "model_version": MODEL_VERSION,
+        "current_window": drift_monitor.report(),
+        "last_window": drift_monitor.last_window,
+    }
+
+
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    content, media_type = render_latest()
+    return Response(content=content, media_type=media_type)
+
+
+# Count every response by route and status (registered after the routes exist)
+app.add_middleware(HTTPMetricsMiddleware, handlers=[route.path for route in app.routes])
 
 
 if __name__ == "__main__":
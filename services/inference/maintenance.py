@@ -0,0 +1,102 @@
+"""
+prediction_log partition, retention and rollup maintenance.
+
+Relies on the SQL functions created by db/migrations/003_partition_prediction_log.sql.
+Runs as a background task inside the inference service, or once from cron with
+`python maintenance.py`.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import asyncpg
+
+# The granularity is fixed per database in prediction_log_settings when
+# migration 003 runs; this only has to agree with it (a mismatch is reported)
+PARTITION_GRANULARITY = os.getenv("PREDICTION_LOG_PARTITION") or None
+PARTITIONS_AHEAD = int(os.getenv("PREDICTION_LOG_PARTITIONS_AHEAD", "3"))
+RETENTION_DAYS = int(os.getenv("PREDICTION_LOG_RETENTION_DAYS", "30"))
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("PREDICTION_LOG_MAINTENANCE_INTERVAL_SECONDS", "60"))
+
+# Minutes re-aggregated on every pass so late inserts still reach the rollup
+ROLLUP_LOOKBACK_MINUTES = int(os.getenv("PREDICTION_LOG_ROLLUP_LOOKBACK_MINUTES", "5"))
+
+# Advisory lock so only one worker (or cron job) maintains the table at a time
+_LOCK_KEY = 0x7072_6564  # "pred"
+
+
+async def run_maintenance(
+    pool: asyncpg.Pool,
+    now: Optional[datetime] = None
+) -> Dict[str, object]:
+    """
+    Create upcoming partitions, drop expired ones and refresh the rollup for
+    the most recent closed minutes. Returns a summary, or {"skipped": True}
+    when another process holds the maintenance lock.
+    """
+    now = now or datetime.now(timezone.utc)
+    async with pool.acquire() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", _LOCK_KEY):
+            return {"skipped": True}
+        try:
+            granularity = await conn.fetchval("SELECT prediction_log_granularity()")
+            if PARTITION_GRANULARITY and PARTITION_GRANULARITY != granularity:
+                print(f"Warning: PREDICTION_LOG_PARTITION={PARTITION_GRANULARITY} but the "
+                      f"database was migrated with {granularity} partitions; using {granularity}")
+            created = await conn.fetch(
+                "SELECT ensure_prediction_log_partitions($1, $2) AS name",
+                granularity,
+                PARTITIONS_AHEAD
+            )
+            dropped = await conn.fetch(
+                "SELECT drop_prediction_log_partitions($1) AS name",
+                timedelta(days=RETENTION_DAYS)
+            )
+            rollup_rows = await conn.fetchval(
+                "SELECT refresh_prediction_log_rollup($1, $2)",
+                now - timedelta(minutes=ROLLUP_LOOKBACK_MINUTES),
+                now
+            )
+            await conn.execute(
+                "DELETE FROM prediction_log_rollup_1m WHERE bucket < $1",
+                now - timedelta(days=RETENTION_DAYS)
+            )
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", _LOCK_KEY)
+
+    return {
+        "skipped": False,
+        "granularity": granularity,
+        "partitions": [r["name"] for r in created],
+        "dropped": [r["name"] for r in dropped],
+        "rollup_rows": rollup_rows,
+    }
+
+
+async def maintenance_loop(pool: asyncpg.Pool, interval: float = MAINTENANCE_INTERVAL_SECONDS):
+    """Run maintenance every `interval` seconds until cancelled"""
+    while True:
+        try:
+            summary = await run_maintenance(pool)
+            if summary.get("dropped"):
+                print(f"Dropped expired prediction_log partitions: {summary['dropped']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Maintenance must never take the service down
+            print(f"Warning: prediction_log maintenance failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _main():
+    database_url = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/mlops")
+    pool = await asyncpg.create_pool(database_url, min_size=1, max_size=1)
+    try:
+        print(await run_maintenance(pool))
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,187 @@
+"""
+Prometheus metrics for the inference service.
+
+Labeled children are bound once and reused so the request path does not hash
+label tuples on every call, HTTP status is recorded by a single ASGI
+middleware. Setting PROMETHEUS_MULTIPROC_DIR switches the exposition
+to multiprocess mode so several uvicorn workers report correctly.
+"""
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+prediction_score = Histogram(
+    "prediction_score_distribution",
+    "Distribution of prediction probabilities",
+    buckets=[0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0]
+)
+
+predictions_total = Counter(
+    "predictions_total",
+    "Total predictions by class and model version",
+    ["predicted_class", "model_version"]
+)
+
+model_f1 = Gauge(
+    "model_f1_score",
+    "Current model F1 score",
+    multiprocess_mode="mostrecent"
+)
+
+prediction_latency = Histogram(
+    "prediction_latency_seconds",
+    "Inference latency in seconds",
+    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "Total HTTP requests",
+    ["handler", "method", "status"]
+)
+
+prediction_cache_hit_ratio = Gauge(
+    "prediction_cache_hit_ratio",
+    "Fraction of prediction cache lookups served from the cache",
+    multiprocess_mode="liveall"
+)
+
+prediction_cache_memory = Gauge(
+    "prediction_cache_memory_bytes",
+    "Approximate memory held by the prediction cache",
+    multiprocess_mode="livesum"
+)
+
+
+def observe_many(histogram: Histogram, values: np.ndarray) -> None:
+    """
+    histogram.observe(v) for every v in values.
+
+    Goes through the public API so locking and multiprocess value files
+    stay prometheus_client's business; tolist() keeps the loop on Python
+    floats instead of numpy scalars.
+    """
+    for value in values.tolist():
+        histogram.observe(value)
+
+
+class PredictionMetrics:
+    """
+    Records prediction metrics through pre-bound predictions_total children.
+
+    Children are keyed by predicted class and rebound when the model version
+    changes.
+    """
+
+    def __init__(self):
+        self.model_version: Optional[str] = None
+        self._by_class: Dict[int, Counter] = {}
+
+    def set_model_version(self, model_version: str) -> None:
+        self.model_version = model_version
+        self._by_class.clear()
+
+    def _class_counter(self, predicted_class: int) -> Counter:
+        child = self._by_class.get(predicted_class)
+        if child is None:
+            child = predictions_total.labels(
+                predicted_class=str(predicted_class),
+                model_version=self.model_version
+            )
+            self._by_class[predicted_class] = child
+        return child
+
+    def record(self, predicted_class: int, probability: float, latency_seconds: float) -> None:
+        """Record a single prediction"""
+        prediction_score.observe(probability)
+        self._class_counter(predicted_class).inc()
+        prediction_latency.observe(latency_seconds)
+
+    def record_batch(
+        self,
+        predicted_class: np.ndarray,
+        probability: np.ndarray,
+        latency_seconds: float
+    ) -> None:
+        """Record a batch of predictions with one update per bucket and class"""
+        observe_many(prediction_score, probability)
+        for cls, count in enumerate(np.bincount(predicted_class).tolist()):
+            if count:
+                self._class_counter(cls).inc(count)
+        prediction_latency.observe(latency_seconds)
+
+
+prediction_metrics = PredictionMetrics()
+
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware counting every HTTP response by handler, method and status.
+
+    Only registered route paths are used as handler labels; anything else is
+    counted as "other" to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, handlers: Iterable[str] = ()):
+        self.app = app
+        self.handlers = set(handlers)
+        self._children: Dict[Tuple[str, str, int], Counter] = {}
+
+    def _counter(self, handler: str, method: str, status: int) -> Counter:
+        key = (handler, method, status)
+        child = self._children.get(key)
+        if child is None:
+            child = http_requests_total.labels(
+                handler=handler,
+                method=method,
+                status=str(status)
+            )
+            self._children[key] = child
+        return child
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            path = scope["path"]
+            handler = path if path in self.handlers else "other"
+            self._counter(handler, scope["method"], status).inc()
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Render the exposition for /metrics, aggregating workers in multiprocess mode"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: Optional[int] = None) -> None:
+    """Drop this worker's live gauges when it exits in multiprocess mode"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid())
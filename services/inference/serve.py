@@ -0,0 +1,155 @@
+"""
+Preforked multi-worker server for the inference service.
+
+The parent process loads the model once (main.load_model), binds the
+listening socket, freezes the heap out of the garbage collector and forks
+the workers, so model state is shared copy-on-write instead of loaded per
+worker. Each worker serves the shared socket with its own uvicorn event
+loop and a database pool capped at its share of DB_POOL_MAX_CONNECTIONS.
+With more than one worker, Prometheus runs in multiprocess mode
+(PROMETHEUS_MULTIPROC_DIR, cleared at startup) so /metrics aggregates all
+workers. Workers that exit unexpectedly are replaced after an exponential
+backoff (0.5 s doubling up to 30 s); after --max-restarts unexpected exits
+within --restart-window seconds the server shuts down instead of forking a
+worker that keeps crashing.
+
+Usage (from services/inference):
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+RESTART_BACKOFF_SECONDS = 0.5
+RESTART_BACKOFF_MAX_SECONDS = 30.0
+
+
+def prepare_multiproc_dir(workers: int) -> None:
+    """Point prometheus_client at an empty multiprocess directory before it is imported"""
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        if workers == 1:
+            return
+        path = os.path.join(tempfile.gettempdir(), "inference-prom-multiproc")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("*.db"):
+        stale.unlink()
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforked inference server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--max-restarts", type=int,
+                        default=int(os.getenv("WORKER_MAX_RESTARTS", "5")),
+                        help="unexpected worker exits tolerated within --restart-window")
+    parser.add_argument("--restart-window", type=float,
+                        default=float(os.getenv("WORKER_RESTART_WINDOW_SECONDS", "60")))
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    # Both must be set before main (and prometheus_client) is imported
+    os.environ["INFERENCE_WORKERS"] = str(workers)
+    prepare_multiproc_dir(workers)
+
+    import uvicorn
+    import main as service
+    from metrics import mark_process_dead
+
+    service.load_model()
+    sock = bind_socket(args.host, args.port, args.backlog)
+    print(f"Serving on {args.host}:{args.port} with {workers} preforked workers")
+
+    # Keep already-loaded objects out of GC passes so collections in the
+    # workers do not touch (and un-share) their pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+    failures = deque()
+    exit_code = 0
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            config = uvicorn.Config(service.app, log_level=args.log_level)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children[pid] = True
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.pop(pid, None)
+        mark_process_dead(pid)
+        if stopping:
+            continue
+
+        now = time.monotonic()
+        failures.append(now)
+        while failures[0] < now - args.restart_window:
+            failures.popleft()
+        if len(failures) > args.max_restarts:
+            print(f"Worker {pid} exited with status {status}; {len(failures)} worker exits "
+                  f"in {args.restart_window:g}s, shutting down")
+            exit_code = 1
+            stop(None, None)
+            continue
+
+        delay = min(RESTART_BACKOFF_MAX_SECONDS,
+                    RESTART_BACKOFF_SECONDS * 2 ** (len(failures) - 1))
+        print(f"Worker {pid} exited with status {status}; starting a replacement in {delay:g}s")
+        # Sleep in short steps so a SIGTERM during the backoff is not delayed
+        deadline = now + delay
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if not stopping:
+            spawn()
+
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()